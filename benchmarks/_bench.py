@@ -0,0 +1,22 @@
+# benchmarks/_bench.py
+"""Wspólne dla skryptów benchmarków: ścieżka do modułów aplikacji i pomiar czasu."""
+import os
+import sys
+import time
+from typing import Callable, Tuple, TypeVar
+
+# moduły aplikacji importowane są jak w `streamlit run src/Operacje.py` (core.*, components.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+T = TypeVar("T")
+
+
+def best_ms(fn: Callable[[], T], repeat: int = 5, setup: Callable[[], object] = lambda: None) -> Tuple[float, T]:
+    """Najlepszy z `repeat` czasów [ms] wywołania `fn` (po `setup` przed każdym pomiarem) i wynik ostatniego."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        setup()
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, (time.perf_counter() - t) * 1000.0)
+    return best, out
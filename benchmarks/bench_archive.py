@@ -0,0 +1,81 @@
+# benchmarks/bench_archive.py
+"""
+Archiwum całego stanu wykonania (exec + audit) w każdym formacie vs eksport XLSX
+z core.exec_export: czas eksportu/importu i rozmiar pliku.
+
+    python benchmarks/bench_archive.py [--years 5] [--cols 60] [--audit 12000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+import _bench  # noqa: F401  (ścieżka do src)
+
+from core.audit_log import AuditLog
+from core.exec_archive import available_formats, export_archive, import_archive
+from core.exec_export import export_exec_zip
+from core.exec_store import YearStore
+
+
+def benchmark(n_years: int = 5, n_cols: int = 60, audit_rows: int = 12_000) -> pd.DataFrame:
+    """Czas [s] i rozmiar [MB] archiwum dla `n_years` lat × `n_cols` kolumn (~20% pustych) + audit."""
+    rng = np.random.default_rng(0)
+    cols = [f"kol_{i:02d}" for i in range(n_cols)]
+    exec_state: Dict[int, YearStore] = {}
+    for y in range(2025 - n_years + 1, 2026):
+        store = exec_state[y] = YearStore(y, cols)
+        vals = rng.uniform(0, 1000, store.values.shape)
+        vals[rng.random(vals.shape) < 0.2] = np.nan
+        for m in range(1, 13):
+            store.write_values(m, vals[store.month_slice(m)])
+    audit_state: Dict[int, Dict[int, AuditLog]] = {}
+    per_month = max(1, audit_rows // (12 * n_years))
+    for y in exec_state:
+        for m in range(1, 13):
+            days = pd.date_range(f"{y}-{m:02d}-01", periods=28, freq="D")
+            audit_state.setdefault(y, {})[m] = AuditLog.from_frame(pd.DataFrame({
+                "czas": pd.Timestamp("2025-06-01") + pd.to_timedelta(np.arange(per_month), unit="s"),
+                "uzytkownik": rng.choice(["GM", "import"], per_month),
+                "data": rng.choice(days, per_month),
+                "kolumna": rng.choice(cols, per_month),
+                "stara": rng.uniform(0, 1000, per_month),
+                "nowa": rng.uniform(0, 1000, per_month),
+            }))
+
+    work = tempfile.mkdtemp(prefix="exec_archive_bench_")
+    rows = []
+    try:
+        t = time.perf_counter()
+        path, _, _ = export_exec_zip({y: dict(s.items()) for y, s in exec_state.items()},
+                                     {y: list(range(1, 13)) for y in exec_state}, os.path.join(work, "xlsx.zip"))
+        rows.append({"format": "xlsx (exec_export, bez audytu)", "eksport_s": round(time.perf_counter() - t, 2),
+                     "import_s": None, "MB": round(os.path.getsize(path) / 2**20, 2)})
+        for fmt in available_formats():
+            t = time.perf_counter()
+            path = export_archive(exec_state, audit_state, fmt, os.path.join(work, f"{fmt}.zip"))
+            t_exp = time.perf_counter() - t
+            t = time.perf_counter()
+            back, back_audit, _ = import_archive(path)
+            t_imp = time.perf_counter() - t
+            assert all(np.array_equal(back[y].values, exec_state[y].values, equal_nan=True) for y in exec_state)
+            assert sum(len(lg) for ms in back_audit.values() for lg in ms.values()) == per_month * 12 * n_years
+            rows.append({"format": fmt, "eksport_s": round(t_exp, 2), "import_s": round(t_imp, 2),
+                         "MB": round(os.path.getsize(path) / 2**20, 2)})
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark archiwum wykonania (Parquet / Arrow / CSV vs XLSX)")
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--cols", type=int, default=60)
+    ap.add_argument("--audit", type=int, default=12_000)
+    a = ap.parse_args()
+    print(benchmark(a.years, a.cols, a.audit).to_string(index=False))
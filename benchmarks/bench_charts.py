@@ -0,0 +1,47 @@
+# benchmarks/bench_charts.py
+"""
+Figury długich serii dziennych: rozmiar JSON i czas budowy + serializacji,
+pełna rozdzielczość vs automatyczny downsampling (components.charts.line).
+
+    python benchmarks/bench_charts.py [--years 1,3,5,10] [--traces 3] [--max-points 1000]
+"""
+import argparse
+import time
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+import _bench  # noqa: F401  (ścieżka do src)
+
+from components.charts import MAX_POINTS, line
+
+
+def benchmark(years: Sequence[int] = (1, 3, 5, 10), traces: int = 3, max_points: int = MAX_POINTS) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = []
+    for n_years in years:
+        dates = pd.date_range("2020-01-01", periods=365 * n_years, freq="D")
+        df = pd.DataFrame({"data": dates})
+        for k in range(traces):
+            df[f"s{k}"] = np.cumsum(rng.normal(0, 1, len(dates))) + 100
+        for mode, limit in (("pełne", None), ("auto", max_points)):
+            t0 = time.perf_counter()
+            fig = line(df, "data", [f"s{k}" for k in range(traces)], markers=False, max_points=limit)
+            t1 = time.perf_counter()
+            payload = fig.to_json()
+            t2 = time.perf_counter()
+            rows.append({"lata": n_years, "punkty/serię": len(df), "tryb": mode,
+                         "punkty_w_figurze": sum(len(tr.x) for tr in fig.data),
+                         "json_KB": round(len(payload) / 1024, 1),
+                         "budowa_ms": round((t1 - t0) * 1e3, 1), "to_json_ms": round((t2 - t1) * 1e3, 1)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark figur: pełna rozdzielczość vs downsampling")
+    ap.add_argument("--years", default="1,3,5,10")
+    ap.add_argument("--traces", type=int, default=3)
+    ap.add_argument("--max-points", type=int, default=MAX_POINTS)
+    a = ap.parse_args()
+    print(benchmark([int(v) for v in a.years.split(",")], a.traces, a.max_points).to_string(index=False))
@@ -0,0 +1,85 @@
+# benchmarks/bench_exec_db.py
+"""
+Magazyn SQLite wykonania: zimny start z bazy vs odbudowa sesji z eksportu XLSX
+oraz zapis jednej komórki z bazą vs tylko w sesji (jeden pełny rok).
+
+    python benchmarks/bench_exec_db.py [--year 2025] [--dir KATALOG]
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from _bench import best_ms
+
+from core.audit_log import AUDIT_COLS
+from core.exec_db import ExecDB
+from core.exec_store import YearStore
+from core.schema import REGISTRY
+
+
+def benchmark(year: int = 2025, workdir: Optional[str] = None, repeat: int = 5) -> pd.DataFrame:
+    """Czasy [ms] dla jednego pełnego roku (365 dni × kolumny schematu, ~10% pustych)."""
+    rng = np.random.default_rng(0)
+    src = YearStore(year, REGISTRY.columns)
+    vals = rng.uniform(0, 1000, src.values.shape).round(2)
+    vals[rng.random(vals.shape) < 0.1] = np.nan
+    for m in range(1, 13):
+        src.write_values(m, vals[src.month_slice(m)])
+    root = workdir or tempfile.mkdtemp(prefix="exec_db_bench_")
+    path = os.path.join(root, f"exec_{year}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db = ExecDB(path, REGISTRY.columns)
+    db.replace_all([(year, m, np.arange(1, src.month_slice(m).stop - src.month_slice(m).start + 1),
+                     src.values[src.month_slice(m)]) for m in range(1, 13)])
+
+    rows = []
+    t = time.perf_counter()
+    cold = YearStore(year, REGISTRY.columns, loader=lambda m: db.load_month(year, m))
+    for m in range(1, 13):
+        cold.month_frame(m)
+    rows.append({"krok": "zimny start z SQLite (init + 12 miesięcy)", "ms": round((time.perf_counter() - t) * 1000.0, 1)})
+    assert np.array_equal(cold.values, src.values, equal_nan=True)
+
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as xw:
+        for m in range(1, 13):
+            src.month_frame(m).to_excel(xw, sheet_name=f"WYKONANIE_{year}_{m:02d}", index=False)
+    t = time.perf_counter()
+    book = pd.read_excel(io.BytesIO(buf.getvalue()), sheet_name=None)
+    rebuilt = YearStore(year, REGISTRY.columns)
+    for name, df in book.items():
+        rebuilt.write_month(int(name[-2:]), df)
+    rows.append({"krok": "odbudowa sesji z eksportu XLSX", "ms": round((time.perf_counter() - t) * 1000.0, 1)})
+
+    def save_one(k: int, with_db: bool) -> None:
+        # każdy pomiar zapisuje inną wartość – zapis bez zmiany byłby pusty
+        r, c, old, new = cold.write_cells(3, np.array([k % 28]), np.array([0]),
+                                          np.array([float(k) + (0.5 if with_db else 0.25)]))
+        delta = pd.DataFrame({"czas": [datetime.now()] * len(r), "uzytkownik": "GM",
+                              "data": cold.dates[cold.month_slice(3).start + r],
+                              "kolumna": [cold.columns[0]] * len(r), "stara": old, "nowa": new},
+                             columns=AUDIT_COLS)
+        if with_db:
+            db.save_month(year, 3, delta)
+
+    for with_db, label in ((False, "tylko sesja"), (True, "sesja + SQLite")):
+        calls = iter(range(repeat))
+        ms, _ = best_ms(lambda: save_one(next(calls), with_db), repeat)
+        rows.append({"krok": f"zapis 1 komórki – {label}", "ms": round(ms, 2)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark magazynu SQLite wykonania")
+    ap.add_argument("--year", type=int, default=2025)
+    ap.add_argument("--dir", default=None, help="katalog na bazę testową (domyślnie tymczasowy)")
+    a = ap.parse_args()
+    print(benchmark(a.year, a.dir).to_string(index=False))
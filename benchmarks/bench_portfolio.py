@@ -0,0 +1,86 @@
+# benchmarks/bench_portfolio.py
+"""
+Konsolidacja portfela: N hoteli × lata z baz SQLite w puli procesów vs sekwencyjnie
+w jednym procesie oraz magazyny w sesji (zimny cache sum).
+
+    python benchmarks/bench_portfolio.py [--hotels 1,5,10,25,50] [--years 5] [--dir KATALOG]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import _bench  # noqa: F401  (ścieżka do src)
+
+from core.exec_db import ExecDB
+from core.exec_store import YearStore
+from core.portfolio import consolidate
+from core.schema import REGISTRY
+
+
+def _synthetic_year(year: int, rng: np.random.Generator) -> YearStore:
+    store = YearStore(year, REGISTRY.columns)
+    vals = rng.uniform(0, 1000, store.values.shape)
+    vals[rng.random(vals.shape) < 0.1] = np.nan
+    for m in range(1, 13):
+        store.write_values(m, vals[store.month_slice(m)])
+    return store
+
+
+def benchmark(hotel_counts: Sequence[int] = (1, 5, 10, 25, 50), n_years: int = 5,
+              workdir: Optional[str] = None) -> pd.DataFrame:
+    """Czasy [s] konsolidacji dla każdej liczby hoteli z `hotel_counts`."""
+    years = list(range(2025 - n_years + 1, 2026))
+    rng = np.random.default_rng(0)
+    root = workdir or tempfile.mkdtemp(prefix="portfolio_bench_")
+    os.makedirs(root, exist_ok=True)
+    stores: Dict[str, Dict[int, YearStore]] = {}
+    paths: Dict[str, str] = {}
+    for h in range(max(hotel_counts)):
+        name = f"hotel_{h:02d}"
+        stores[name] = {y: _synthetic_year(y, rng) for y in years}
+        paths[name] = os.path.join(root, f"{name}.db")
+        if not os.path.exists(paths[name]):
+            db = ExecDB(paths[name], REGISTRY.columns)
+            db.replace_all([(y, m, np.arange(1, s.month_slice(m).stop - s.month_slice(m).start + 1),
+                             s.values[s.month_slice(m)]) for y, s in stores[name].items() for m in range(1, 13)])
+    first = next(iter(paths))
+    consolidate({first: paths[first]}, years)  # start puli procesów poza pomiarem
+
+    rows = []
+    inline = ThreadPoolExecutor(max_workers=1)
+    for n in hotel_counts:
+        names = list(paths)[:n]
+        rec = {"hotele": n, "lata": n_years}
+        t = time.perf_counter()
+        res = consolidate({k: paths[k] for k in names}, years)
+        rec["sqlite_pula_s"] = time.perf_counter() - t
+        t = time.perf_counter()
+        ref = consolidate({k: paths[k] for k in names}, years, executor=inline)
+        rec["sqlite_1proc_s"] = time.perf_counter() - t
+        for k in names:
+            for store in stores[k].values():
+                for m in range(1, 13):
+                    store.invalidate(m)  # zimny cache sum
+        t = time.perf_counter()
+        mem = consolidate({k: stores[k] for k in names}, years)
+        rec["sesja_s"] = time.perf_counter() - t
+        assert np.isclose(res.consolidated["wynik"], ref.consolidated["wynik"])
+        assert np.isclose(res.consolidated["wynik"], mem.consolidated["wynik"])
+        rows.append(rec)
+    inline.shutdown()
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark konsolidacji portfela hoteli")
+    ap.add_argument("--hotels", default="1,5,10,25,50")
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--dir", default=None, help="katalog na bazy testowe (domyślnie tymczasowy)")
+    a = ap.parse_args()
+    print(benchmark([int(x) for x in a.hotels.split(",")], a.years, a.dir).to_string(index=False))
@@ -0,0 +1,81 @@
+# benchmarks/bench_save_month.py
+"""
+Zapis wklejonego całego miesiąca: dawny diff audytu pętlą iterrows vs save_month_df
+(diff wektorowy + zapis do YearStore + dziennik zmian), sesja bez bazy.
+
+    python benchmarks/bench_save_month.py [--days 31] [--repeat 5]
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from _bench import best_ms
+
+import streamlit as st
+
+from core import state_local
+from core.audit_log import AUDIT_COLS
+from core.schema import REGISTRY
+
+# sesja poza `streamlit run` (bare mode) działa jak słownik – bez ostrzeżeń o braku kontekstu skryptu
+for _name in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.runtime.state.session_state_proxy"):
+    logging.getLogger(_name).disabled = True
+
+
+def diff_loop(old_i: pd.DataFrame, new_i: pd.DataFrame, ts: datetime, user: str) -> pd.DataFrame:
+    """Dawny diff (iterrows + .at[] per komórka) – punkt odniesienia."""
+    neq = (old_i.fillna(np.nan).astype(object) != new_i.fillna(np.nan).astype(object))
+    changes = []
+    for d, row in neq.iterrows():
+        for c in row.index[row.values]:
+            o, n = old_i.at[d, c], new_i.at[d, c]
+            if pd.isna(o) and pd.isna(n):
+                continue  # puste → puste nie jest zmianą
+            changes.append({"czas": ts, "uzytkownik": user, "data": pd.to_datetime(d), "kolumna": c,
+                            "stara": float(o), "nowa": float(n)})
+    return pd.DataFrame(changes, columns=AUDIT_COLS)
+
+
+def _month(days: int, rng: np.random.Generator, empty: float) -> pd.DataFrame:
+    cols = list(REGISTRY.columns)
+    vals = rng.uniform(0, 1000, (days, len(cols))).round(2)
+    vals[rng.random(vals.shape) < empty] = np.nan
+    df = pd.DataFrame(vals, columns=cols)
+    df.insert(0, "data", pd.date_range("2025-01-01", periods=days, freq="D"))
+    return df
+
+
+def benchmark(days: int = 31, repeat: int = 5) -> pd.DataFrame:
+    """Czasy [ms] przy wklejeniu `days` dni × wszystkie kolumny schematu (stary miesiąc ~10% pustych)."""
+    os.environ.pop("EXEC_DB_PATH", None)
+    rng = np.random.default_rng(0)
+    old_df, new_df = _month(days, rng, 0.1), _month(days, rng, 0.0)
+    cols = list(REGISTRY.columns)
+    old_i, new_i = old_df.set_index("data")[cols], new_df.set_index("data")[cols]
+
+    def fresh_month() -> None:
+        st.session_state.clear()
+        state_local.save_month_df(2025, 1, old_df)
+
+    t_loop, ref = best_ms(lambda: diff_loop(old_i, new_i, datetime.now(), "GM"), repeat)
+    t_save, delta = best_ms(lambda: state_local.save_month_df(2025, 1, new_df), repeat, setup=fresh_month)
+    key = ["data", "kolumna"]
+    got = delta.drop(columns="czas").sort_values(key).reset_index(drop=True)
+    want = ref.drop(columns="czas").sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+    return pd.DataFrame([
+        {"krok": "diff iterrows (dawniej)", "ms": round(t_loop, 2), "zmiany": len(ref)},
+        {"krok": "save_month_df (diff + magazyn + audyt)", "ms": round(t_save, 2), "zmiany": len(delta)},
+    ])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark zapisu miesiąca (diff audytu + magazyn)")
+    ap.add_argument("--days", type=int, default=31)
+    ap.add_argument("--repeat", type=int, default=5)
+    a = ap.parse_args()
+    print(benchmark(a.days, a.repeat).to_string(index=False))
@@ -3,25 +3,17 @@
 # ===============================
 from __future__ import annotations
 
-from typing import Any, Callable, Optional
+from typing import Any, Callable
 
 import streamlit as st
 
-# --- Strony ładowane leniwie (bez twardych zależności) ---
-def _try_import(path: str) -> Optional[Any]:
-    try:
-        return __import__(path, fromlist=["render"])
-    except Exception:
-        return None
-
-
-dashboard_gm = _try_import("pages.dashboard_gm")
-plan = _try_import("pages.plan")
-wykonanie = _try_import("pages._wykonanie")
-raporty = _try_import("pages.raporty")
+# --- Strony ładowane leniwie: import dopiero przy pierwszym wejściu (core.page_registry) ---
+from core.page_registry import budget_ms, get_page, mark, register, startup_report
 
-# --- Stan lokalny: inicjalizacja roku i migracja schematu kolumn ---
-from core.state_local import init_exec_year, migrate_to_new_schema
+register("Pulpit GM", "pages.dashboard_gm")
+register("Plan", "pages.plan")
+register("Wykonanie", "_wykonanie", "pages._wykonanie")
+register("Raporty", "pages.raporty")
 
 MONTHS_PL = ["sty", "lut", "mar", "kwi", "maj", "cze", "lip", "sie", "wrz", "paź", "lis", "gru"]
 
@@ -65,6 +57,11 @@ def _sidebar_context_and_nav() -> tuple[str, bool, int, int]:
       - Rola / Rok / Miesiąc
     ŻADNEJ nawigacji (radio) nad/obok tytułu.
     """
+    # stan hotelu i Drive – import przy pierwszym renderze, nie przy starcie modułu
+    from core.portfolio import active_hotel, portfolio_hotels, switch_hotel
+    from core.state import drive_sync_caption
+    from core.state_local import storage_caption
+
     _ensure_defaults()
 
     # Tytuł
@@ -80,6 +77,23 @@ def _sidebar_context_and_nav() -> tuple[str, bool, int, int]:
     st.session_state["role"] = "INV" if role_label.startswith("INV") else "GM"
     is_inv = st.session_state["role"] == "INV"
 
+    # --- Hotel (portfel): przełączenie odkłada dane bieżącego hotelu w sesji ---
+    hotels = portfolio_hotels()
+    hotel = st.sidebar.selectbox("Hotel", options=hotels, index=hotels.index(active_hotel()), key="hotel_select")
+    if hotel != active_hotel():
+        switch_hotel(hotel)
+    if not is_inv:
+        new_hotel = st.sidebar.text_input("Dodaj hotel", key="hotel_new", placeholder="nazwa hotelu + Enter")
+        if new_hotel.strip() and new_hotel.strip() not in hotels:
+            try:
+                switch_hotel(new_hotel)  # nazwa = plik bazy w PORTFOLIO_DB_DIR – bez separatorów ścieżek
+            except ValueError as e:
+                st.sidebar.error(str(e))
+            else:
+                st.session_state.pop("hotel_select", None)
+                st.session_state.pop("hotel_new", None)
+                st.rerun()
+
     year = int(
         st.sidebar.number_input(
             "Rok",
@@ -103,7 +117,12 @@ def _sidebar_context_and_nav() -> tuple[str, bool, int, int]:
     )
     st.session_state["month"] = month
 
-    st.sidebar.caption("Dane żyją lokalnie w sesji. Eksport do XLSX wykonasz w zakładce „Wykonanie”.")
+    st.sidebar.caption(storage_caption())
+    sync_text, sync_error = drive_sync_caption()
+    if sync_text:
+        st.sidebar.caption(sync_text)
+    if sync_error:
+        st.sidebar.error(f"Zapis do Google Drive nie powiódł się: {sync_error}")
 
     # Nawigacji NIE rysujemy – trzymamy się bieżącej wartości lub domyślnej 'Wykonanie'
     nav = st.session_state.get("nav", "Wykonanie")
@@ -118,25 +137,34 @@ def _route(nav: str, is_inv: bool, year: int, month: int) -> None:
     Centralny przełącznik stron.
     Ważne: każdorazowo dbamy o spójność danych (init + migracja).
     """
+    from core.state_local import init_exec_year, migrate_to_new_schema
+
     # Utrzymanie spójności schematu (nowe nazwy kolumn) i gotowych miesięcy
     init_exec_year(year)
     migrate_to_new_schema()
 
-    if nav == "Pulpit GM":
-        _safe_render(dashboard_gm, year=year, month=month, readonly=is_inv)
-    elif nav == "Plan":
-        _safe_render(plan, year=year, month=month, readonly=is_inv)
+    if nav in ("Pulpit GM", "Plan", "Raporty"):
+        _safe_render(get_page(nav), year=year, month=month, readonly=is_inv)
     elif nav == "Wykonanie":
         # strona sama rysuje nagłówek i strzałki miesięcy
         try:
-            _safe_render(wykonanie, readonly=is_inv)
+            _safe_render(get_page("Wykonanie"), readonly=is_inv)
         except TypeError:
-            _safe_render(wykonanie)
-    elif nav == "Raporty":
-        _safe_render(raporty, year=year, month=month, readonly=is_inv)
+            _safe_render(get_page("Wykonanie"))
     else:
         # brak UI do zmiany 'nav' => trzymamy 'Wykonanie' jako bezpieczny fallback
-        _safe_render(wykonanie, readonly=is_inv)
+        _safe_render(get_page("Wykonanie"), readonly=is_inv)
+
+
+# ---------------------------------------------------------------------
+# Profil startu (importy stron + pierwszy render) – tylko GM
+# ---------------------------------------------------------------------
+def _startup_profile() -> None:
+    rows = startup_report()
+    over = any(r["ponad_budżet"] for r in rows)
+    with st.sidebar.expander("Profil startu" + (" ⚠️" if over else "")):
+        st.caption(f"Czasy od pierwszego uruchomienia w tym procesie; budżet {budget_ms():.0f} ms (STARTUP_BUDGET_MS).")
+        st.dataframe(rows, hide_index=True, width="stretch")
 
 
 # ---------------------------------------------------------------------
@@ -147,6 +175,9 @@ def main() -> None:
     _ensure_defaults()
     nav, is_inv, year, month = _sidebar_context_and_nav()
     _route(nav, is_inv, year, month)
+    mark("pierwszy render")
+    if not is_inv:
+        _startup_profile()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,16 @@
 # src/pages/wykonanie.py
 from __future__ import annotations
 
-import io
 import os
+import shutil
+import tempfile
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import Iterable, List, Optional, Dict
+from typing import Iterable, List, Dict
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -13,82 +18,36 @@ from core.state_local import (
     init_exec_year,
     migrate_to_new_schema,
     get_month_df,
-    save_month_df,
-    get_audit,
+    save_cell_edits,
+    query_audit,
     split_editable,
-    kpi_rooms_month,
+    month_missing,
+    year_completeness,
+    year_generation,
+    exec_years,
+    daily_kpi_series,
+    DAILY_SERIES,
+    memoize,
+    kpi_rooms_month_edits,
+    kpi_rooms_month_cached,
     kpi_rooms_ytd,
-    kpi_fnb_month,
+    kpi_fnb_month_edits,
+    kpi_fnb_month_cached,
     kpi_fnb_ytd,
+    import_exec_workbook,
+    ingest_operational_workbook,
+    export_exec_archive,
+    import_exec_archive,
 )
-
-# ===== Nowe, docelowe nazwy (etykiety do UI) =====
-DISPLAY_LABELS: Dict[str, str] = {
-    # Pokoje
-    "pokoje_dostepne_qty": "🛏️ Pokoje do sprzedaży",
-    "pokoje_oos_qty": "🚫 Pokoje OOS",
-    "pokoje_sprzedane_bez_qty": "🛏️ Sprzedane BEZ śn.",
-    "pokoje_sprzedane_ze_qty": "🥐 Sprzedane ZE śn.",
-    "pokoje_przychod_netto_pln": "💰 Przychody pokoje (netto)",
-    # Gastronomia
-    "fnb_sniadania_pakietowe_pln": "🥐 Śniadania pakietowe",
-    "fnb_kolacje_pakietowe_pln": "🍽️ Kolacje pakietowe",
-    "fnb_zywnosc_a_la_carte_pln": "🍲 Żywność a la carte",
-    "fnb_napoje_a_la_carte_pln": "🥤 Napoje a la carte",
-    "fnb_zywnosc_bankiety_pln": "🎉 Żywność bankiety",
-    "fnb_napoje_bankiety_pln": "🥂 Napoje bankiety",
-    "fnb_catering_pln": "🧺 Catering",
-    # Dział sprzedaży
-    "sprzedaz_wynajem_sali_pln": "🏢 Wynajem sal",
-    # Inne centra
-    "inne_proc_pokoi_parking_pct": "🅿️ % pokoi z parkingiem",
-    "inne_parking_przychod_pln": "🅿️ Przychody parking",
-    "inne_sklep_recepcja_przychod_pln": "🛒 Sklep recepcyjny",
-    "inne_pralnia_gosci_przychod_pln": "🧺 Pralnia (goście)",
-    "inne_transport_przychod_pln": "🚖 Transport (goście)",
-    "inne_rekreacja_przychod_pln": "🏊 Rekreacja",
-    "inne_pozostale_przychod_pln": "➕ Pozostałe przychody",
-    # Koszty – pokoje
-    "koszt_r_osobowe_wynagrodzenia_pln": "👥 Pokoje: wynagrodzenia",
-    "koszt_r_osobowe_zus_pln": "👥 Pokoje: ZUS",
-    "koszt_r_osobowe_pfron_pln": "👥 Pokoje: PFRON",
-    "koszt_r_osobowe_wyzywienie_pln": "👥 Pokoje: wyżywienie",
-    "koszt_r_osobowe_odziez_bhp_pln": "👥 Pokoje: odzież/BHP",
-    "koszt_r_osobowe_medyczne_pln": "👥 Pokoje: medyczne",
-    "koszt_r_osobowe_inne_pln": "👥 Pokoje: inne osobowe",
-    "koszt_r_materialy_eksplo_spozywcze_pln": "📦 Pokoje: materiały eksploat./spoż.",
-    "koszt_r_materialy_kosmetyki_czystosc_pln": "📦 Pokoje: kosmetyki/środki czystości",
-    "koszt_r_materialy_inne_biurowe_pln": "📦 Pokoje: inne/biurowe",
-    "koszt_r_uslugi_sprzatanie_pln": "🛠️ Pokoje: sprzątanie",
-    "koszt_r_uslugi_pranie_zew_pln": "🛠️ Pokoje: pranie (zew.)",
-    "koszt_r_uslugi_pranie_odziezy_pln": "🛠️ Pokoje: pranie odzieży sł.",
-    "koszt_r_uslugi_wynajem_sprzetu_pln": "🛠️ Pokoje: wynajem sprzętu",
-    "koszt_r_uslugi_inne_pln": "🛠️ Pokoje: inne usługi",
-    "koszt_r_prowizje_ota_gds_pln": "💳 Pokoje: prowizje OTA/GDS",
-    # Koszty – gastronomia
-    "koszt_g_surowiec_zywnosc_pln": "🍴 F&B: surowiec – żywność",
-    "koszt_g_surowiec_napoje_pln": "🍷 F&B: surowiec – napoje",
-    "koszt_g_osobowe_wynagrodzenia_pln": "👥 F&B: wynagrodzenia",
-    "koszt_g_osobowe_zus_pln": "👥 F&B: ZUS",
-    "koszt_g_osobowe_pfron_pln": "👥 F&B: PFRON",
-    "koszt_g_osobowe_wyzywienie_pln": "👥 F&B: wyżywienie",
-    "koszt_g_osobowe_odziez_bhp_pln": "👥 F&B: odzież/BHP",
-    "koszt_g_osobowe_medyczne_pln": "👥 F&B: medyczne",
-    "koszt_g_osobowe_inne_pln": "👥 F&B: inne osobowe",
-    "koszt_g_materialy_zastawa_pln": "📦 F&B: zastawa",
-    "koszt_g_materialy_drobne_wypos_pln": "📦 F&B: drobne wyposażenie",
-    "koszt_g_materialy_bielizna_dekor_pln": "📦 F&B: bielizna/dekoracje",
-    "koszt_g_materialy_karty_dan_pln": "📦 F&B: karty dań",
-    "koszt_g_materialy_srodki_czystosci_pln": "📦 F&B: środki czystości",
-    "koszt_g_materialy_inne_pln": "📦 F&B: inne materiały",
-    "koszt_g_uslugi_sprzatanie_pln": "🛠️ F&B: sprzątanie",
-    "koszt_g_uslugi_pranie_odziezy_pln": "🛠️ F&B: pranie odzieży sł.",
-    "koszt_g_uslugi_pranie_bielizny_pln": "🛠️ F&B: pranie bielizny",
-    "koszt_g_uslugi_wynajem_sprzetu_pln": "🛠️ F&B: wynajem sprzętu",
-    "koszt_g_uslugi_inne_pln": "🛠️ F&B: inne usługi",
-}
+from core.exec_archive import FORMATS, available_formats
+from core.portfolio import portfolio_hotels, portfolio_kpis
+from core.schema import REGISTRY
+from core.data_io import read_project_excel
+from core.exec_export import export_exec_zip, select_months
+from components.charts import MAX_POINTS, cached_figure, heatmap, line, show_plot, zoom_window
 
 MONTHS_PL = ["sty", "lut", "mar", "kwi", "maj", "cze", "lip", "sie", "wrz", "paź", "lis", "gru"]
+AUDIT_PAGE_SIZE = 50
 REQUIRED_COLS_DEFAULT = [
     "pokoje_dostepne_qty",
     "pokoje_sprzedane_bez_qty",
@@ -97,30 +56,9 @@ REQUIRED_COLS_DEFAULT = [
 ]
 
 # ===== helpers: grupy/filtry/styl =====
-def _to_numeric_series(s: pd.Series) -> pd.Series:
-    if s.dtype == object:
-        s = s.astype(str).str.strip().replace({"": None, "None": None, "nan": None})
-        s = s.str.replace(" ", "", regex=False).str.replace("\xa0", "", regex=False)
-        s = s.str.replace(",", ".", regex=False)
-    return pd.to_numeric(s, errors="coerce")
-
-def _is_missing_frame(df_sub: pd.DataFrame) -> pd.DataFrame:
-    num = df_sub.apply(_to_numeric_series)
-    miss = num.isna() | num.eq(0.0)
-    if any(df_sub.dtypes == object):
-        empty = df_sub.astype(str).str.strip().eq("")
-        miss = miss | empty
-    return miss
-
 def _detect_groups(df: pd.DataFrame) -> Dict[str, List[str]]:
-    cols = set(df.columns) - {"data"}
-    return {
-        "Pokoje": sorted([c for c in cols if c.startswith("pokoje_")]),
-        "Gastronomia": sorted([c for c in cols if c.startswith("fnb_")]),
-        "Dział Sprzedaży": sorted([c for c in cols if c.startswith("sprzedaz_")]),
-        "Inne Centra": sorted([c for c in cols if c.startswith("inne_")]),
-        "Koszty": sorted([c for c in cols if c.startswith("koszt_")]),
-    }
+    present = set(df.columns)
+    return {g: [c for c in cols if c in present] for g, cols in REGISTRY.groups.items()}
 
 def _group_key(group: str) -> str:
     return (group.lower()
@@ -128,36 +66,48 @@ def _group_key(group: str) -> str:
             .replace("ź","z").replace("ą","a").replace("ę","e").replace("ó","o")
             .replace("ń","n").replace("ć","c"))
 
-def _filter_missing_rows(df: pd.DataFrame, cols: Iterable[str]) -> pd.DataFrame:
-    cols = [c for c in cols if c in df.columns]
-    if not cols:
+def _filter_missing_rows(df: pd.DataFrame, miss) -> pd.DataFrame:
+    """Wiersze z co najmniej jednym brakiem wg maski braków (dni × kolumny) z magazynu."""
+    if miss.shape[1] == 0:
         return df.reset_index(drop=True)
-    miss = _is_missing_frame(df[cols])
-    mask = miss.any(axis=1)
-    return df.loc[mask].reset_index(drop=True)
-
-def _merge_back(original: pd.DataFrame, edited_view: pd.DataFrame) -> pd.DataFrame:
-    if edited_view.empty:
-        return original.copy()
-    base = original.set_index("data")
-    patch = edited_view.set_index("data")
-    common = [c for c in patch.columns if c in base.columns]
-    base.loc[patch.index, common] = patch[common]
-    return base.reset_index()
-
-def _style_missing(df_like: pd.DataFrame, *, subset_cols: Optional[Iterable[str]] = None) -> pd.io.formats.style.Styler:
-    df = df_like.copy()
-    today = pd.to_datetime(date.today())
-    if "data" in df.columns:
-        df = df[df["data"] <= today]
-    cols = [c for c in (subset_cols or REQUIRED_COLS_DEFAULT) if c in df.columns]
+    return df.loc[miss.any(axis=1)].reset_index(drop=True)
+
+def _editor_key(year: int, month: int, group: str, only_missing: bool) -> str:
+    """
+    Klucz edytora miesiąca z licznikiem zapisów: edited_rows to pozycje w widoku, a po zapisie
+    widok się zmienia (np. uzupełnione dni znikają z filtra braków) – nowy klucz = edytor bez starych edycji.
+    """
+    rev = st.session_state.get(f"editor_rev_{year}_{month}", 0)
+    return f"editor_{year}_{month}_{_group_key(group)}_{int(only_missing)}_{rev}"
+
+def _save_edits(year: int, month: int, edits: Dict, user: str) -> pd.DataFrame:
+    """Zapis edycji z edytora + nowy klucz edytora (stare edited_rows nie trafią ponownie do zapisu ani KPI)."""
+    changes = save_cell_edits(year, month, edits, user=user)
+    rev = f"editor_rev_{year}_{month}"
+    st.session_state[rev] = st.session_state.get(rev, 0) + 1
+    return changes
+
+def _edits_by_date(view: pd.DataFrame, edited_rows) -> Dict:
+    """edited_rows z data_editor ({wiersz widoku: {kolumna: wartość}}) → {data: {kolumna: wartość}}."""
+    if not edited_rows:
+        return {}
+    dates = view["data"].to_numpy()
+    return {dates[int(i)]: cells for i, cells in edited_rows.items() if 0 <= int(i) < len(dates)}
+
+def _style_missing(df: pd.DataFrame, miss, *, subset_cols: Iterable[str]) -> pd.io.formats.style.Styler:
+    """Czerwone tło braków; `miss` – gotowa maska (wiersze `df` × `subset_cols`), bez ponownego parsowania."""
+    cols = list(subset_cols)
     if not cols:
         return df.style
-    miss = _is_missing_frame(df[cols])
-    def style_subset(subdf: pd.DataFrame) -> pd.DataFrame:
-        local = miss.reindex(subdf.index).reindex(columns=subdf.columns, fill_value=False)
-        return local.replace({True: "background-color: #ffdddd", False: ""})
-    return df.style.apply(style_subset, axis=None, subset=cols)
+    css = np.where(miss, "background-color: #ffdddd", "")
+    return df.style.apply(lambda _: css, axis=None, subset=cols)
+
+def _completeness_figure(year: int, cols: List[str]):
+    grid = year_completeness(year, cols)
+    return grid, heatmap(grid, xaxis_title="Dzień", y_labels=[m.capitalize() for m in MONTHS_PL])
+
+_UNIT_FORMAT = {"qty": (1.0, "%.0f"), "pln": (1.0, "%.2f"), "pct": (0.01, "%.2f")}
+
 
 def _column_config_for(df: pd.DataFrame) -> Dict[str, st.column_config.BaseColumn]:
     cfg: Dict[str, st.column_config.BaseColumn] = {}
@@ -165,29 +115,115 @@ def _column_config_for(df: pd.DataFrame) -> Dict[str, st.column_config.BaseColum
         if c == "data":
             cfg[c] = st.column_config.DateColumn("Data", disabled=True)
             continue
-        label = DISPLAY_LABELS.get(c, c)
-        if c.endswith("_qty"):
-            cfg[c] = st.column_config.NumberColumn(label, step=1.0, format="%.0f")
-        elif c.endswith("_pln"):
-            cfg[c] = st.column_config.NumberColumn(label, step=1.0, format="%.2f")
-        elif c.endswith("_pct"):
-            cfg[c] = st.column_config.NumberColumn(label, step=0.01, format="%.2f")
-        else:
-            cfg[c] = st.column_config.NumberColumn(label, step=1.0, format="%.2f")
+        spec = REGISTRY.specs.get(c)
+        step, fmt = _UNIT_FORMAT.get(spec.unit if spec else "", (1.0, "%.2f"))
+        cfg[c] = st.column_config.NumberColumn(spec.label if spec else c, step=step, format=fmt)
     return cfg
 
-def _export_all_to_excel_bytes() -> io.BytesIO:
+# ===== Eksport (w tle, ZIP z rocznymi XLSX) =====
+_EXPORT_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="export")
+EXPORT_COPY_PATH = "/mnt/data/wykonanie_export.zip"
+
+
+class _ExportDir:
+    """Katalog tymczasowy plików eksportu sesji – usuwany razem ze stanem sesji (weakref.finalize)."""
+
+    def __init__(self) -> None:
+        self.path = tempfile.mkdtemp(prefix="wykonanie_export_")
+        weakref.finalize(self, shutil.rmtree, self.path, True)
+
+
+def _export_dest(name: str, previous: str) -> str:
+    """
+    Ścieżka nowego pliku eksportu w katalogu sesji; poprzedni plik tego rodzaju
+    (klucz `previous` w sesji: ścieżka lub krotka ze ścieżką na początku) jest usuwany.
+    """
+    old = st.session_state.pop(previous, None)
+    old_path = old[0] if isinstance(old, tuple) else old
+    if old_path:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    d = st.session_state.get("_export_dir")
+    if not isinstance(d, _ExportDir) or not os.path.isdir(d.path):
+        d = st.session_state["_export_dir"] = _ExportDir()
+    return os.path.join(d.path, f"{name}_{time.time_ns()}.zip")
+
+
+def _export_status_body() -> None:
+    job = st.session_state.get("export_job")
+    if job is not None:
+        if not job.done():
+            st.info("Eksport w toku…")
+            return
+        st.session_state.pop("export_job")
+        try:
+            path, digests, written = job.result()
+        except Exception as e:
+            st.error(f"Nie udało się wyeksportować: {e}")
+            return
+        st.session_state["export_digests"] = digests
+        copy_error = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(EXPORT_COPY_PATH), exist_ok=True)
+                shutil.copyfile(path, EXPORT_COPY_PATH)
+            except Exception as e:
+                copy_error = str(e)
+        st.session_state["export_result"] = (path, written, copy_error)
+    result = st.session_state.get("export_result")
+    if result is None:
+        return
+    path, written, copy_error = result
+    if not path:
+        st.info("Brak zmian od ostatniego eksportu.")
+        return
+    if not os.path.exists(path):
+        st.session_state.pop("export_result", None)
+        return
+    st.success(f"Wyeksportowano {len(written)} mies. Poniżej przycisk pobierania.")
+    with open(path, "rb") as f:
+        st.download_button("Pobierz ZIP (XLSX per rok)", data=f, file_name="wykonanie_export.zip",
+                           mime="application/zip", key="export_download_btn")
+    if copy_error:
+        st.warning(f"Nie udało się zapisać kopii w {EXPORT_COPY_PATH}: {copy_error}")
+    else:
+        st.caption(f"Zapisano również: {EXPORT_COPY_PATH}")
+
+
+# odświeżanie samego statusu co sekundę, dopóki eksport trwa (bez przeładowania strony)
+_export_status_live = st.fragment(run_every=1.0)(_export_status_body) if hasattr(st, "fragment") else _export_status_body
+
+
+def _export_section() -> None:
     exec_state = st.session_state.get("exec", {})
-    if not exec_state:
-        raise RuntimeError("Brak danych w sesji do eksportu.")
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
-        for y, months in exec_state.items():
-            for m, df in months.items():
-                sheet = f"WYKONANIE_{int(y)}_{int(m):02d}"[:31]
-                df.to_excel(wr, index=False, sheet_name=sheet)
-    buf.seek(0)
-    return buf
+    keys = sorted((int(y), int(m)) for y, months in exec_state.items() for m in months)
+    if not keys:
+        st.caption("Brak danych w sesji do eksportu.")
+        return
+    label = lambda k: f"{MONTHS_PL[k[1]-1]} {k[0]}"  # noqa: E731
+    e1, e2, e3 = st.columns([3, 3, 3])
+    with e1:
+        start = st.selectbox("Od", keys, index=0, format_func=label, key="export_from")
+    with e2:
+        end = st.selectbox("Do", keys, index=len(keys) - 1, format_func=label, key="export_to")
+    with e3:
+        incremental = st.checkbox("Tylko miesiące zmienione od ostatniego eksportu", key="export_incremental")
+    job = st.session_state.get("export_job")
+    running = job is not None and not job.done()
+    if st.button("Eksportuj do XLSX (ZIP)", type="secondary", key="export_all_xlsx", disabled=running):
+        selection = select_months(exec_state, start, end)
+        # migawka miesięcy – zapis w sesji nie wpływa na trwający eksport
+        snapshot = {y: {m: exec_state[y][m].copy() for m in ms} for y, ms in selection.items()}
+        previous = st.session_state.get("export_digests") if incremental else None
+        dest = _export_dest("wykonanie_xlsx", "export_result")
+        st.session_state["export_job"] = _EXPORT_POOL.submit(
+            export_exec_zip, snapshot, selection, dest, previous=previous
+        )
+        running = True
+    (_export_status_live if running else _export_status_body)()
+
 
 # ===== GŁÓWNY RENDER =====
 def render(readonly: bool = False) -> None:
@@ -237,8 +273,11 @@ def render(readonly: bool = False) -> None:
     default_subset = [c for c in REQUIRED_COLS_DEFAULT if c in df_edit.columns]
     subset_cols_for_style = group_cols or default_subset
 
-    # filtr wierszy (tylko braki) względem grupy
-    base_view = _filter_missing_rows(df_edit, subset_cols_for_style) if only_missing else df_edit
+    # braki z indeksu magazynu (dni do dziś × kolumny grupy) – filtr, kolor i liczniki
+    miss = month_missing(year, month, subset_cols_for_style)[: len(df_edit)]
+    miss_rows = miss.any(axis=1) if miss.shape[1] else np.zeros(len(df_edit), dtype=bool)
+    base_view = _filter_missing_rows(df_edit, miss) if only_missing else df_edit
+    miss_view = miss[miss_rows] if only_missing else miss
 
     # kolumny do wyświetlenia
     if group == "Wszystkie" or not group_cols:
@@ -247,7 +286,7 @@ def render(readonly: bool = False) -> None:
         display_cols = ["data"] + group_cols
 
     view_df = base_view[display_cols].copy()
-    cnt_placeholder.caption(f"Pokazujesz {len(view_df)} z {len(df_edit)} dni")
+    cnt_placeholder.caption(f"Pokazujesz {len(view_df)} z {len(df_edit)} dni · nieuzupełnione: {int(miss_rows.sum())}")
 
     # === Tryb główny bez dolnej tabeli: przełącznik podświetlenia ===
     podglad_kolor = st.checkbox("🔦 Podgląd braków (kolor)", value=False, key=f"color_preview_{year}_{month}")
@@ -256,17 +295,17 @@ def render(readonly: bool = False) -> None:
     if is_inv or podglad_kolor:
         # readonly lub podgląd kolorów → stylowanie na czerwono w głównej tabeli
         st.dataframe(
-            _style_missing(view_df, subset_cols=subset_cols_for_style),
+            _style_missing(view_df, miss_view, subset_cols=subset_cols_for_style),
             width="stretch",
             hide_index=True,
         )
-        # po podglądzie nadal licz KPI na wszystkich danych
-        all_now = pd.concat([df_edit, df_future], ignore_index=True)
+        # bez edycji – KPI miesiąca z cache agregatów (dane = zapisany miesiąc)
+        edits = {}
     else:
         # tryb edycji – tylko JEDNA tabela (data_editor), bez dolnego podglądu
         cfg = _column_config_for(view_df)
-        editor_key = f"editor_{year}_{month}_{_group_key(group)}_{int(only_missing)}"
-        edited_view = st.data_editor(
+        editor_key = _editor_key(year, month, group, only_missing)
+        st.data_editor(
             view_df,
             column_config=cfg,
             num_rows="fixed",
@@ -274,14 +313,15 @@ def render(readonly: bool = False) -> None:
             hide_index=True,
             key=editor_key,
         )
+        # edytor sam pamięta zmienione komórki – zapis i KPI idą tylko po nich
+        edits = _edits_by_date(view_df, (st.session_state.get(editor_key) or {}).get("edited_rows"))
 
         left, right = st.columns([1, 3])
         with left:
             who = st.text_input("Kto zapisuje?", value="GM")
             if st.button("Zapisz w sesji", type="primary", key=f"save_{year}_{month}"):
-                merged_edit = _merge_back(df_edit, edited_view)
-                new_full = pd.concat([merged_edit, df_future], ignore_index=True)
-                changes = save_month_df(year, month, new_full, user=who)
+                changes = _save_edits(year, month, edits, user=who)
+                edits = {}  # zapisane – KPI poniżej już z zapisanych sum
                 st.success(f"Zapisano {len(changes)} zmian.") if not changes.empty else st.info("Brak zmian.")
                 st.session_state[f"last_changes_{year}_{month}"] = changes
 
@@ -291,8 +331,6 @@ def render(readonly: bool = False) -> None:
             st.subheader("Zmiany (ostatni zapis)")
             st.dataframe(changes, width="stretch", hide_index=True)
 
-        all_now = pd.concat([_merge_back(df_edit, edited_view), df_future], ignore_index=True)
-
     # Dni przyszłe (podgląd)
     if not df_future.empty:
         st.markdown("#### Dni przyszłe (podgląd)")
@@ -302,15 +340,28 @@ def render(readonly: bool = False) -> None:
 
     # Audit
     st.subheader("Historia zmian (audit log)")
-    audit = get_audit(year, month)
-    st.write("Brak zmian w tym miesiącu.") if audit.empty else st.dataframe(
-        audit.sort_values("czas", ascending=False), width="stretch", hide_index=True
-    )
+    audit, total = query_audit(year, month, limit=AUDIT_PAGE_SIZE)
+    if total == 0:
+        st.write("Brak zmian w tym miesiącu.")
+    else:
+        pages = (total + AUDIT_PAGE_SIZE - 1) // AUDIT_PAGE_SIZE
+        page = 1
+        if pages > 1:
+            page = int(st.number_input("Strona historii", min_value=1, max_value=pages, value=1,
+                                       step=1, key=f"audit_page_{year}_{month}"))
+            if page > 1:
+                audit, total = query_audit(year, month, limit=AUDIT_PAGE_SIZE, offset=(page - 1) * AUDIT_PAGE_SIZE)
+        st.caption(f"{total} wpisów, najnowsze pierwsze (strona {page} z {pages})")
+        st.dataframe(audit, width="stretch", hide_index=True)
 
     # KPI
     st.subheader("Podsumowania KPI")
-    r_m = kpi_rooms_month(all_now)
-    f_m = kpi_fnb_month(all_now)
+    if not edits:
+        r_m = kpi_rooms_month_cached(year, month)
+        f_m = kpi_fnb_month_cached(year, month)
+    else:  # niezapisane edycje: zapisane sumy + różnice edytowanych komórek
+        r_m = kpi_rooms_month_edits(year, month, edits)
+        f_m = kpi_fnb_month_edits(year, month, edits)
     exec_state = st.session_state.get("exec", {})
     r_y = kpi_rooms_ytd(exec_state, year, month)
     f_y = kpi_fnb_ytd(exec_state, year, month)
@@ -328,25 +379,104 @@ def render(readonly: bool = False) -> None:
     g2.metric("Koszty F&B", f"{f_m['g_k_razem']:.2f} zł", delta=f"YTD {f_y['g_k_razem']:.2f} zł")
     g3.metric("Wynik F&B", f"{f_m['g_wynik']:.2f} zł", delta=f"YTD {f_y['g_wynik']:.2f} zł")
 
+    # Kompletność roku (z indeksu braków; przeliczane tylko zmienione miesiące)
+    with st.expander(f"Kompletność danych {year} – grupa: {group}"):
+        key = (year_generation(year), tuple(subset_cols_for_style), date.today())
+        grid, fig = memoize(f"completeness_{year}", key, lambda: _completeness_figure(year, subset_cols_for_style))
+        show_plot(fig)
+        filled = grid.to_numpy()
+        filled = filled[~np.isnan(filled)]
+        if filled.size:
+            st.caption(f"Uzupełnione komórki do dziś: {filled.mean()*100:.1f}% · dni kompletne: {int((filled == 1.0).sum())} z {filled.size}")
+
+    # Trend dzienny wszystkich lat – pełna rozdzielczość w oknie wybranym suwakiem (poza nim downsampling)
+    with st.expander("Trend dzienny (wszystkie lata)"):
+        years = exec_years()
+        daily = memoize("daily_trend", tuple((y, year_generation(y)) for y in years) + (date.today(),),
+                        lambda: daily_kpi_series(years))
+        if daily.empty:
+            st.info("Brak zapisanych dni.")
+        else:
+            series = st.multiselect("Serie", list(DAILY_SERIES), default=list(DAILY_SERIES)[:1], key="daily_trend_series")
+            window = zoom_window(daily["data"], key="daily_trend_window")
+            if series:
+                show_plot(cached_figure(line, daily, x="data", ys=series, markers=False, x_range=window,
+                                        title="Wykonanie dzienne [zł]"))
+            shown = len(daily) if window is None else int(daily["data"].between(*window).sum())
+            st.caption(f"Dni w oknie: {shown}" + (f" · wykres ograniczony do ~{MAX_POINTS} punktów na serię" if shown > MAX_POINTS else ""))
+
+    # Portfel – KPI per hotel i skonsolidowane (bazy innych hoteli liczone w puli procesów)
+    hotels = portfolio_hotels()
+    if len(hotels) > 1:
+        with st.expander(f"Portfel hoteli – KPI skonsolidowane ({len(hotels)} hotele)"):
+            scope = st.radio("Okres", ["Miesiąc", "YTD"], horizontal=True, key="portfolio_scope")
+            months = [month] if scope == "Miesiąc" else list(range(1, month + 1))
+            try:
+                table = portfolio_kpis([year], months).table()
+                st.dataframe(table.style.format("{:,.2f}", na_rep="–"), width="stretch")
+            except Exception as e:
+                st.error(f"Nie udało się policzyć KPI portfela: {e}")
+
     # Eksport
     st.subheader("Eksport do Excela")
-    if st.button("Eksportuj wszystkie lata/miesiące do XLSX", type="secondary", key="export_all_xlsx"):
+    _export_section()
+
+    # Import (ponowne wgranie pliku – tylko zmienione arkusze/miesiące)
+    st.subheader("Import z Excela")
+    up = st.file_uploader("Plik z arkuszami WYKONANIE_RRRR_MM (np. wcześniejszy eksport)",
+                          type=["xlsx", "xlsm"], key="exec_import_file", disabled=is_inv)
+    if up is not None and st.button("Wczytaj zmienione miesiące", key="exec_import_btn", disabled=is_inv):
         try:
-            buffer = _export_all_to_excel_bytes()
-            st.success("Wyeksportowano. Poniżej przycisk pobierania.")
-            st.download_button(
-                "Pobierz XLSX",
-                data=buffer.getvalue(),
-                file_name="wykonanie_export.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="export_download_btn",
-            )
-            try:
-                os.makedirs("/mnt/data", exist_ok=True)
-                with open("/mnt/data/wykonanie_export.xlsx", "wb") as f:
-                    f.write(buffer.getvalue())
-                st.caption("Zapisano również: /mnt/data/wykonanie_export.xlsx")
-            except Exception:
-                pass
+            book = read_project_excel(up)
+            done = import_exec_workbook(book, st.session_state.get("exec_import_fp"), user=f"import ({role})")
+            st.session_state["exec_import_fp"] = getattr(book, "fingerprints", None)
+            if done:
+                lines = [f"{MONTHS_PL[m-1]} {y}: {n} zmian" for (y, m), n in sorted(done.items())]
+                st.success("Wczytano zmienione miesiące: " + "; ".join(lines))
+            else:
+                st.info("Żaden arkusz WYKONANIE_* nie zmienił się od ostatniego importu.")
         except Exception as e:
-            st.error(f"Nie udało się wyeksportować: {e}")
+            st.error(f"Nie udało się wczytać pliku: {e}")
+
+    up_ops = st.file_uploader("Dane operacyjne (arkusze raw_matrix / raw / cost*)",
+                              type=["xlsx", "xlsm"], key="ops_import_file", disabled=is_inv)
+    if up_ops is not None and st.button("Wczytaj dane operacyjne", key="ops_import_btn", disabled=is_inv):
+        try:
+            rep = ingest_operational_workbook(up_ops, user=f"import ({role})")
+            st.success(f"Arkusze: {', '.join(rep.sheets) or '—'}; wierszy {rep.rows}, komórek {rep.cells}.")
+            for sheet, cols in rep.unmapped.items():
+                st.caption(f"{sheet}: pominięte nieznane kolumny – {', '.join(dict.fromkeys(cols))}")
+            if rep.bad_dates:
+                st.caption(f"Pominięto {rep.bad_dates} wierszy z nieczytelną datą.")
+        except Exception as e:
+            st.error(f"Nie udało się wczytać danych operacyjnych: {e}")
+
+    # Archiwum całego stanu (exec + audit) w formatach kolumnowych
+    st.subheader("Archiwum danych (Parquet / Arrow / CSV)")
+    a1, a2 = st.columns([2, 3])
+    with a1:
+        fmt = st.selectbox("Format", available_formats(), format_func=FORMATS.get, key="archive_fmt")
+        if st.button("Utwórz archiwum", key="archive_export_btn"):
+            try:
+                dest = _export_dest(f"wykonanie_{fmt}", "archive_file")
+                st.session_state["archive_file"] = (export_exec_archive(fmt, dest), fmt)
+            except Exception as e:
+                st.error(f"Nie udało się utworzyć archiwum: {e}")
+        arch = st.session_state.get("archive_file")
+        if arch and os.path.exists(arch[0]):
+            with open(arch[0], "rb") as f:
+                st.download_button("Pobierz archiwum", data=f, file_name=f"wykonanie.{arch[1]}.zip",
+                                   mime="application/zip", key="archive_download_btn")
+    with a2:
+        up_arch = st.file_uploader("Przywróć z archiwum (.zip) – zastępuje dane i historię zmian w sesji (i w bazie SQLite, jeśli jest)",
+                                   type=["zip"], key="archive_import_file", disabled=is_inv)
+        if up_arch is not None and st.button("Przywróć", key="archive_import_btn", disabled=is_inv):
+            try:
+                man = import_exec_archive(up_arch)
+                st.session_state["archive_msg"] = f"Przywrócono lata: {', '.join(map(str, man['years'])) or '—'}."
+                st.rerun()
+            except Exception as e:
+                st.error(f"Nie udało się przywrócić archiwum: {e}")
+        msg = st.session_state.pop("archive_msg", None)
+        if msg:
+            st.success(msg)
@@ -1,12 +1,95 @@
 # src/components/charts.py
 from __future__ import annotations
 
-from typing import Iterable, List, Optional
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from core.memo import fingerprint
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Długie serie dzienne: downsampling po stronie serwera (LTTB / min-max) + WebGL
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Powyżej MAX_POINTS punktów na serię wykres dostaje ~MAX_POINTS punktów wybranych tak,
+# by zachować kształt (szczyty, spadki), a linie idą przez Scattergl. Zoom w przeglądarce
+# nie wraca do Pythona, więc pełną rozdzielczość daje okno `x_range` (suwak zoom_window na
+# stronie): limit dotyczy tylko punktów w oknie – wąskie okno = wszystkie punkty.
+
+MAX_POINTS = 1000
+
+
+def _as_float(x) -> np.ndarray:
+    a = np.asarray(x)
+    if np.issubdtype(a.dtype, np.datetime64):
+        return a.astype("datetime64[ns]").astype("int64").astype("float64")
+    return a.astype("float64")
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Indeksy punktów LTTB (Largest-Triangle-Three-Buckets), wariant wektorowy:
+    kotwicą kubełka jest średnia poprzedniego kubełka (nie wybrany punkt), więc
+    całość liczy się jednym przebiegiem numpy. Pierwszy i ostatni punkt zawsze zostają.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf, yf = _as_float(x), np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")  # n_out-2 kubełków wnętrza
+    starts, ends = edges[:-1], edges[1:]
+    size = ends - starts
+    csx, csy = np.concatenate([[0.0], np.cumsum(xf)]), np.concatenate([[0.0], np.cumsum(yf)])
+    mx, my = (csx[ends] - csx[starts]) / size, (csy[ends] - csy[starts]) / size
+    ax, ay = np.concatenate([[xf[0]], mx[:-1]]), np.concatenate([[yf[0]], my[:-1]])
+    cx, cy = np.concatenate([mx[1:], [xf[-1]]]), np.concatenate([my[1:], [yf[-1]]])
+    b = np.repeat(np.arange(len(size)), size)
+    j = np.arange(1, n - 1)
+    area = np.abs((ax[b] - cx[b]) * (yf[j] - ay[b]) - (ax[b] - xf[j]) * (cy[b] - ay[b]))
+    hit = np.flatnonzero(area == np.maximum.reduceat(area, starts - 1)[b])
+    first = hit[np.r_[True, b[hit[1:]] != b[hit[:-1]]]]  # pierwszy maks. w kubełku
+    return np.concatenate([[0], first + 1, [n - 1]])
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """Indeksy min i max w każdym z n_out/2 kubełków (zachowuje skrajne wartości), posortowane."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    nb = n_out // 2
+    b = (np.arange(n) * nb) // n
+    order = np.lexsort((np.asarray(y, dtype="float64"), b))
+    ends = np.cumsum(np.bincount(b, minlength=nb))
+    starts = ends - np.bincount(b, minlength=nb)
+    return np.unique(np.concatenate([order[starts], order[ends - 1]]))
+
+
+def downsample_indices(x, y, max_points: int, method: str = "lttb") -> np.ndarray:
+    """Indeksy punktów do narysowania (NaN pomijane); bez zmian, gdy punktów ≤ max_points."""
+    y = np.asarray(y, dtype="float64")
+    ok = np.flatnonzero(np.isfinite(y))
+    if len(ok) <= max_points:
+        return ok
+    x = np.asarray(x)
+    pick = minmax_indices(y[ok], max_points) if method == "minmax" else lttb_indices(x[ok], y[ok], max_points)
+    return ok[pick]
+
+
+def _window(df, x: str, x_range: Optional[Tuple]) -> pd.DataFrame:
+    if x_range is None:
+        return df
+    lo, hi = x_range
+    col = df[x]
+    return df.loc[(col >= lo) & (col <= hi)]
+
 
 def line(
     df,
@@ -16,25 +99,41 @@ def line(
     title: Optional[str] = None,
     markers: bool = True,
     yaxis_title: Optional[str] = None,
+    max_points: Optional[int] = MAX_POINTS,
+    method: str = "lttb",
+    x_range: Optional[Tuple] = None,
 ) -> go.Figure:
-    """Wykres liniowy z wieloma seriami (Plotly)."""
+    """
+    Wykres liniowy z wieloma seriami (Plotly).
+    Seria dłuższa niż `max_points` (None = bez limitu) → downsampling `method` ("lttb" / "minmax")
+    i Scattergl; `x_range` zawęża dane do okna (oś X ustawiona na to okno).
+    """
     fig = go.Figure()
     ys_list: List[str] = list(ys)
+    view = _window(df, x, x_range)
+    xs = view[x].to_numpy()
     for col in ys_list:
-        fig.add_trace(
-            go.Scatter(
-                x=df[x],
-                y=df[col],
-                name=col,
-                mode="lines+markers" if markers else "lines",
+        yv = view[col].to_numpy(dtype="float64", na_value=np.nan)
+        if max_points is not None and len(yv) > max_points:
+            idx = downsample_indices(xs, yv, max_points, method)
+            fig.add_trace(go.Scattergl(x=xs[idx], y=yv[idx], name=col, mode="lines"))
+        else:
+            fig.add_trace(
+                go.Scatter(
+                    x=view[x],
+                    y=view[col],
+                    name=col,
+                    mode="lines+markers" if markers else "lines",
+                )
             )
-        )
     fig.update_layout(
         title=title or "",
         xaxis_title=x,
         yaxis_title=yaxis_title or "",
         margin=dict(l=10, r=10, t=40, b=10),
     )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
     return fig
 
 
@@ -65,14 +164,26 @@ def area(
     title: Optional[str] = None,
     stackgroup: str = "one",
     yaxis_title: Optional[str] = None,
+    max_points: Optional[int] = MAX_POINTS,
+    method: str = "lttb",
+    x_range: Optional[Tuple] = None,
 ) -> go.Figure:
-    """Wykres area (stacked)."""
+    """
+    Wykres area (stacked).
+    Przy długich seriach wspólne indeksy punktów wybierane są z sumy serii (warstwy muszą mieć
+    te same X); Scattergl nie obsługuje stackgroup, więc ślady zostają jako Scatter.
+    """
     fig = go.Figure()
-    for col in ys:
+    ys_list: List[str] = list(ys)
+    view = _window(df, x, x_range)
+    if max_points is not None and len(view) > max_points and ys_list:
+        total = view[ys_list].apply(pd.to_numeric, errors="coerce").fillna(0.0).sum(axis=1).to_numpy()
+        view = view.iloc[downsample_indices(view[x].to_numpy(), total, max_points, method)]
+    for col in ys_list:
         fig.add_trace(
             go.Scatter(
-                x=df[x],
-                y=df[col],
+                x=view[x],
+                y=view[col],
                 stackgroup=stackgroup,
                 name=col,
                 mode="lines",
@@ -84,9 +195,123 @@ def area(
         yaxis_title=yaxis_title or "",
         margin=dict(l=10, r=10, t=40, b=10),
     )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+
+def zoom_window(values, *, key: str, label: str = "Zakres osi X", threshold: int = MAX_POINTS) -> Optional[Tuple]:
+    """
+    Suwak okna osi X dla serii dłuższej niż `threshold` (None, gdy się mieści).
+    Wynik idzie jako `x_range` do line/area – limit punktów liczony jest w oknie od nowa.
+    """
+    vals = pd.Series(values).dropna()
+    if len(vals) <= threshold:
+        return None
+    lo, hi = vals.min(), vals.max()
+    if isinstance(lo, pd.Timestamp):
+        lo, hi = lo.to_pydatetime(), hi.to_pydatetime()
+    return st.slider(label, min_value=lo, max_value=hi, value=(lo, hi), key=key)
+
+
+def heatmap(
+    df,
+    *,
+    title: Optional[str] = None,
+    xaxis_title: Optional[str] = None,
+    yaxis_title: Optional[str] = None,
+    y_labels: Optional[Iterable[str]] = None,
+    zmin: float = 0.0,
+    zmax: float = 1.0,
+) -> go.Figure:
+    """Mapa cieplna z ramki (wiersze = oś Y, kolumny = oś X); NaN zostają puste."""
+    fig = go.Figure(
+        go.Heatmap(
+            z=df.to_numpy(),
+            x=list(df.columns),
+            y=list(y_labels) if y_labels is not None else list(df.index),
+            zmin=zmin,
+            zmax=zmax,
+            colorscale="RdYlGn",
+            xgap=1,
+            ygap=1,
+            hoverongaps=False,
+        )
+    )
+    fig.update_layout(
+        title=title or "",
+        xaxis_title=xaxis_title or "",
+        yaxis_title=yaxis_title or "",
+        yaxis_autorange="reversed",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
     return fig
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Cache figur: JSON figury po odcisku danych + parametrach, LRU w budżecie pamięci
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Wspólny dla procesu (klucz to treść danych, nie sesja) – powtórne reruny i zmiana roli
+# nie budują figury od nowa. Trafienie oddaje _CachedFigure: st.plotly_chart bierze z niej
+# słownik przez to_dict(), więc ślady nie są ponownie tworzone ani walidowane.
+
+_FIG_CACHE: "OrderedDict[Tuple, str]" = OrderedDict()
+_FIG_LOCK = threading.Lock()
+_FIG_STATS = {"bytes": 0, "hits": 0, "misses": 0}
+
+
+def _fig_budget() -> int:
+    """Budżet cache figur w bajtach (env FIG_CACHE_MB, domyślnie 32 MB)."""
+    try:
+        return int(float(os.environ.get("FIG_CACHE_MB", "32")) * 1024 * 1024)
+    except ValueError:
+        return 32 * 1024 * 1024
+
+
+class _CachedFigure(go.Figure):
+    """Figura z zapisanego JSON – to_dict() oddaje gotowy słownik (bez budowania śladów)."""
+
+    def __init__(self, payload: str):
+        super().__init__()
+        self._payload = payload
+
+    def to_dict(self) -> Dict:
+        return json.loads(self._payload)
+
+
+def cached_figure(builder: Callable[..., go.Figure], df: pd.DataFrame, **params) -> go.Figure:
+    """
+    builder(df, **params) z cache. Klucz: funkcja + odcisk kolumn użytych w `x`/`y`/`ys`
+    (gdy brak – całej ramki) + parametry. Zwróconej figury nie modyfikujemy – zmiany idą przez parametry.
+    """
+    named = [params[k] for k in ("x", "y") if isinstance(params.get(k), str)] + list(params.get("ys") or [])
+    key = (builder.__module__, builder.__qualname__, fingerprint(df, named or None), repr(sorted(params.items())))
+    with _FIG_LOCK:
+        payload = _FIG_CACHE.get(key)
+        if payload is not None:
+            _FIG_CACHE.move_to_end(key)
+            _FIG_STATS["hits"] += 1
+            return _CachedFigure(payload)
+    fig = builder(df, **params)
+    payload = fig.to_json()
+    with _FIG_LOCK:
+        _FIG_STATS["misses"] += 1
+        if key not in _FIG_CACHE:
+            _FIG_CACHE[key] = payload
+            _FIG_STATS["bytes"] += len(payload)
+        budget = _fig_budget()
+        while _FIG_STATS["bytes"] > budget and len(_FIG_CACHE) > 1:
+            _, old = _FIG_CACHE.popitem(last=False)
+            _FIG_STATS["bytes"] -= len(old)
+    return fig
+
+
+def figure_cache_info() -> Dict[str, int]:
+    with _FIG_LOCK:
+        return dict(_FIG_STATS, entries=len(_FIG_CACHE), budget=_fig_budget())
+
+
 # ---- JEDYNE miejsce renderowania (bez use_container_width) ----
 def show_plot(fig: go.Figure) -> None:
     """Render wykresu z nowym API szerokości."""
@@ -0,0 +1,203 @@
+# src/core/audit_log.py
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.exec_store import next_generation
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Append-only dziennik zmian (audit) – kawałki kolumn typowanych + indeksy
+# ──────────────────────────────────────────────────────────────────────────────
+
+AUDIT_COLS = ["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"]
+
+
+class AuditLog:
+    """
+    Dziennik zmian jednego miesiąca.
+    - dane w kawałkach (chunk = dict kolumn NumPy), dopisywanych bez kopiowania historii,
+    - 'uzytkownik' i 'kolumna' jako kody słownikowe (kategorie), 'stara'/'nowa' jako float64,
+    - indeksy pozycji po dniu, kolumnie i użytkowniku,
+    - po COMPACT_AT kawałkach scalanie w wątku w tle.
+    Pozycja wiersza (0..n-1) = kolejność dopisania, więc „najnowsze” = największe pozycje.
+    """
+
+    COMPACT_AT = 16
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self._offsets: List[int] = [0]
+        self.users: List[str] = []
+        self.columns: List[str] = []
+        self._user_code: Dict[str, int] = {}
+        self._col_code: Dict[str, int] = {}
+        self._by_day: Dict[int, List[np.ndarray]] = {}
+        self._by_col: Dict[int, List[np.ndarray]] = {}
+        self._by_user: Dict[int, List[np.ndarray]] = {}
+        self._compacting = False
+        self.schema_version = 0  # wersja nazw w słowniku kolumn (pilnuje jej warstwa stanu)
+        self.generation = next_generation()  # zmienia się przy dopisaniu / zmianie nazw kolumn
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    @classmethod
+    def from_frame(cls, df: Optional[pd.DataFrame]) -> "AuditLog":
+        """Przepisuje dotychczasowy audit (DataFrame, także ze 'stara'/'nowa' jako tekst)."""
+        log = cls()
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            log.append(df)
+        return log
+
+    # --- Zapis ---
+    @staticmethod
+    def _encode(values: np.ndarray, names: List[str], codes: Dict[str, int]) -> np.ndarray:
+        uniq, inv = np.unique(values.astype(str), return_inverse=True)
+        for u in uniq:
+            if u not in codes:
+                codes[u] = len(names)
+                names.append(u)
+        return np.array([codes[u] for u in uniq], dtype="int32")[inv]
+
+    @staticmethod
+    def _add_to_index(index: Dict[int, List[np.ndarray]], keys: np.ndarray, pos: np.ndarray) -> None:
+        order = np.argsort(keys, kind="stable")
+        uniq, starts = np.unique(keys[order], return_index=True)
+        for k, part in zip(uniq.tolist(), np.split(pos[order], starts[1:])):
+            index.setdefault(k, []).append(part)
+
+    def append(self, delta: pd.DataFrame) -> None:
+        """Dopisuje partię zmian (kolumny jak AUDIT_COLS)."""
+        n = len(delta)
+        if n == 0:
+            return
+        with self._lock:
+            chunk = {
+                "czas": pd.to_datetime(delta["czas"], errors="coerce").to_numpy("datetime64[ns]"),
+                "uzytkownik": self._encode(delta["uzytkownik"].fillna("").to_numpy(), self.users, self._user_code),
+                "data": pd.to_datetime(delta["data"], errors="coerce").to_numpy("datetime64[ns]"),
+                "kolumna": self._encode(delta["kolumna"].fillna("").to_numpy(), self.columns, self._col_code),
+                "stara": pd.to_numeric(delta["stara"], errors="coerce").to_numpy("float64", na_value=np.nan),
+                "nowa": pd.to_numeric(delta["nowa"], errors="coerce").to_numpy("float64", na_value=np.nan),
+            }
+            start = self._offsets[-1]
+            pos = np.arange(start, start + n, dtype="int64")
+            self._chunks.append(chunk)
+            self._offsets.append(start + n)
+            self._add_to_index(self._by_day, chunk["data"].view("int64"), pos)
+            self._add_to_index(self._by_col, chunk["kolumna"], pos)
+            self._add_to_index(self._by_user, chunk["uzytkownik"], pos)
+            self.generation = next_generation()
+            start_compaction = len(self._chunks) >= self.COMPACT_AT and not self._compacting
+            if start_compaction:
+                self._compacting = True
+        if start_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def rename_columns(self, mapping: Dict[str, str]) -> None:
+        """Zmienia nazwy kolumn w słowniku; wiersze przekodowuje wektorowo (remap[kody])."""
+        with self._lock:
+            new_names = [mapping.get(n, n) for n in self.columns]
+            if new_names == self.columns:
+                return
+            names = list(dict.fromkeys(new_names))  # kilka starych nazw → jedna nowa
+            code = {n: i for i, n in enumerate(names)}
+            remap = np.array([code[n] for n in new_names], dtype="int32")
+            for ch in self._chunks:
+                ch["kolumna"] = remap[ch["kolumna"]]
+            by_col: Dict[int, List[np.ndarray]] = {}
+            for old_code, parts in self._by_col.items():
+                by_col.setdefault(int(remap[old_code]), []).extend(parts)
+            self._by_col = by_col
+            self.columns = names
+            self._col_code = code
+            self.generation = next_generation()
+
+    # --- Scalanie w tle ---
+    def compact(self) -> None:
+        """Scala kawałki i listy indeksów w pojedyncze tablice."""
+        with self._lock:
+            try:
+                if len(self._chunks) > 1:
+                    merged = {k: np.concatenate([ch[k] for ch in self._chunks]) for k in self._chunks[0]}
+                    self._chunks = [merged]
+                    self._offsets = [0, len(merged["czas"])]
+                for index in (self._by_day, self._by_col, self._by_user):
+                    for k, parts in index.items():
+                        if len(parts) > 1:
+                            index[k] = [np.concatenate(parts)]
+            finally:
+                self._compacting = False
+
+    # --- Odczyt ---
+    _DTYPES = {"czas": "datetime64[ns]", "uzytkownik": "int32", "data": "datetime64[ns]",
+               "kolumna": "int32", "stara": "float64", "nowa": "float64"}
+
+    def _take(self, pos: np.ndarray) -> pd.DataFrame:
+        """Wiersze o podanych pozycjach (w tej samej kolejności)."""
+        out = {k: np.empty(len(pos), dtype=t) for k, t in self._DTYPES.items()}
+        chunk_id = np.searchsorted(np.asarray(self._offsets), pos, side="right") - 1
+        for cid in np.unique(chunk_id):
+            sel = chunk_id == cid
+            local = pos[sel] - self._offsets[cid]
+            for k in AUDIT_COLS:
+                out[k][sel] = self._chunks[cid][k][local]
+        return pd.DataFrame(
+            {
+                "czas": out["czas"],
+                "uzytkownik": pd.Categorical.from_codes(out["uzytkownik"], categories=pd.Index(self.users, dtype=object)),
+                "data": out["data"],
+                "kolumna": pd.Categorical.from_codes(out["kolumna"], categories=pd.Index(self.columns, dtype=object)),
+                "stara": out["stara"],
+                "nowa": out["nowa"],
+            },
+            columns=AUDIT_COLS,
+        )
+
+    def _positions(self, day=None, column: Optional[str] = None, user: Optional[str] = None) -> Optional[np.ndarray]:
+        """Posortowane pozycje pasujące do filtrów (None = brak filtrów)."""
+        picks = []
+        if day is not None:
+            picks.append(self._by_day.get(pd.Timestamp(day).as_unit("ns").value, []))
+        if column is not None:
+            picks.append(self._by_col.get(self._col_code.get(column, -1), []))
+        if user is not None:
+            picks.append(self._by_user.get(self._user_code.get(user, -1), []))
+        if not picks:
+            return None
+        sets = [np.sort(np.concatenate(p)) if p else np.array([], dtype="int64") for p in picks]
+        out = sets[0]
+        for s in sets[1:]:
+            out = np.intersect1d(out, s, assume_unique=True)
+        return out
+
+    def query(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        *,
+        day=None,
+        column: Optional[str] = None,
+        user: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """Strona wpisów od najnowszych: (DataFrame ≤ limit wierszy, liczba wszystkich pasujących)."""
+        with self._lock:
+            pos = self._positions(day, column, user)
+            total = len(self) if pos is None else len(pos)
+            hi = max(total - offset, 0)
+            lo = max(hi - limit, 0)
+            if pos is None:
+                page = np.arange(hi - 1, lo - 1, -1, dtype="int64")
+            else:
+                page = pos[lo:hi][::-1]
+            return self._take(page), total
+
+    def to_frame(self) -> pd.DataFrame:
+        """Cała historia w kolejności dopisania."""
+        with self._lock:
+            return self._take(np.arange(len(self), dtype="int64"))
@@ -1,163 +1,436 @@
-# =========================================
-# state.py  (ZMIANY: zapis/odczyt do TEGO SAMEGO pliku na Drive)
-# =========================================
+# src/core/cloud_drive.py
+from __future__ import annotations
+
+import hashlib
+import io
 import os
-from datetime import date
-from typing import Dict, List, Optional, Tuple
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Protocol, Tuple
 
 import pandas as pd
-import streamlit as st
-
-from core.cloud_drive import upsert_sheet, read_sheet
-
-# --- kolumny dzienne (jak ustaliliśmy wcześniej) ---
-ROOMS_DAY_COLS = ["pokoje_do_sprzedania","pokoje_oos","sprzedane_pokoje_bez","sprzedane_pokoje_ze","przychody_pokoje_netto"]
-FNB_REVENUE_DAY_COLS = ["fnb_sniadania_pakietowe","fnb_kolacje_pakietowe","fnb_zywnosc_a_la_carte","fnb_napoje_a_la_carte","fnb_zywnosc_bankiety","fnb_napoje_bankiety","fnb_wynajem_sali","fnb_catering"]
-OTHER_REVENUE_DAY_COLS = ["proc_pokoi_parking","przychody_parking","przychody_sklep_recepcyjny","przychody_pralnia_gosci","przychody_transport_gosci","przychody_rekreacja","przychody_pozostale"]
-ROOMS_COST_PERSONNEL = ["r_osobowe_wynagrodzenia","r_osobowe_zus","r_osobowe_pfron","r_osobowe_wyzywienie","r_osobowe_odziez_bhp","r_osobowe_medyczne","r_osobowe_inne"]
-ROOMS_COST_MATERIALS = ["r_materialy_eksploatacyjne_spozywcze","r_materialy_kosmetyki_srodki","r_materialy_inne_biurowe"]
-ROOMS_COST_SERVICES = ["r_uslugi_sprzatania","r_uslugi_pranie_zew","r_uslugi_pranie_odziezy_sluzbowej","r_uslugi_wynajem_sprzetu","r_uslugi_inne_bhp"]
-ROOMS_COST_OTHER = ["r_pozostale_prowizje_ota_gds"]
-FNB_COST_RAW = ["g_koszt_surowca_zywnosc_pln","g_koszt_surowca_napoje_pln"]
-FNB_COST_PERSONNEL = ["g_osobowe_wynagrodzenia","g_osobowe_zus","g_osobowe_pfron","g_osobowe_wyzywienie","g_osobowe_odziez_bhp","g_osobowe_medyczne","g_osobowe_inne"]
-FNB_COST_MATERIALS = ["g_materialy_zastawa","g_materialy_drobne_wyposazenie","g_materialy_bielizna_dekoracje","g_materialy_karty_dan","g_materialy_srodki_czystosci","g_materialy_inne"]
-FNB_COST_SERVICES = ["g_uslugi_sprzatania_tapicerki","g_uslugi_pranie_odziezy_sluzbowej","g_uslugi_pranie_bielizny_gastro","g_uslugi_wynajem_sprzetu_lokali","g_uslugi_inne"]
-DAY_COLUMNS: List[str] = (
-    ROOMS_DAY_COLS + FNB_REVENUE_DAY_COLS + OTHER_REVENUE_DAY_COLS +
-    ROOMS_COST_PERSONNEL + ROOMS_COST_MATERIALS + ROOMS_COST_SERVICES + ROOMS_COST_OTHER +
-    FNB_COST_RAW + FNB_COST_PERSONNEL + FNB_COST_MATERIALS + FNB_COST_SERVICES
-)
-
-# --- nazewnictwo arkuszy w Excelu ---
-def _sheet_name(year: int, month: int) -> str:
-    return f"WYKONANIE_{year}_{month:02d}"  # <= zgodnie z ustaleniami
-
-def _month_dates(year: int, month: int) -> List[pd.Timestamp]:
-    start = pd.Timestamp(year=year, month=month, day=1)
-    end = (start + pd.offsets.MonthBegin(1))
-    return list(pd.date_range(start, end - pd.Timedelta(days=1), freq="D"))
-
-def _create_month_df(year: int, month: int) -> pd.DataFrame:
-    df = pd.DataFrame({"data": _month_dates(year, month)})
-    for c in DAY_COLUMNS:
-        df[c] = 0.0
-    return df
-
-# --- stan w sesji Streamlit ---
-def _ensure_exec(year: int) -> None:
-    if "exec" not in st.session_state:
-        st.session_state["exec"] = {}
-    if year not in st.session_state["exec"]:
-        st.session_state["exec"][year] = {}
-    if "exec_audit" not in st.session_state:
-        st.session_state["exec_audit"] = {}
-    if year not in st.session_state["exec_audit"]:
-        st.session_state["exec_audit"][year] = {}
-    if "drive_plan_file" not in st.session_state:
-        # priorytet: secrets → UI może nadpisać
-        st.session_state["drive_plan_file"] = (
-            st.secrets.get("PLAN_FILE_ID") or st.secrets.get("PLAN_FILE_URL") or ""
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Plik Excel na Google Drive: pobranie (raz na rewizję), odczyt i podmiana arkuszy
+# ──────────────────────────────────────────────────────────────────────────────
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class DriveTransport(Protocol):
+    """Minimalny interfejs „dysku”: rewizja pliku, pobranie i wysłanie całej zawartości."""
+
+    def revision(self, file_id: str) -> str: ...
+
+    def download(self, file_id: str) -> bytes: ...
+
+    def upload(self, file_id: str, data: bytes) -> None: ...
+
+
+class GoogleDriveTransport:
+    """Google Drive API v3 (konto serwisowe z st.secrets['gcp_service_account'])."""
+
+    def __init__(self, credentials_info: Dict):
+        from google.oauth2.service_account import Credentials
+        from googleapiclient.discovery import build
+
+        creds = Credentials.from_service_account_info(
+            dict(credentials_info), scopes=["https://www.googleapis.com/auth/drive"]
         )
+        self._svc = build("drive", "v3", credentials=creds, cache_discovery=False)
+        self._lock = threading.Lock()  # klient HTTP googleapiclient nie jest wątkowo bezpieczny
+
+    def revision(self, file_id: str) -> str:
+        with self._lock:
+            meta = self._svc.files().get(
+                fileId=file_id, fields="version,modifiedTime", supportsAllDrives=True
+            ).execute()
+        return str(meta.get("version") or meta.get("modifiedTime") or "")
+
+    def download(self, file_id: str) -> bytes:
+        from googleapiclient.http import MediaIoBaseDownload
+
+        buf = io.BytesIO()
+        with self._lock:
+            req = self._svc.files().get_media(fileId=file_id, supportsAllDrives=True)
+            dl = MediaIoBaseDownload(buf, req)
+            done = False
+            while not done:
+                _, done = dl.next_chunk()
+        return buf.getvalue()
+
+    def upload(self, file_id: str, data: bytes) -> None:
+        from googleapiclient.http import MediaIoBaseUpload
+
+        media = MediaIoBaseUpload(io.BytesIO(data), mimetype=XLSX_MIME, resumable=True)
+        with self._lock:
+            self._svc.files().update(fileId=file_id, media_body=media, supportsAllDrives=True).execute()
+
+
+class LocalDirTransport:
+    """
+    Zastępnik Drive na lokalnym katalogu (testy, benchmarki, praca offline):
+    plik = <root>/<file_id>, rewizja = czas modyfikacji + rozmiar.
+    `latency` (s) symuluje opóźnienie sieci na każdym wywołaniu.
+    """
+
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = root
+        self.latency = float(latency)
+        self.calls: Dict[str, int] = {"revision": 0, "download": 0, "upload": 0}
+
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.root, file_id)
 
-def init_exec_year(year: int, drive_id_or_url: Optional[str] = None) -> None:
-    """Tworzy/ładuje 12 miesięcy. Jeśli w pliku na Drive istnieją arkusze WYKONANIE_YYYY_MM – wczytuje je."""
-    _ensure_exec(year)
-    if drive_id_or_url:
-        st.session_state["drive_plan_file"] = drive_id_or_url
-    file_ref = st.session_state["drive_plan_file"]
-
-    for m in range(1, 13):
-        # próbuj wczytać arkusz z Drive
-        df_cloud = None
-        if file_ref:
+    def _tick(self, kind: str) -> None:
+        self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def revision(self, file_id: str) -> str:
+        self._tick("revision")
+        st_ = os.stat(self._path(file_id))
+        return f"{st_.st_mtime_ns}-{st_.st_size}"
+
+    def download(self, file_id: str) -> bytes:
+        self._tick("download")
+        with open(self._path(file_id), "rb") as f:
+            return f.read()
+
+    def upload(self, file_id: str, data: bytes) -> None:
+        self._tick("upload")
+        path = self._path(file_id)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+# --- Wybór transportu (jeden na proces) ---
+_TRANSPORT: Optional[DriveTransport] = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def set_transport(transport: Optional[DriveTransport]) -> None:
+    """Podmienia transport (np. LocalDirTransport w testach); czyści cache plików."""
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        _TRANSPORT = transport
+    clear_cache()
+
+
+def get_transport() -> DriveTransport:
+    """DRIVE_LOCAL_DIR (env/secrets) → katalog lokalny, w przeciwnym razie Google Drive API."""
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        if _TRANSPORT is None:
+            secrets = {}
             try:
-                df_cloud = read_sheet(file_ref, _sheet_name(year, m))
+                import streamlit as st
+
+                secrets = st.secrets
+                local_dir = os.environ.get("DRIVE_LOCAL_DIR") or secrets.get("DRIVE_LOCAL_DIR")
             except Exception:
-                df_cloud = None
-        if df_cloud is not None and isinstance(df_cloud, pd.DataFrame) and "data" in df_cloud.columns:
-            # sanity: upewnij się, że data jest datą
-            df_cloud = df_cloud.copy()
-            df_cloud["data"] = pd.to_datetime(df_cloud["data"])
-            for c in DAY_COLUMNS:
-                if c not in df_cloud.columns:
-                    df_cloud[c] = 0.0
-            st.session_state["exec"][year][m] = df_cloud
-        else:
-            st.session_state["exec"][year][m] = _create_month_df(year, m)
-        st.session_state["exec_audit"][year][m] = []
-
-def get_month_df(year: int, month: int) -> pd.DataFrame:
-    _ensure_exec(year)
-    return st.session_state["exec"][year][month].copy(deep=True)
-
-def _diff_frames(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
-    before = before.sort_values("data").reset_index(drop=True)
-    after = after.sort_values("data").reset_index(drop=True)
-    rows = []
-    for col in after.columns:
-        if col == "data":
-            continue
-        dif = before[col] != after[col]
-        if dif.any():
-            changed = after.loc[dif, ["data", col]].copy()
-            changed["kolumna"] = col
-            changed["stara_wartosc"] = before.loc[dif, col].values
-            changed["nowa_wartosc"] = after.loc[dif, col].values
-            rows.append(changed[["data", "kolumna", "stara_wartosc", "nowa_wartosc"]])
-    if rows:
-        out = pd.concat(rows, ignore_index=True)
-        out["data"] = pd.to_datetime(out["data"]).dt.date
-        return out
-    return pd.DataFrame(columns=["data", "kolumna", "stara_wartosc", "nowa_wartosc"])
-
-def _save_month_to_drive(year: int, month: int, df: pd.DataFrame) -> None:
-    """Podmień/utwórz arkusz WYKONANIE_YYYY_MM w TYM SAMYM pliku na Drive."""
-    file_ref = st.session_state.get("drive_plan_file", "")
-    if not file_ref:
-        # bezpiecznie: jeśli nie znamy pliku – nie wysyłamy (tylko sesja)
-        return
-    # zachowujemy wszystkie inne arkusze – upsert działa na kopii workbooka
-    upsert_sheet(file_ref, _sheet_name(year, month), df)
-
-def save_month_df(year: int, month: int, edited: pd.DataFrame, user: str = "GM") -> pd.DataFrame:
-    """Zapis: audit + upload do tego samego pliku na Drive (+ stan w sesji)."""
-    _ensure_exec(year)
-    before = st.session_state["exec"][year][month]
-    changes = _diff_frames(before, edited)
-
-    if not changes.empty:
-        audit = st.session_state["exec_audit"][year][month]
-        ts = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
-        for _, r in changes.iterrows():
-            audit.append({
-                "czas": ts, "kto": user,
-                "data": r["data"].isoformat() if hasattr(r["data"], "isoformat") else str(r["data"]),
-                "kolumna": r["kolumna"],
-                "stara": float(r["stara_wartosc"]),
-                "nowa": float(r["nowa_wartosc"]),
-            })
-        st.session_state["exec_audit"][year][month] = audit
-
-    # zaktualizuj w sesji
-    st.session_state["exec"][year][month] = edited.copy(deep=True)
-
-    # wyślij w to samo miejsce w Drive (jeden arkusz)
-    try:
-        _save_month_to_drive(year, month, edited)
-    except Exception as e:
-        st.warning(f"Nie udało się zapisać do Google Drive: {e}")
-
-    return changes
-
-def get_audit(year: int, month: int) -> pd.DataFrame:
-    _ensure_exec(year)
-    return pd.DataFrame(st.session_state["exec_audit"][year][month])
-
-def split_editable(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
-    today = pd.Timestamp.today().normalize()
-    d = df.copy()
-    d["data"] = pd.to_datetime(d["data"])
-    return d[d["data"] <= today].copy(), d[d["data"] > today].copy()
-
-def missing_days(df: pd.DataFrame) -> pd.Series:
-    return df.loc[df["przychody_pokoje_netto"] <= 0.0, "data"]
+                local_dir = os.environ.get("DRIVE_LOCAL_DIR")
+            if local_dir:
+                _TRANSPORT = LocalDirTransport(local_dir)
+            else:
+                _TRANSPORT = GoogleDriveTransport(secrets["gcp_service_account"])
+        return _TRANSPORT
+
+
+def file_id_from_ref(file_ref: str) -> str:
+    """ID pliku z ID lub linku (…/d/<id>/…, …?id=<id>)."""
+    ref = (file_ref or "").strip()
+    m = re.search(r"/d/([A-Za-z0-9_-]+)", ref) or re.search(r"[?&]id=([A-Za-z0-9_-]+)", ref)
+    return m.group(1) if m else ref
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cache na dysku: zawartość pliku i sparsowane arkusze per (plik, rewizja)
+# ──────────────────────────────────────────────────────────────────────────────
+
+
+class DiskCache:
+    """
+    Katalog <root>/<file_id>/<rewizja>/ z plikiem (`workbook.xlsx`) i arkuszami
+    (`<sha1 nazwy>.pkl`, None = arkusza nie ma w pliku). Nowa rewizja pliku usuwa
+    poprzednie; całość trzymana w budżecie `max_bytes` (LRU). Rozmiary wpisów żyją
+    w indeksie w pamięci – katalog skanowany jest raz (kolejność LRU z czasu modyfikacji,
+    odświeżanego przy każdym trafieniu), potem suma liczona przyrostowo przy zapisie.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()  # plik → rozmiar, od najdawniej użytego
+        self._total = 0
+        self._scanned = False
+
+    @staticmethod
+    def _safe(part: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", part) or "_"
+
+    def _dir(self, fid: str, rev: str) -> str:
+        return os.path.join(self.root, self._safe(fid), self._safe(rev))
+
+    def _sheet_path(self, fid: str, rev: str, sheet: str) -> str:
+        return os.path.join(self._dir(fid, rev), hashlib.sha1(sheet.encode("utf-8")).hexdigest() + ".pkl")
+
+    def _scan(self) -> None:
+        """Jednorazowe wczytanie indeksu z katalogu (wpisy z poprzednich procesów)."""
+        if self._scanned:
+            return
+        entries = []
+        for base, _, files in os.walk(self.root):
+            for name in files:
+                p = os.path.join(base, name)
+                try:
+                    stt = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((stt.st_mtime_ns, stt.st_size, p))
+        for _, size, p in sorted(entries):
+            self._sizes[p] = size
+        self._total = sum(e[1] for e in entries)
+        self._scanned = True
+
+    def _forget(self, path: str) -> None:
+        self._total -= self._sizes.pop(path, 0)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._scan()
+            return self._total
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # LRU między procesami: kolejność przy następnym skanie
+        except OSError:
+            return None
+        with self._lock:
+            if path in self._sizes:
+                self._sizes.move_to_end(path)
+        return data
+
+    def _write(self, fid: str, rev: str, path: str, data: bytes) -> None:
+        d = self._dir(fid, rev)
+        with self._lock:
+            self._scan()
+            os.makedirs(d, exist_ok=True)
+            # starsze rewizje tego pliku są już nieaktualne
+            parent = os.path.dirname(d)
+            for other in os.listdir(parent):
+                od = os.path.join(parent, other)
+                if od != d:
+                    prefix = od + os.sep
+                    for p in [p for p in self._sizes if p.startswith(prefix)]:
+                        self._forget(p)
+                    shutil.rmtree(od, ignore_errors=True)
+            fd, tmp = tempfile.mkstemp(dir=d)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._forget(path)
+            self._sizes[path] = len(data)
+            self._total += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._sizes:
+            p, size = self._sizes.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    # --- API ---
+    def get_workbook(self, fid: str, rev: str) -> Optional[bytes]:
+        return self._read(os.path.join(self._dir(fid, rev), "workbook.xlsx"))
+
+    def put_workbook(self, fid: str, rev: str, data: bytes) -> None:
+        self._write(fid, rev, os.path.join(self._dir(fid, rev), "workbook.xlsx"), data)
+
+    def get_sheet(self, fid: str, rev: str, sheet: str):
+        """(True, DataFrame | None) przy trafieniu, (False, None) przy braku wpisu."""
+        raw = self._read(self._sheet_path(fid, rev, sheet))
+        if raw is None:
+            return False, None
+        try:
+            return True, pickle.loads(raw)
+        except Exception:
+            return False, None
+
+    def put_sheet(self, fid: str, rev: str, sheet: str, df: Optional[pd.DataFrame]) -> None:
+        self._write(fid, rev, self._sheet_path(fid, rev, sheet), pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def clear(self) -> None:
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._sizes.clear()
+            self._total = 0
+
+
+_DISK: Optional[DiskCache] = None
+_DISK_SET = False
+
+
+def set_disk_cache(cache: Optional[DiskCache]) -> None:
+    """Podmienia cache dyskowy (None → wyłączony)."""
+    global _DISK, _DISK_SET
+    _DISK, _DISK_SET = cache, True
+
+
+def _disk() -> Optional[DiskCache]:
+    """DRIVE_CACHE_DIR (env) lub katalog tymczasowy systemu; budżet DRIVE_CACHE_MB."""
+    global _DISK, _DISK_SET
+    if not _DISK_SET:
+        _DISK_SET = True
+        root = os.environ.get("DRIVE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "hotel_drive_cache")
+        mb = float(os.environ.get("DRIVE_CACHE_MB", "512"))
+        _DISK = DiskCache(root, int(mb * 1024 * 1024))
+    return _DISK
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cache w procesie (nad dyskowym): zawartość pliku i arkusze per (plik, rewizja)
+# ──────────────────────────────────────────────────────────────────────────────
+
+_BOOKS_MAX = 4
+_SHEETS_MAX = 256
+_BOOKS: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_SHEETS: "OrderedDict[Tuple[str, str, str], Optional[pd.DataFrame]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def clear_cache() -> None:
+    """Czyści cache w procesie (dyskowy zostaje – jest kluczowany rewizją)."""
+    with _CACHE_LOCK:
+        _BOOKS.clear()
+        _SHEETS.clear()
+
+
+def _put(cache: OrderedDict, key, value, limit: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def file_revision(file_ref: str) -> Tuple[str, str]:
+    """(file_id, rewizja) – jedno lekkie zapytanie o metadane."""
+    fid = file_id_from_ref(file_ref)
+    return fid, get_transport().revision(fid)
+
+
+def _workbook_bytes(fid: str, rev: str) -> bytes:
+    with _CACHE_LOCK:
+        data = _BOOKS.get((fid, rev))
+        if data is not None:
+            _BOOKS.move_to_end((fid, rev))
+            return data
+    disk = _disk()
+    data = disk.get_workbook(fid, rev) if disk else None
+    if data is None:
+        data = get_transport().download(fid)
+        if disk:
+            disk.put_workbook(fid, rev, data)
+    with _CACHE_LOCK:
+        _put(_BOOKS, (fid, rev), data, _BOOKS_MAX)
+    return data
+
+
+def fetch_workbook(file_ref: str) -> Tuple[str, str, bytes]:
+    """(file_id, rewizja, zawartość); pobiera tylko, gdy tej rewizji nie ma w cache."""
+    fid, rev = file_revision(file_ref)
+    return fid, rev, _workbook_bytes(fid, rev)
+
+
+def _parse_sheet(data: bytes, sheet_name: str) -> pd.DataFrame:
+    # osobny read-only workbook na wątek – openpyxl parsuje tylko wskazany arkusz
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, engine="openpyxl")
+
+
+def read_sheets(file_ref: str, sheet_names: Iterable[str], max_workers: int = 4) -> Dict[str, pd.DataFrame]:
+    """
+    Wiele arkuszy jednego pliku. Przy niezmienionej rewizji: jedno zapytanie o metadane
+    i arkusze z cache (pamięć → dysk); brakujące parsowane równolegle z jednego pobrania.
+    Zwraca tylko arkusze istniejące w pliku. Wyniki są współdzielone (nie modyfikować).
+    """
+    names = list(dict.fromkeys(sheet_names))
+    fid, rev = file_revision(file_ref)
+    disk = _disk()
+    out: Dict[str, pd.DataFrame] = {}
+    todo = []
+    for n in names:
+        key = (fid, rev, n)
+        with _CACHE_LOCK:
+            hit = key in _SHEETS
+            if hit:
+                _SHEETS.move_to_end(key)
+                df = _SHEETS[key]
+        if not hit and disk:
+            hit, df = disk.get_sheet(fid, rev, n)
+            if hit:
+                with _CACHE_LOCK:
+                    _put(_SHEETS, key, df, _SHEETS_MAX)
+        if not hit:
+            todo.append(n)
+        elif df is not None:
+            out[n] = df
+    if todo:
+        data = _workbook_bytes(fid, rev)
+        present = set(pd.ExcelFile(io.BytesIO(data), engine="openpyxl").sheet_names)
+        parse = [n for n in todo if n in present]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(parse) or 1))) as pool:
+            parsed = dict(zip(parse, pool.map(lambda n: _parse_sheet(data, n), parse)))
+        for n in todo:
+            if disk:
+                disk.put_sheet(fid, rev, n, parsed.get(n))
+            with _CACHE_LOCK:
+                _put(_SHEETS, (fid, rev, n), parsed.get(n), _SHEETS_MAX)
+        out.update(parsed)
+    return {n: out[n] for n in names if n in out}
+
+
+def read_sheet(file_ref: str, sheet_name: str) -> Optional[pd.DataFrame]:
+    """Jeden arkusz (None, gdy nie istnieje)."""
+    return read_sheets(file_ref, [sheet_name]).get(sheet_name)
+
+
+def upsert_sheets(file_ref: str, sheets: Dict[str, pd.DataFrame]) -> str:
+    """
+    Podmienia/dopisuje arkusze w TYM SAMYM pliku (pozostałe arkusze bez zmian)
+    i wysyła go w całości. Zwraca nową rewizję; nowa zawartość od razu trafia do cache,
+    więc kolejny odczyt nie pobiera pliku ponownie.
+    """
+    fid, _, data = fetch_workbook(file_ref)
+    buf = io.BytesIO(data)
+    with pd.ExcelWriter(buf, engine="openpyxl", mode="a", if_sheet_exists="replace") as wr:
+        for name, df in sheets.items():
+            df.to_excel(wr, sheet_name=name, index=False)
+    new_data = buf.getvalue()
+    t = get_transport()
+    t.upload(fid, new_data)
+    rev = t.revision(fid)
+    disk = _disk()
+    if disk:
+        disk.put_workbook(fid, rev, new_data)
+    with _CACHE_LOCK:
+        _put(_BOOKS, (fid, rev), new_data, _BOOKS_MAX)
+    return rev
+
+
+def upsert_sheet(file_ref: str, sheet_name: str, df: pd.DataFrame) -> str:
+    return upsert_sheets(file_ref, {sheet_name: df})
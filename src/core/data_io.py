@@ -1,25 +1,219 @@
+import hashlib
+import io
 import os
+import posixpath
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Mapping
 from pathlib import Path
 import pandas as pd
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core import sidecar
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Leniwy skoroszyt: arkusz parsowany przy pierwszym dostępie, wspólnie dla sesji
+# ──────────────────────────────────────────────────────────────────────────────
+
+_PARSED_MAX_BYTES = int(float(os.environ.get("WORKBOOK_CACHE_MB", "512")) * 1024 * 1024)
+_PARSED: "OrderedDict[Tuple[str, str], Tuple[pd.DataFrame, int]]" = OrderedDict()  # (odcisk, arkusz) → (df, bajty)
+_PARSED_BYTES = 0
+_BOOKS_MAX = 4
+_BOOKS: "OrderedDict[str, _Book]" = OrderedDict()  # digest → otwarty skoroszyt (LRU, najwyżej _BOOKS_MAX)
+_BOOK_KEYS: Dict[str, set] = {}  # digest → klucze _PARSED arkuszy tego pliku; pusty zbiór zwalnia skoroszyt
+_LOCK = threading.Lock()
+
+
+class _Book:
+    """Otwarty skoroszyt (jeden na digest w procesie); parsowanie serializowane blokadą."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.lock = threading.Lock()
+        self._xls: Optional[pd.ExcelFile] = None
+
+    @property
+    def xls(self) -> pd.ExcelFile:
+        if self._xls is None:
+            self._xls = pd.ExcelFile(io.BytesIO(self.data))
+        return self._xls
+
+
+def _cache_get(key: Tuple[str, str], digest: str) -> Optional[pd.DataFrame]:
+    with _LOCK:
+        hit = _PARSED.get(key)
+        if hit is None:
+            return None
+        _PARSED.move_to_end(key)
+        _BOOK_KEYS.setdefault(digest, set()).add(key)  # arkusz wspólny dla kilku wersji pliku
+        return hit[0]
+
+
+def _cache_put(key: Tuple[str, str], df: pd.DataFrame, digest: str) -> None:
+    global _PARSED_BYTES
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    with _LOCK:
+        _BOOK_KEYS.setdefault(digest, set()).add(key)
+        if key in _PARSED:
+            return
+        _PARSED[key] = (df, size)
+        _PARSED_BYTES += size
+        # LRU: najdawniej używane arkusze wypadają po przekroczeniu budżetu;
+        # skoroszyt, którego żaden arkusz nie został w cache, jest zwalniany
+        while _PARSED_BYTES > _PARSED_MAX_BYTES and len(_PARSED) > 1:
+            old_key, (_, old_size) = _PARSED.popitem(last=False)
+            _PARSED_BYTES -= old_size
+            for d, keys in list(_BOOK_KEYS.items()):
+                keys.discard(old_key)
+                if not keys:
+                    del _BOOK_KEYS[d]
+                    _BOOKS.pop(d, None)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Odciski arkuszy z CRC części archiwum .xlsx (bez parsowania)
+# ──────────────────────────────────────────────────────────────────────────────
+
+_SHEET_RE = re.compile(r'<(?:\w+:)?sheet\b[^>]*?\bname="([^"]*)"[^>]*?\br:id="([^"]*)"', re.S)
+_SHEET_RE_REV = re.compile(r'<(?:\w+:)?sheet\b[^>]*?\br:id="([^"]*)"[^>]*?\bname="([^"]*)"', re.S)
+_REL_RE = re.compile(r'<Relationship\b[^>]*?\bId="([^"]*)"[^>]*?\bTarget="([^"]*)"', re.S)
+_REL_RE_REV = re.compile(r'<Relationship\b[^>]*?\bTarget="([^"]*)"[^>]*?\bId="([^"]*)"', re.S)
+
+
+def _xml_unescape(s: str) -> str:
+    return (s.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+             .replace("&apos;", "'").replace("&amp;", "&"))
+
+
+def sheet_fingerprints(data: bytes) -> Optional[Dict[str, str]]:
+    """
+    {arkusz: odcisk} z katalogu archiwum .xlsx/.xlsm – CRC32 i rozmiar części arkusza
+    plus CRC wspólnych tabel (sharedStrings, styles), od których zależy wynik parsowania.
+    None, gdy plik nie jest archiwum OOXML (np. .xls).
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            infos = {i.filename: i for i in zf.infolist()}
+            wb_xml = zf.read("xl/workbook.xml").decode("utf-8", "replace")
+            rels_xml = zf.read("xl/_rels/workbook.xml.rels").decode("utf-8", "replace")
+    except (zipfile.BadZipFile, KeyError):
+        return None
+    rels = dict(_REL_RE.findall(rels_xml)) or {i: t for t, i in _REL_RE_REV.findall(rels_xml)}
+    sheets = _SHEET_RE.findall(wb_xml) or [(n, i) for i, n in _SHEET_RE_REV.findall(wb_xml)]
+    shared = "-".join(
+        f"{infos[p].CRC:08x}" if p in infos else "0" for p in ("xl/sharedStrings.xml", "xl/styles.xml")
+    )
+    out: Dict[str, str] = {}
+    for name, rid in sheets:
+        target = rels.get(rid, "")
+        part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        info = infos.get(part)
+        if info is None:
+            return None
+        out[_xml_unescape(name)] = f"{info.CRC:08x}-{info.file_size}-{shared}"
+    return out
+
+
+def changed_sheets(new: "LazyWorkbook", previous: Optional[Dict[str, str]]) -> List[str]:
+    """Arkusze nowej wersji, których odcisk różni się od poprzedniej (nowe też); bez poprzedniej – wszystkie."""
+    if not previous or not new.fingerprints:
+        return list(new)
+    return [n for n in new if new.fingerprints.get(n) != previous.get(n)]
+
+
+class LazyWorkbook(Mapping):
+    """
+    {nazwa arkusza: DataFrame} jak dotychczasowy dict, ale arkusz jest parsowany
+    dopiero przy pierwszym dostępie. Sparsowane arkusze są wspólne dla całego procesu
+    (klucz = skrót zawartości pliku), więc kilka sesji z tym samym plikiem parsuje go raz.
+    Przy dostępnym pyarrow każdy arkusz jest po pierwszym parsowaniu zapisywany jako
+    kolumnowy sidecar (core.sidecar) – kolejne uruchomienia czytają go zamiast Excela.
+    Klucz cache arkusza (w procesie i sidecara) to jego odcisk (sheet_fingerprints),
+    więc po wgraniu nowej wersji pliku niezmienione arkusze nie są parsowane ponownie.
+    Zwracane ramki są współdzielone – nie modyfikować w miejscu.
+    """
+
+    def __init__(self, data: bytes, digest: Optional[str] = None):
+        self.digest = digest or hashlib.sha256(data).hexdigest()
+        self.fingerprints: Dict[str, str] = sheet_fingerprints(data) or {}
+        with _LOCK:
+            book = _BOOKS.get(self.digest)
+            if book is None:
+                book = _BOOKS[self.digest] = _Book(data)
+            _BOOKS.move_to_end(self.digest)
+            while len(_BOOKS) > _BOOKS_MAX:
+                _BOOK_KEYS.pop(_BOOKS.popitem(last=False)[0], None)
+        self._book = book
+        names = sidecar.sheet_names(self.digest)
+        if names is None:
+            with book.lock:
+                names = list(book.xls.sheet_names)
+            sidecar.register(self.digest, names)
+        self._names = names
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name not in self._names:
+            raise KeyError(name)
+        key = (self.fingerprints.get(name, self.digest), name)
+        df = _cache_get(key, self.digest)
+        if df is None:
+            with self._book.lock:
+                df = _cache_get(key, self.digest)  # inna sesja mogła sparsować w międzyczasie
+                if df is None:
+                    df = sidecar.load(key[0], name)
+                    if df is None:
+                        df = self._book.xls.parse(name)
+                        sidecar.store(key[0], name, df)
+                    _cache_put(key, df, self.digest)
+        return df
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._names
+
+    def is_parsed(self, name: str) -> bool:
+        with _LOCK:
+            return (self.fingerprints.get(name, self.digest), name) in _PARSED
+
+    def ingest(self) -> None:
+        """Zamienia od razu wszystkie arkusze na sidecary (np. po wgraniu nowej wersji pliku)."""
+        for name in self._names:
+            self[name]
+
+
+def _read_bytes(src) -> bytes:
+    """Zawartość pliku z uploadu (UploadedFile/bufor) lub ze ścieżki."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            return f.read()
+    if hasattr(src, "getvalue"):
+        return src.getvalue()
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return src.read()
 
-def _xls_to_dict(xls: pd.ExcelFile) -> Dict[str, pd.DataFrame]:
-    return {name: xls.parse(name) for name in xls.sheet_names}
 
 def read_project_excel(
     uploaded_file=None,
     fallback_path: str | None = None,
     alt_paths: Iterable[str] | None = None,
-) -> Dict[str, pd.DataFrame]:
+) -> Mapping:
     """
     1) Jeśli użytkownik wgrał plik – czyta z uploadu.
     2) W innym wypadku próbuje znaleźć plik projektu po ścieżkach fallback.
     3) Gdy nic nie znaleziono – zwraca pusty dict.
+    Wynik to LazyWorkbook: arkusze parsowane przy pierwszym dostępie.
     """
     # 1) z uploadu
     if uploaded_file is not None:
-        xls = pd.ExcelFile(uploaded_file)
-        return _xls_to_dict(xls)
+        return LazyWorkbook(_read_bytes(uploaded_file))
 
     # 2) fallbacki
     candidates = []
@@ -39,8 +233,7 @@ def read_project_excel(
 
     for p in candidates:
         if p and os.path.exists(p):
-            xls = pd.ExcelFile(p)
-            return _xls_to_dict(xls)
+            return LazyWorkbook(_read_bytes(p))
 
     # 3) brak pliku – pusto
     return {}
@@ -0,0 +1,163 @@
+# src/core/drive_sync.py
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Zapis w tle (write-behind) do pliku na Drive – tylko zmienione arkusze
+# ──────────────────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class SyncStatus:
+    """Stan synchronizacji jednego pliku (do podpisu w sidebarze)."""
+
+    pending: int = 0                      # arkusze czekające na wysłanie
+    syncing: bool = False
+    last_ok: Optional[float] = None       # time.time() ostatniego udanego zapisu
+    last_error: Optional[str] = None
+    failures: int = 0                     # kolejne nieudane próby
+
+
+def _upsert_sheets(ref: str, sheets: Dict[str, pd.DataFrame]) -> object:
+    from core.cloud_drive import upsert_sheets  # klient Drive dopiero przy pierwszym zapisie
+
+    return upsert_sheets(ref, sheets)
+
+
+@dataclass
+class _FileQueue:
+    sheets: Dict[str, pd.DataFrame] = field(default_factory=dict)  # arkusz → ostatnia wersja
+    last_change: float = 0.0
+    status: SyncStatus = field(default_factory=SyncStatus)
+
+
+class DriveSync:
+    """
+    Kolejka zapisów do plików na Drive obsługiwana przez jeden wątek.
+    - kolejne zapisy tego samego arkusza w oknie `debounce` (s) scalają się – wysyłana jest
+      tylko ostatnia wersja,
+    - po ciszy trwającej `debounce` wszystkie zmienione arkusze pliku idą jednym uploadem,
+    - błąd nie gubi zmian: arkusze wracają do kolejki (nowsze wersje mają pierwszeństwo),
+      kolejna próba po `retry` s.
+    """
+
+    def __init__(
+        self,
+        debounce: float = 3.0,
+        retry: float = 30.0,
+        writer: Optional[Callable[[str, Dict[str, pd.DataFrame]], object]] = None,
+    ):
+        self.debounce = float(debounce)
+        self.retry = float(retry)
+        self._writer = writer or _upsert_sheets
+        self._files: Dict[str, _FileQueue] = {}
+        self._cond = threading.Condition()
+        self._force = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- API ---
+    def enqueue(self, file_ref: str, sheet_name: str, df: pd.DataFrame) -> None:
+        """Odkłada arkusz do wysłania (kopia – sesja może dalej edytować swoje dane)."""
+        with self._cond:
+            q = self._files.setdefault(file_ref, _FileQueue())
+            q.sheets[sheet_name] = df.copy()
+            q.last_change = time.monotonic()
+            q.status.pending = len(q.sheets)
+            self._start()
+            self._cond.notify_all()
+
+    def status(self, file_ref: str) -> SyncStatus:
+        with self._cond:
+            q = self._files.get(file_ref)
+            return SyncStatus(**vars(q.status)) if q else SyncStatus()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wysyła wszystko od razu (bez czekania na okno); True, gdy kolejka jest pusta."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._force = True
+            self._cond.notify_all()
+            while any(q.sheets or q.status.syncing for q in self._files.values()):
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+                # po błędzie nie kręcimy się w pętli – zwracamy stan
+                if any(q.sheets and q.status.failures for q in self._files.values()) and not self._force:
+                    return False
+            return True
+
+    def kick(self) -> None:
+        """Jak flush, ale bez czekania (np. z finalizatora sesji)."""
+        with self._cond:
+            self._force = True
+            self._cond.notify_all()
+
+    # --- Wątek ---
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="drive-sync", daemon=True)
+            self._thread.start()
+
+    def _due(self, q: _FileQueue, now: float) -> float:
+        """Za ile sekund plik jest gotowy do wysłania (≤ 0 → teraz)."""
+        wait = self.retry if q.status.failures else self.debounce
+        return 0.0 if self._force and not q.status.failures else q.last_change + wait - now
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    waiting = {ref: self._due(q, now) for ref, q in self._files.items() if q.sheets}
+                    ready = [ref for ref, w in waiting.items() if w <= 0]
+                    if ready:
+                        break
+                    if not waiting:
+                        self._force = False
+                    self._cond.wait(min(waiting.values()) if waiting else None)
+                ref = ready[0]
+                q = self._files[ref]
+                batch, q.sheets = q.sheets, {}
+                q.status.syncing = True
+            err = None
+            try:
+                self._writer(ref, batch)
+            except Exception as e:  # noqa: BLE001 – błąd pokazujemy w UI
+                err = f"{type(e).__name__}: {e}"
+            with self._cond:
+                q.status.syncing = False
+                if err is None:
+                    q.status.last_ok = time.time()
+                    q.status.last_error = None
+                    q.status.failures = 0
+                else:
+                    q.sheets = {**batch, **q.sheets}
+                    q.last_change = time.monotonic()
+                    q.status.last_error = err
+                    q.status.failures += 1
+                    self._force = False
+                q.status.pending = len(q.sheets)
+                self._cond.notify_all()
+
+
+_SYNC: Optional[DriveSync] = None
+_SYNC_LOCK = threading.Lock()
+
+
+def get_sync() -> DriveSync:
+    """Jedna kolejka na proces; przy zamknięciu procesu zaległe zapisy są wysyłane."""
+    global _SYNC
+    with _SYNC_LOCK:
+        if _SYNC is None:
+            _SYNC = DriveSync()
+            atexit.register(_SYNC.flush, 30.0)
+        return _SYNC
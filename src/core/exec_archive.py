@@ -0,0 +1,206 @@
+# src/core/exec_archive.py
+from __future__ import annotations
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.audit_log import AUDIT_COLS, AuditLog
+from core.exec_store import YearStore
+
+try:  # pyarrow opcjonalny – bez niego dostępny tylko CSV (gzip)
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pa = feather = pq = None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Archiwum całego stanu (exec + audit): Parquet (rok/miesiąc), Arrow IPC, CSV.gz
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Jeden plik ZIP (ZIP_STORED – formaty są już skompresowane):
+#   manifest.json                       – format, kolumny, lata, wersja schematu
+#   parquet: exec/year=YYYY/month=M/…    audit/year=YYYY/month=M/…
+#   arrow:   exec.arrow, audit.arrow
+#   csv:     exec.csv.gz, audit.csv.gz
+# Wiersze exec bez żadnej wartości są pomijane (w magazynie i tak są NaN).
+
+FORMATS = {"parquet": "Parquet (rok/miesiąc)", "arrow": "Arrow IPC", "csv": "CSV (gzip)"}
+
+
+def available_formats() -> List[str]:
+    return list(FORMATS) if pa is not None else ["csv"]
+
+
+# --- Stan → tabele ---
+def exec_frame(exec_state: Mapping) -> Tuple[pd.DataFrame, List[str], List[int]]:
+    """(dni z danymi: year, month, data + kolumny schematu, kolumny, lata)."""
+    parts, columns, years = [], None, []
+    for y in sorted(exec_state):
+        store = exec_state[y]
+        if not isinstance(store, YearStore):
+            raise TypeError(f"exec[{y}] nie jest YearStore – uruchom najpierw migrate_to_new_schema()")
+        columns = columns or store.columns
+        years.append(int(y))
+        for m in range(1, 13):
+            store.ensure_loaded(m)
+        keep = ~np.isnan(store.values).all(axis=1)
+        df = pd.DataFrame(store.values[keep], columns=store.columns)
+        df.insert(0, "data", store.dates[keep])
+        df.insert(0, "month", store.dates[keep].month.astype("int16"))
+        df.insert(0, "year", np.int16(y))
+        parts.append(df)
+    if not parts:
+        return pd.DataFrame(columns=["year", "month", "data"]), [], []
+    return pd.concat(parts, ignore_index=True), list(columns), years
+
+
+def audit_frame(audit_state: Mapping) -> pd.DataFrame:
+    """Wszystkie wpisy audytu: year, month + AUDIT_COLS (kolejność dopisania w miesiącu)."""
+    parts = []
+    for y in sorted(audit_state):
+        for m in sorted(audit_state[y]):
+            log = audit_state[y][m]
+            if not isinstance(log, AuditLog) or len(log) == 0:
+                continue
+            df = log.to_frame()
+            df["uzytkownik"] = df["uzytkownik"].astype(object)
+            df["kolumna"] = df["kolumna"].astype(object)
+            df.insert(0, "month", np.int16(m))
+            df.insert(0, "year", np.int16(y))
+            parts.append(df)
+    if not parts:
+        return pd.DataFrame({"year": pd.Series(dtype="int16"), "month": pd.Series(dtype="int16"),
+                             **{c: pd.Series(dtype=t) for c, t in _AUDIT_DTYPES.items()}})
+    return pd.concat(parts, ignore_index=True)
+
+
+_AUDIT_DTYPES = {"czas": "datetime64[ns]", "uzytkownik": object, "data": "datetime64[ns]",
+                 "kolumna": object, "stara": "float64", "nowa": "float64"}
+
+
+# --- Zapis ---
+def _write_tables(fmt: str, root: str, ex: pd.DataFrame, au: pd.DataFrame) -> None:
+    if fmt == "parquet":
+        for name, df in (("exec", ex), ("audit", au)):
+            pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False),
+                                os.path.join(root, name), partition_cols=["year", "month"])
+    elif fmt == "arrow":
+        for name, df in (("exec", ex), ("audit", au)):
+            feather.write_feather(df.reset_index(drop=True), os.path.join(root, f"{name}.arrow"), compression="zstd")
+    elif fmt == "csv":
+        for name, df in (("exec", ex), ("audit", au)):
+            # float_format=None → repr (17 cyfr znaczących), więc odczyt odtwarza liczby co do bitu
+            df.to_csv(os.path.join(root, f"{name}.csv.gz"), index=False, compression="gzip")
+    else:
+        raise ValueError(f"Nieznany format archiwum: {fmt}")
+
+
+def export_archive(
+    exec_state: Mapping,
+    audit_state: Mapping,
+    fmt: str = "parquet",
+    dest: Optional[str] = None,
+    *,
+    schema_version: int = 0,
+) -> str:
+    """Cały stan do pliku ZIP w wybranym formacie; zwraca ścieżkę."""
+    if fmt != "csv" and pa is None:
+        raise RuntimeError("Format wymaga pakietu pyarrow.")
+    ex, columns, years = exec_frame(exec_state)
+    au = audit_frame(audit_state)
+    work = tempfile.mkdtemp(prefix="exec_archive_")
+    try:
+        _write_tables(fmt, work, ex, au)
+        manifest = {"format": fmt, "columns": columns, "years": years, "schema_version": int(schema_version)}
+        with open(os.path.join(work, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        if dest is None:
+            fd, dest = tempfile.mkstemp(prefix="wykonanie_", suffix=f".{fmt}.zip")
+            os.close(fd)
+        with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_STORED) as zf:
+            for base, _, files in os.walk(work):
+                for name in sorted(files):
+                    p = os.path.join(base, name)
+                    zf.write(p, arcname=os.path.relpath(p, work).replace(os.sep, "/"))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return dest
+
+
+# --- Odczyt ---
+def _read_tables(fmt: str, root: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    if fmt == "parquet":
+        out = []
+        for name in ("exec", "audit"):
+            path = os.path.join(root, name)
+            if not os.path.isdir(path):
+                out.append(pd.DataFrame(columns=["year", "month"]))
+                continue
+            df = pq.read_table(path).to_pandas()
+            for c in ("year", "month"):  # kolumny partycji wracają jako kategorie
+                df[c] = df[c].astype(str).astype("int16")
+            out.append(df)
+        return out[0], out[1]
+    if fmt == "arrow":
+        return tuple(feather.read_feather(os.path.join(root, f"{n}.arrow")) for n in ("exec", "audit"))
+    if fmt == "csv":
+        ex = pd.read_csv(os.path.join(root, "exec.csv.gz"), parse_dates=["data"], float_precision="round_trip")
+        au = pd.read_csv(os.path.join(root, "audit.csv.gz"), parse_dates=["czas", "data"],
+                         dtype={"uzytkownik": object, "kolumna": object}, keep_default_na=False,
+                         na_values={"stara": [""], "nowa": [""], "czas": [""], "data": [""]},
+                         float_precision="round_trip")
+        return ex, au
+    raise ValueError(f"Nieznany format archiwum: {fmt}")
+
+
+def import_archive(src, store_factory=None) -> Tuple[Dict[int, YearStore], Dict[int, Dict[int, AuditLog]], Dict]:
+    """
+    Odtwarza stan z archiwum: ({rok: YearStore}, {rok: {miesiąc: AuditLog}}, manifest).
+    `src` – ścieżka lub plik/bufor z ZIP-em; `store_factory(rok, kolumny)` tworzy pusty magazyn.
+    """
+    work = tempfile.mkdtemp(prefix="exec_archive_")
+    try:
+        if hasattr(src, "getvalue"):
+            src = io.BytesIO(src.getvalue())
+        with zipfile.ZipFile(src) as zf:
+            zf.extractall(work)
+        with open(os.path.join(work, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        fmt = manifest["format"]
+        if fmt != "csv" and pa is None:
+            raise RuntimeError("Archiwum wymaga pakietu pyarrow.")
+        ex, au = _read_tables(fmt, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    columns = manifest["columns"]
+    make = store_factory or (lambda y, cols: YearStore(y, cols))
+    exec_state: Dict[int, YearStore] = {}
+    for y in manifest["years"]:
+        store = exec_state[int(y)] = make(int(y), columns)
+        part = ex[ex["year"] == int(y)]
+        rows = store.day_ordinals(part["data"])
+        ok = rows >= 0
+        block = np.full_like(store.values, np.nan)
+        cols = [c for c in columns if c in part.columns]
+        idx = np.fromiter((store.col_index[c] for c in cols), dtype="int64", count=len(cols))
+        block[np.ix_(rows[ok], idx)] = part[cols].to_numpy(dtype="float64", na_value=np.nan)[ok]
+        for m in range(1, 13):
+            store.write_values(m, block[store.month_slice(m)])
+
+    audit_state: Dict[int, Dict[int, AuditLog]] = {}
+    if len(au):
+        for (y, m), part in au.groupby(["year", "month"], sort=True):
+            log = AuditLog.from_frame(part[AUDIT_COLS].reset_index(drop=True))
+            log.schema_version = int(manifest.get("schema_version", 0))
+            audit_state.setdefault(int(y), {})[int(m)] = log
+    return exec_state, audit_state, manifest
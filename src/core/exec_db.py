@@ -0,0 +1,191 @@
+# src/core/exec_db.py
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Trwały magazyn wykonania: lokalny SQLite (WAL), klucz (rok, miesiąc, dzień)
+# ──────────────────────────────────────────────────────────────────────────────
+
+_AUDIT_FIELDS = ["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"]
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class ExecDB:
+    """
+    Dane dzienne w tabeli `exec` (jedna kolumna REAL na kolumnę schematu) oraz
+    historia zmian w `audit` (indeks po roku/miesiącu). Jedno połączenie na plik,
+    współdzielone przez sesje – dostęp serializowany blokadą.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns: List[str] = list(dict.fromkeys(columns))
+        self._col_set = set(self.columns)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        cols = ", ".join(f"{_q(c)} REAL" for c in self.columns)
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS exec (year INTEGER NOT NULL, month INTEGER NOT NULL, "
+                f"day INTEGER NOT NULL, {cols}, PRIMARY KEY (year, month, day)) WITHOUT ROWID"
+            )
+            # nowe kolumny schematu dopisujemy do istniejącej bazy
+            have = {r[1] for r in self._conn.execute("PRAGMA table_info(exec)")}
+            for c in self.columns:
+                if c not in have:
+                    self._conn.execute(f"ALTER TABLE exec ADD COLUMN {_q(c)} REAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit (id INTEGER PRIMARY KEY, year INTEGER NOT NULL, "
+                "month INTEGER NOT NULL, czas INTEGER, uzytkownik TEXT, data INTEGER, kolumna TEXT, "
+                "stara REAL, nowa REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS audit_ym ON audit (year, month, id)")
+
+    # --- Odczyt ---
+    def load_month(self, year: int, month: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(dni miesiąca 1..31, wartości dni × kolumny); brak wierszy → puste tablice."""
+        sel = ", ".join(_q(c) for c in self.columns)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT day, {sel} FROM exec WHERE year = ? AND month = ? ORDER BY day", (year, month)
+            ).fetchall()
+        if not rows:
+            return np.empty(0, dtype="int64"), np.empty((0, len(self.columns)), dtype="float64")
+        arr = np.array(rows, dtype="float64")  # None → nan
+        return arr[:, 0].astype("int64"), arr[:, 1:]
+
+    def years(self) -> List[int]:
+        """Lata, dla których baza ma choć jeden dzień."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT year FROM exec ORDER BY year").fetchall()
+        return [int(r[0]) for r in rows]
+
+    def load_audit(self, year: int, month: int) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT czas, uzytkownik, data, kolumna, stara, nowa FROM audit "
+                "WHERE year = ? AND month = ? ORDER BY id", (year, month)
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=_AUDIT_FIELDS)
+        for c in ("czas", "data"):
+            df[c] = pd.to_datetime(df[c].astype("Int64"), unit="ns")
+        for c in ("stara", "nowa"):
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+        return df
+
+    # --- Zapis ---
+    def save_month(self, year: int, month: int, delta: pd.DataFrame) -> None:
+        """
+        Jedna transakcja: upsert tylko zmienionych komórek (dzień, kolumna) z `delta`
+        (wiersze audytu: data, kolumna, nowa) + dopisanie tych wierszy do audytu.
+        Pozostałe komórki dnia zostają w bazie nietknięte – zapis z innej sesji
+        (z własną, starszą kopią miesiąca) nie nadpisuje cudzych zmian.
+        """
+        self.save_many([(year, month, delta)])
+
+    def save_many(self, items: Sequence[Tuple[int, int, pd.DataFrame]]) -> None:
+        """Jak save_month dla wielu miesięcy naraz – wszystko w jednej transakcji (import)."""
+        cells: Dict[str, List[Tuple]] = {}
+        audit: List[Tuple] = []
+        for year, month, delta in items:
+            if delta is None or delta.empty:
+                continue
+            day = pd.to_datetime(delta["data"]).dt.day.tolist()
+            nowa = delta["nowa"].astype("float64").tolist()
+            for d, k, n in zip(day, delta["kolumna"], nowa):
+                if k in self._col_set:
+                    cells.setdefault(str(k), []).append((year, month, int(d), None if np.isnan(n) else n))
+            audit += self._audit_rows(year, month, delta)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for col, params in cells.items():
+                    self._conn.executemany(
+                        f"INSERT INTO exec (year, month, day, {_q(col)}) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT (year, month, day) DO UPDATE SET {_q(col)} = excluded.{_q(col)}", params
+                    )
+                self._insert_audit(audit)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def replace_all(
+        self,
+        months: Sequence[Tuple[int, int, np.ndarray, np.ndarray]],
+        audit: Sequence[Tuple[int, int, pd.DataFrame]] = (),
+    ) -> None:
+        """
+        Zastępuje całą zawartość bazy (przywrócenie archiwum, dane testowe) – jedna transakcja.
+        `months` – (rok, miesiąc, dni 1..31, wartości dni × wszystkie kolumny schematu; NaN → NULL),
+        `audit` – (rok, miesiąc, dziennik zmian) w kolejności wpisów.
+        """
+        cols = ", ".join(_q(c) for c in self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        params: List[Tuple] = []
+        for year, month, days, values in months:
+            obj = values.astype(object)
+            obj[np.isnan(values)] = None
+            params += [(year, month, int(d), *row) for d, row in zip(days, obj.tolist())]
+        rows = [r for year, month, df in audit for r in self._audit_rows(year, month, df)]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM exec")
+                self._conn.execute("DELETE FROM audit")
+                if params:
+                    self._conn.executemany(
+                        f"INSERT INTO exec (year, month, day, {cols}) VALUES (?, ?, ?, {marks})", params
+                    )
+                self._insert_audit(rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _audit_rows(year: int, month: int, delta: Optional[pd.DataFrame]) -> List[Tuple]:
+        if delta is None or delta.empty:
+            return []
+        czas = pd.to_datetime(delta["czas"]).to_numpy("datetime64[ns]").view("int64").tolist()
+        data = pd.to_datetime(delta["data"]).to_numpy("datetime64[ns]").view("int64").tolist()
+        stara = delta["stara"].astype("float64").tolist()
+        nowa = delta["nowa"].astype("float64").tolist()
+        return [
+            (year, month, t, str(u), d, str(k), None if np.isnan(o) else o, None if np.isnan(n) else n)
+            for t, u, d, k, o, n in zip(czas, delta["uzytkownik"], data, delta["kolumna"], stara, nowa)
+        ]
+
+    def _insert_audit(self, rows: List[Tuple]) -> None:
+        if rows:
+            self._conn.executemany(
+                "INSERT INTO audit (year, month, czas, uzytkownik, data, kolumna, stara, nowa) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+
+_DBS: Dict[str, ExecDB] = {}
+_DBS_LOCK = threading.Lock()
+
+
+def open_exec_db(path: str, columns: Sequence[str]) -> ExecDB:
+    """Jedna instancja ExecDB na plik w procesie (współdzielona przez sesje)."""
+    with _DBS_LOCK:
+        db = _DBS.get(path)
+        if db is None:
+            db = _DBS[path] = ExecDB(path, columns)
+        return db
@@ -0,0 +1,120 @@
+# src/core/exec_export.py
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Eksport wykonania: strumieniowo (openpyxl write_only), rok = osobny skoroszyt w ZIP
+# ──────────────────────────────────────────────────────────────────────────────
+
+MonthKey = Tuple[int, int]
+
+
+def sheet_name(year: int, month: int) -> str:
+    return f"WYKONANIE_{int(year)}_{int(month):02d}"[:31]
+
+
+def month_digest(df: pd.DataFrame) -> str:
+    """Skrót zawartości miesiąca (kolumny + wartości) – do eksportu przyrostowego."""
+    h = hashlib.sha1()
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    for c in df.columns:
+        v = df[c].to_numpy()
+        h.update(v.tobytes() if v.dtype.kind in "fiumM" else "\x1f".join(map(str, v)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def select_months(
+    exec_state: Mapping, start: MonthKey, end: MonthKey
+) -> Dict[int, List[int]]:
+    """{rok: [miesiące]} z sesji w zakresie (rok, miesiąc) od–do włącznie."""
+    lo, hi = tuple(start), tuple(end)
+    out: Dict[int, List[int]] = {}
+    for y, months in exec_state.items():
+        ms = [int(m) for m in months if lo <= (int(y), int(m)) <= hi]
+        if ms:
+            out[int(y)] = sorted(ms)
+    return out
+
+
+def _cell_rows(df: pd.DataFrame) -> Iterable[list]:
+    """Wiersze do ws.append – NaN/NaT → puste komórki, daty jako datetime."""
+    cols = []
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            cols.append([None if pd.isna(x) else x.to_pydatetime() for x in s])
+        elif pd.api.types.is_numeric_dtype(s):
+            v = s.to_numpy(dtype="float64", na_value=np.nan)
+            cols.append([None if x != x else x for x in v.tolist()])
+        else:
+            cols.append([None if pd.isna(x) else x for x in s.tolist()])
+    return zip(*cols) if cols else iter(())
+
+
+def write_year_workbook(path: str, year: int, months: Mapping[int, pd.DataFrame]) -> None:
+    """Jeden rok → plik .xlsx (tryb write_only: wiersze idą od razu na dysk, stała pamięć)."""
+    from openpyxl import Workbook  # import dopiero przy eksporcie (zimny start strony)
+
+    wb = Workbook(write_only=True)
+    for m in sorted(months):
+        df = months[m]
+        ws = wb.create_sheet(sheet_name(year, m))
+        ws.append([str(c) for c in df.columns])
+        for row in _cell_rows(df):
+            ws.append(list(row))
+    wb.save(path)
+
+
+def export_exec_zip(
+    exec_state: Mapping,
+    selection: Mapping[int, Iterable[int]],
+    dest: Optional[str] = None,
+    *,
+    previous: Optional[Mapping[str, str]] = None,
+    max_workers: int = 4,
+) -> Tuple[Optional[str], Dict[str, str], List[MonthKey]]:
+    """
+    Eksport wybranych miesięcy do ZIP-a z plikami `wykonanie_<rok>.xlsx` (lata równolegle,
+    każdy do pliku tymczasowego). Z `previous` ({arkusz: skrót} z poprzedniego eksportu)
+    zapisywane są tylko miesiące zmienione od tamtej pory.
+    Zwraca (ścieżka ZIP lub None, gdy nic do zapisu, aktualne skróty, zapisane miesiące).
+    """
+    digests: Dict[str, str] = dict(previous or {})
+    todo: Dict[int, Dict[int, pd.DataFrame]] = {}
+    for y, ms in selection.items():
+        for m in ms:
+            df = exec_state[y][m]
+            name = sheet_name(y, m)
+            dg = month_digest(df)
+            if previous is not None and previous.get(name) == dg:
+                continue
+            digests[name] = dg
+            todo.setdefault(int(y), {})[int(m)] = df
+    written = [(y, m) for y in sorted(todo) for m in sorted(todo[y])]
+    if not todo:
+        return None, digests, written
+
+    tmpdir = tempfile.mkdtemp(prefix="wykonanie_export_")
+    parts = {y: os.path.join(tmpdir, f"wykonanie_{y}.xlsx") for y in todo}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as pool:
+        list(pool.map(lambda y: write_year_workbook(parts[y], y, todo[y]), todo))
+
+    if dest is None:
+        fd, dest = tempfile.mkstemp(prefix="wykonanie_export_", suffix=".zip")
+        os.close(fd)
+    # .xlsx jest już skompresowany – ZIP tylko pakuje (ZIP_STORED), plik po pliku z dysku
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_STORED) as zf:
+        for y in sorted(parts):
+            zf.write(parts[y], arcname=os.path.basename(parts[y]))
+            os.remove(parts[y])
+    os.rmdir(tmpdir)
+    return dest, digests, written
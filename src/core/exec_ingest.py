@@ -0,0 +1,205 @@
+# src/core/exec_ingest.py
+from __future__ import annotations
+
+import io
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import _canon, _pick_col
+from core.schema import REGISTRY
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Import danych operacyjnych (raw_matrix / raw / cost*) – strumieniowo, w paczkach
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Arkusz czytany jest wierszami (openpyxl read_only) w paczkach po `chunk_rows`;
+# każda paczka trafia od razu do tablic roboczych roku (dni × kolumny schematu),
+# więc pamięć zależy od liczby lat, a nie od wielkości arkusza.
+# Obsługiwane układy:
+#   - „długi”   – kolumna daty + kolumny miar (raw, cost*),
+#   - „macierz” – pierwsza kolumna = nazwa miary, nagłówki kolejnych = daty (raw_matrix).
+
+DATE_VARIANTS = ["data", "date", "dzien", "dzień", "day", "dzień operacyjny"]
+CHUNK_ROWS = 5000
+
+
+def is_operational_sheet(name: str) -> bool:
+    c = _canon(name)
+    return c in ("rawmatrix", "raw") or c.startswith("cost") or c.startswith("koszt")
+
+
+def column_resolver(columns: Sequence[str] = REGISTRY.columns) -> Dict[str, str]:
+    """Kanoniczna nazwa → kolumna schematu (nowe nazwy oraz dawne aliasy z REGISTRY)."""
+    wanted = set(columns)
+    out = {_canon(a): s.name for s in REGISTRY.specs.values() if s.name in wanted for a in s.aliases}
+    out.update({_canon(c): c for c in columns})
+    return out
+
+
+def parse_pl_numbers(values: Sequence) -> np.ndarray:
+    """
+    Wektorowo: liczby w polskim zapisie → float64 („1 234,56”, „1.234,56 zł”, „-3”).
+    Tekst z „%” to ułamek jak komórka procentowa Excela („12,5%” → 0.125).
+    Komórki liczbowe przechodzą bez zmian; nieczytelne → NaN.
+    """
+    s = pd.Series(values, dtype=object)
+    out = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+    txt_mask = s.map(type).eq(str).to_numpy()
+    if txt_mask.any():
+        pct = s[txt_mask].str.contains("%", regex=False).to_numpy()
+        t = s[txt_mask].str.replace(r"[\s\u00a0\u202f]|zł|PLN|%", "", regex=True)
+        both = t.str.contains(",", regex=False) & t.str.contains(".", regex=False)
+        t = t.where(~both, t.str.replace(".", "", regex=False))  # kropka = separator tysięcy
+        t = t.str.replace(",", ".", regex=False)
+        t = t.str.replace(r"^\((.*)\)$", r"-\1", regex=True)     # (12,5) → -12.5
+        num = pd.to_numeric(t, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        out[txt_mask] = np.where(pct, num / 100.0, num)
+    return out
+
+
+def parse_dates(values: Sequence) -> np.ndarray:
+    """Daty z komórek (datetime / „31.01.2025” / „2025-01-31”) → datetime64[D]; nieczytelne → NaT."""
+    s = pd.Series(values, dtype=object)
+    iso = s.map(lambda v: isinstance(v, str) and len(v) >= 10 and v[4] == "-")
+    d = pd.to_datetime(s.where(~iso), errors="coerce", dayfirst=True, format="mixed")
+    if iso.any():
+        d = d.where(~iso, pd.to_datetime(s.where(iso), errors="coerce", format="mixed"))
+    return d.to_numpy("datetime64[D]")
+
+
+@dataclass
+class IngestReport:
+    sheets: List[str] = field(default_factory=list)
+    rows: int = 0
+    cells: int = 0
+    unmapped: Dict[str, List[str]] = field(default_factory=dict)  # arkusz → nieznane nagłówki
+    bad_dates: int = 0
+
+
+class StagedYears:
+    """Tablice robocze per rok: wartości + maska komórek podanych w imporcie."""
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(dict.fromkeys(columns))
+        self.years: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _year(self, y: int) -> Tuple[np.ndarray, np.ndarray]:
+        if y not in self.years:
+            n = 366 if pd.Timestamp(year=y, month=12, day=31).dayofyear == 366 else 365
+            self.years[y] = (np.full((n, len(self.columns)), np.nan), np.zeros((n, len(self.columns)), dtype=bool))
+        return self.years[y]
+
+    def put(self, days: np.ndarray, cols: np.ndarray, vals: np.ndarray) -> int:
+        """Rozrzuca trójki (dzień, kolumna, wartość) do lat; NaN pomijane. Zwraca liczbę komórek."""
+        ok = ~np.isnat(days) & ~np.isnan(vals)
+        days, cols, vals = days[ok], cols[ok], vals[ok]
+        if not len(days):
+            return 0
+        years = days.astype("datetime64[Y]").astype("int64") + 1970
+        for y in np.unique(years).tolist():
+            sel = years == y
+            v, t = self._year(int(y))
+            rows = (days[sel] - np.datetime64(f"{y}-01-01", "D")).astype("int64")
+            v[rows, cols[sel]] = vals[sel]   # późniejszy wiersz nadpisuje wcześniejszy
+            t[rows, cols[sel]] = True
+        return int(ok.sum())
+
+
+def _date_column(header: Sequence) -> Optional[str]:
+    """Nagłówek kolumny daty (po kanonizacji jak w config._pick_col) albo None."""
+    names = [str(h) if h is not None else "" for h in header]
+    return _pick_col(pd.DataFrame([[None] * len(names)], columns=names), DATE_VARIANTS)
+
+
+def _chunks(it: Iterator, size: int) -> Iterator[List]:
+    while True:
+        block = list(itertools.islice(it, size))
+        if not block:
+            return
+        yield block
+
+
+def _stage_long(rows: Iterator, header: List, resolver: Dict[str, str], staged: StagedYears,
+                rep: IngestReport, sheet: str, chunk_rows: int) -> None:
+    names = [str(h) if h is not None else "" for h in header]
+    di = names.index(_date_column(header))
+    targets = []
+    for i, h in enumerate(names):
+        if i == di or not h:
+            continue
+        tgt = resolver.get(_canon(h))
+        if tgt is None:
+            rep.unmapped.setdefault(sheet, []).append(h)
+        else:
+            targets.append((i, staged.columns.index(tgt)))
+    if not targets:
+        return
+    src_idx = [i for i, _ in targets]
+    col_idx = np.array([c for _, c in targets], dtype="int64")
+    width = len(names)
+    for block in _chunks(rows, chunk_rows):
+        arr = np.array([list(r[:width]) + [None] * (width - len(r)) for r in block], dtype=object)
+        days = parse_dates(arr[:, di])
+        rep.bad_dates += int(np.isnat(days).sum())
+        vals = np.column_stack([parse_pl_numbers(arr[:, i]) for i in src_idx])
+        n = len(block)
+        rep.rows += n
+        rep.cells += staged.put(np.repeat(days, len(col_idx)), np.tile(col_idx, n), vals.ravel())
+
+
+def _stage_matrix(rows: Iterator, header: List, resolver: Dict[str, str], staged: StagedYears,
+                  rep: IngestReport, sheet: str, chunk_rows: int) -> None:
+    days = parse_dates(header[1:])
+    rep.bad_dates += int(np.isnat(days).sum())
+    for block in _chunks(rows, chunk_rows):
+        for r in block:
+            if not r or r[0] is None:
+                continue
+            tgt = resolver.get(_canon(r[0]))
+            if tgt is None:
+                rep.unmapped.setdefault(sheet, []).append(str(r[0]))
+                continue
+            vals = parse_pl_numbers(list(r[1:len(header)]) + [None] * (len(header) - len(r)))
+            rep.rows += 1
+            rep.cells += staged.put(days, np.full(len(days), staged.columns.index(tgt)), vals)
+
+
+def stage_workbook(
+    src,
+    columns: Sequence[str] = REGISTRY.columns,
+    *,
+    sheet_names: Optional[Iterable[str]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Tuple[StagedYears, IngestReport]:
+    """
+    Czyta arkusze operacyjne (domyślnie raw_matrix / raw / cost*) z pliku (ścieżka, bajty,
+    upload) i zbiera wartości w tablicach roboczych lat. Nic nie zapisuje do sesji.
+    """
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    elif hasattr(src, "getvalue"):
+        src = io.BytesIO(src.getvalue())
+    from openpyxl import load_workbook  # ~110 ms importu – dopiero przy pierwszym wgraniu pliku
+
+    wb = load_workbook(src, read_only=True, data_only=True)
+    staged, rep = StagedYears(columns), IngestReport()
+    resolver = column_resolver(staged.columns)
+    try:
+        names = list(sheet_names) if sheet_names is not None else [n for n in wb.sheetnames if is_operational_sheet(n)]
+        for name in names:
+            rows = wb[name].iter_rows(values_only=True)
+            header = list(next(rows, None) or [])
+            if not header:
+                continue
+            rep.sheets.append(name)
+            if _date_column(header):
+                _stage_long(rows, header, resolver, staged, rep, name, chunk_rows)
+            else:
+                _stage_matrix(rows, header, resolver, staged, rep, name, chunk_rows)
+    finally:
+        wb.close()
+    return staged, rep
@@ -0,0 +1,247 @@
+# src/core/exec_store.py
+from __future__ import annotations
+
+import itertools
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Kolumnowy magazyn roku: jedna tablica float64 (dni × kolumny schematu)
+# ──────────────────────────────────────────────────────────────────────────────
+
+
+def _is_missing(v: np.ndarray) -> np.ndarray:
+    return np.isnan(v) | (v == 0.0)
+
+
+_GENERATIONS = itertools.count(1)
+
+
+def next_generation() -> int:
+    """
+    Kolejny numer generacji – wspólny licznik procesu (rośnie monotonicznie).
+    Numer nadany przy zapisie nie powtórzy się w innym obiekcie, więc sama generacja
+    (bez id obiektu) jest bezpiecznym kluczem cache, także po podmianie magazynu.
+    """
+    return next(_GENERATIONS)
+
+
+class YearStore(Mapping):
+    """
+    Dane wykonania jednego roku w jednej, prealokowanej tablicy float64.
+    - wiersz   = ordinal dnia w roku (0 = 1 stycznia),
+    - kolumna  = stały indeks kolumny schematu (kolejność z `columns`).
+    Dla zgodności zachowuje się jak {miesiąc: DataFrame} – exec[rok][m] oddaje
+    widok miesiąca bez kopiowania danych.
+    """
+
+    def __init__(
+        self,
+        year: int,
+        columns: Sequence[str],
+        frame_attrs: Optional[Dict] = None,
+        loader: Optional[Callable[[int], Tuple[np.ndarray, np.ndarray]]] = None,
+    ):
+        self.year = int(year)
+        self.frame_attrs = dict(frame_attrs or {})  # np. znacznik wersji schematu dla widoków
+        self.columns: List[str] = list(dict.fromkeys(columns))  # bez duplikatów, stała kolejność
+        self.col_index = {c: i for i, c in enumerate(self.columns)}
+        self.dates = pd.date_range(f"{self.year}-01-01", f"{self.year}-12-31", freq="D").astype("datetime64[ns]")
+        self.values = np.full((len(self.dates), len(self.columns)), np.nan, dtype="float64")
+        # month_start[m-1]..month_start[m] = wiersze miesiąca m
+        self.month_start = np.searchsorted(self.dates.month, np.arange(1, 14))
+        self.generation = next_generation()  # zmienia się wyłącznie przy zapisie
+        # leniwe ładowanie miesięcy z trwałego magazynu: loader(m) → (dni miesiąca 1..31, wartości)
+        self._loader = loader
+        self._loaded = np.full(12, loader is None, dtype=bool)
+        # cache agregatów: sumy kolumn per miesiąc + sumy narastające (YTD)
+        self._month_sums = np.zeros((12, len(self.columns)), dtype="float64")
+        self._sums_ok = np.zeros(12, dtype=bool)
+        self._prefix = np.zeros((13, len(self.columns)), dtype="float64")
+        self._prefix_valid = 0  # prefix[0..k] aktualne dla k = _prefix_valid
+        # indeks braków: True = komórka pusta (NaN) albo 0; aktualizowany tylko dla zmienionych komórek
+        self.missing = np.ones(self.values.shape, dtype=bool)
+        self.month_gen = np.full(12, self.generation, dtype="int64")  # generacja per miesiąc
+        self._fill_cache: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]] = {}
+
+    # --- Mapping {miesiąc: DataFrame} ---
+    def __getitem__(self, month: int) -> pd.DataFrame:
+        if not isinstance(month, (int, np.integer)) or not 1 <= int(month) <= 12:
+            raise KeyError(month)
+        return self.month_frame(int(month))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(1, 13))
+
+    def __len__(self) -> int:
+        return 12
+
+    # --- Indeksowanie ---
+    def month_slice(self, month: int) -> slice:
+        return slice(int(self.month_start[month - 1]), int(self.month_start[month]))
+
+    def day_ordinals(self, dates) -> np.ndarray:
+        """Daty → wiersze tablicy (-1 dla dat spoza roku)."""
+        d = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy("datetime64[D]")
+        start = np.datetime64(f"{self.year}-01-01", "D")
+        out = (d - start).astype("int64")
+        bad = np.isnat(d) | (out < 0) | (out >= len(self.dates))
+        out[bad] = -1
+        return out
+
+    def ensure_loaded(self, month: int) -> None:
+        """Dociąga miesiąc z loadera (np. SQLite), jeśli jeszcze nie wczytany – przed odczytem `values`."""
+        if self._loaded[month - 1]:
+            return
+        sl = self.month_slice(month)
+        days, vals = self._loader(month)
+        rows = sl.start + np.asarray(days, dtype="int64") - 1
+        ok = (rows >= sl.start) & (rows < sl.stop)
+        self.values[rows[ok]] = vals[ok]
+        self.missing[sl] = _is_missing(self.values[sl])
+        self._loaded[month - 1] = True
+
+    def is_loaded(self, month: int) -> bool:
+        return bool(self._loaded[month - 1])
+
+    # --- Odczyt ---
+    def month_frame(self, month: int) -> pd.DataFrame:
+        """Widok miesiąca (bez kopii); tylko do odczytu – zapis idzie przez write_month."""
+        self.ensure_loaded(month)
+        sl = self.month_slice(month)
+        view = self.values[sl]
+        view.flags.writeable = False
+        df = pd.DataFrame(view, columns=self.columns, copy=False)
+        df.insert(0, "data", self.dates[sl])
+        df.attrs.update(self.frame_attrs)
+        return df
+
+    # --- Zapis ---
+    def write_month(self, month: int, df: pd.DataFrame) -> None:
+        """
+        Zastępuje cały miesiąc danymi z `df` (kolumna 'data' + kolumny schematu).
+        Kolumny schematu, których nie ma w `df`, oraz brakujące dni → NaN.
+        Kolumny spoza schematu są pomijane.
+        """
+        sl = self.month_slice(month)
+        block = np.full((sl.stop - sl.start, len(self.columns)), np.nan, dtype="float64")
+        if df is not None and not df.empty and "data" in df.columns:
+            rows = self.day_ordinals(df["data"]) - sl.start
+            ok = (rows >= 0) & (rows < block.shape[0])
+            cols = [c for c in df.columns if c in self.col_index]
+            if cols and ok.any():
+                vals = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+                idx = np.fromiter((self.col_index[c] for c in cols), dtype="int64", count=len(cols))
+                block[np.ix_(rows[ok], idx)] = vals[ok]
+        self.write_values(month, block)
+
+    def write_values(self, month: int, block: np.ndarray) -> None:
+        """Zastępuje miesiąc gotową tablicą (dni miesiąca × kolumny, kolejność `columns`)."""
+        sl = self.month_slice(month)
+        if self._loaded[month - 1]:
+            old = self.values[sl]
+            r, c = np.nonzero((old != block) & ~(np.isnan(old) & np.isnan(block)))
+            self.missing[sl.start + r, c] = _is_missing(block[r, c])
+        else:  # miesiąc jeszcze nie wczytany – zastępujemy w całości, bez odczytu z bazy
+            self.missing[sl] = _is_missing(block)
+        self.values[sl] = block
+        self._loaded[month - 1] = True
+        self.generation = self.month_gen[month - 1] = next_generation()
+        self.invalidate(month)
+
+    def write_cells(
+        self, month: int, rows: np.ndarray, cols: np.ndarray, vals: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Zapis pojedynczych komórek miesiąca: `rows` – dni miesiąca od 0, `cols` – indeksy kolumn.
+        Koszt ~ liczba komórek: sumy miesiąca i narastające korygowane o różnice (bez przeliczania),
+        indeks braków tylko dla zapisanych komórek. Zwraca faktycznie zmienione (rows, cols, stare, nowe).
+        """
+        self.ensure_loaded(month)
+        sl = self.month_slice(month)
+        rows, cols = np.asarray(rows, dtype="int64"), np.asarray(cols, dtype="int64")
+        vals = np.asarray(vals, dtype="float64")
+        ok = (rows >= 0) & (rows < sl.stop - sl.start)
+        rows, cols, vals = rows[ok], cols[ok], vals[ok]
+        # powtórzona komórka – zostaje ostatnia wartość (jak przy przypisaniu), różnica liczona raz
+        _, last = np.unique((rows * len(self.columns) + cols)[::-1], return_index=True)
+        if len(last) < len(rows):
+            keep = np.sort(len(rows) - 1 - last)
+            rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        old = self.values[sl.start + rows, cols]
+        changed = (old != vals) & ~(np.isnan(old) & np.isnan(vals))
+        rows, cols, old, vals = rows[changed], cols[changed], old[changed], vals[changed]
+        if len(rows) == 0:
+            return rows, cols, old, vals
+        r = sl.start + rows
+        self.values[r, cols] = vals
+        self.missing[r, cols] = _is_missing(vals)
+        diff = np.bincount(cols, weights=np.nan_to_num(vals) - np.nan_to_num(old), minlength=len(self.columns))
+        if self._sums_ok[month - 1]:
+            self._month_sums[month - 1] += diff
+        if self._prefix_valid >= month:
+            self._prefix[month:self._prefix_valid + 1] += diff
+        self.generation = self.month_gen[month - 1] = next_generation()
+        return rows, cols, old, vals
+
+    # --- Braki (indeks bitowy) ---
+    def missing_mask(self, month: int, columns: Sequence[str]) -> np.ndarray:
+        """Maska braków miesiąca (dni × `columns`; kolumny spoza schematu pominięte)."""
+        self.ensure_loaded(month)
+        idx = [self.col_index[c] for c in columns if c in self.col_index]
+        return self.missing[self.month_slice(month)][:, idx]
+
+    def fill_ratio(self, columns: Sequence[str]) -> np.ndarray:
+        """
+        Udział uzupełnionych komórek `columns` per dzień roku (0..1).
+        Wynik trzymany per zestaw kolumn; po zapisie przeliczane są tylko zmienione miesiące.
+        """
+        key = tuple(c for c in columns if c in self.col_index)
+        revs, ratio = self._fill_cache.get(key, (None, None))
+        if ratio is None:
+            revs, ratio = np.full(12, -1, dtype="int64"), np.zeros(len(self.dates))
+            self._fill_cache[key] = (revs, ratio)
+        idx = [self.col_index[c] for c in key]
+        for m in np.nonzero(revs != self.month_gen)[0] + 1:
+            sl = self.month_slice(int(m))
+            self.ensure_loaded(int(m))
+            ratio[sl] = 1.0 - self.missing[sl][:, idx].mean(axis=1) if idx else 0.0
+            revs[m - 1] = self.month_gen[m - 1]
+        return ratio
+
+    # --- Agregaty (cache) ---
+    def invalidate(self, month: int) -> None:
+        """Unieważnia sumy tylko zmienionego miesiąca (i sumy narastające od niego)."""
+        self._sums_ok[month - 1] = False
+        self._prefix_valid = min(self._prefix_valid, month - 1)
+
+    def month_sum(self, month: int) -> np.ndarray:
+        """Sumy kolumn miesiąca (NaN liczone jako 0); liczone tylko, gdy miesiąc się zmienił."""
+        i = month - 1
+        if not self._sums_ok[i]:
+            self.ensure_loaded(month)
+            self._month_sums[i] = np.nansum(self.values[self.month_slice(month)], axis=0)
+            self._sums_ok[i] = True
+        return self._month_sums[i]
+
+    def month_sums(self) -> np.ndarray:
+        """Sumy kolumn per miesiąc (12 × kolumny); kilka nieaktualnych miesięcy – jedna redukcja po roku."""
+        if (~self._sums_ok).sum() > 1:
+            for m in range(1, 13):
+                self.ensure_loaded(m)
+            v = self.values
+            self._month_sums[:] = np.add.reduceat(np.where(np.isnan(v), 0.0, v), self.month_start[:-1], axis=0)
+            self._sums_ok[:] = True
+        for m in range(1, 13):
+            self.month_sum(m)
+        return self._month_sums
+
+    def ytd_sums(self, month: int) -> np.ndarray:
+        """Sumy kolumn od stycznia do `month` włącznie (z sum prefiksowych; dociąga tylko brakujące)."""
+        for i in range(self._prefix_valid, month):
+            self._prefix[i + 1] = self._prefix[i] + self.month_sum(i + 1)
+        self._prefix_valid = max(self._prefix_valid, month)
+        return self._prefix[month]
@@ -105,3 +105,20 @@ def compute_kpis(df: pd.DataFrame, names: list[str]):
         if missing: missing_all.update(missing)
         out.append((label, val))
     return out, sorted(missing_all)
+
+# ── KPI departamentów z sum grup (schema.REGISTRY.kpi_totals) – wspólne dla core.state i core.state_local
+def rooms_kpi(a: dict) -> dict:
+    avail = a["dostepne"] - a["oos"]
+    sold = a["sprzedane"]
+    revenue = a["przychod_pokoje"]
+    return {
+        "zdolnosc": avail,
+        "sprzedane": sold,
+        "frekwencja": (sold / avail) if avail > 0 else 0.0,
+        "revpor": (revenue / sold) if sold > 0 else 0.0,
+        "k_wydzialowe": a["koszt_r"],
+        "wynik": revenue - a["koszt_r"],
+    }
+
+def fnb_kpi(a: dict) -> dict:
+    return {"sprzedaz_fnb": a["fnb"], "g_k_razem": a["koszt_g"], "g_wynik": a["fnb"] - a["koszt_g"]}
@@ -0,0 +1,43 @@
+# src/core/memo.py
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Iterable, Optional, TypeVar
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cache wyników w sesji – jedna pozycja na slot
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Osobny, lekki moduł: strony, które potrzebują tylko memoize / fingerprint (pulpity, Pokoje),
+# nie ładują magazynu, bazy, importów z core.state_local ani plotly.
+
+T = TypeVar("T")
+
+
+def memoize(slot: str, key, build: Callable[[], T]) -> T:
+    """
+    Jedna pozycja cache sesji na `slot`: zwraca zapamiętany wynik, gdy `key` się nie zmienił
+    (klucz zwykle z year_generation / month_generation), inaczej wywołuje `build()`.
+    """
+    cache = st.session_state.setdefault("_memo", {})
+    hit = cache.get(slot)
+    if hit is None or hit[0] != key:
+        hit = cache[slot] = (key, build())
+    return hit[1]
+
+
+def fingerprint(df: pd.DataFrame, cols: Optional[Iterable[str]] = None) -> str:
+    """Odcisk treści kolumn `cols` (domyślnie wszystkich) razem z indeksem, nazwami i typami."""
+    cols = list(df.columns) if cols is None else [c for c in cols if c in df.columns]
+    h = hashlib.blake2b(digest_size=16)
+    for name, values in [("<index>", df.index.to_numpy())] + [(c, df[c].to_numpy()) for c in cols]:
+        h.update(f"{name}:{values.dtype}|".encode("utf-8"))
+        if values.dtype.kind in "biufcmM":  # liczby / daty – surowe bajty, bez haszowania wierszy
+            h.update(np.ascontiguousarray(values).tobytes())
+        else:
+            h.update(pd.util.hash_array(values.astype(object)).tobytes())
+    return h.hexdigest()
@@ -0,0 +1,133 @@
+# src/core/page_registry.py
+from __future__ import annotations
+
+import importlib
+import os
+import sys
+import threading
+import time
+import traceback
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Rejestr stron: import modułu dopiero przy pierwszym wejściu + profil startu
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Stan żyje w module (raz na proces serwera), więc powtórne uruchomienia skryptu
+# Streamlit (rerun) nie importują stron ponownie, a profil obejmuje zimny start.
+# Czasy: wall-clock importu (z zależnościami, których jeszcze nie było w sys.modules).
+
+_T0 = time.perf_counter()  # ~ pierwsze uruchomienie skryptu aplikacji w procesie
+_LOCK = threading.Lock()
+
+_PAGES: Dict[str, Tuple[str, ...]] = {}           # strona → kandydaci na moduł (pierwszy istniejący)
+_LOADED: Dict[str, Optional[ModuleType]] = {}     # strona → moduł (None = import nieudany)
+_REPORT: List[Dict] = []                          # wpisy profilu (importy stron + etapy)
+_MARKED: set = set()
+
+
+def budget_ms() -> float:
+    """Budżet zimnego startu (env STARTUP_BUDGET_MS, domyślnie 3000 ms)."""
+    try:
+        return float(os.environ.get("STARTUP_BUDGET_MS", "3000"))
+    except ValueError:
+        return 3000.0
+
+
+def _since_start_ms() -> float:
+    return (time.perf_counter() - _T0) * 1000.0
+
+
+def register(name: str, *modules: str) -> None:
+    """Rejestruje stronę; `modules` – ścieżki importu w kolejności prób (np. stara i nowa lokalizacja)."""
+    _PAGES.setdefault(name, tuple(modules))
+
+
+def _import_first(paths: Tuple[str, ...]) -> Tuple[Optional[ModuleType], str, Optional[str]]:
+    error = None
+    for path in paths:
+        try:
+            return importlib.import_module(path), path, None
+        except ModuleNotFoundError as e:
+            if e.name != path and not path.startswith(f"{e.name}."):
+                error = traceback.format_exc(limit=3)  # brakuje zależności strony, nie samej strony
+                return None, path, error
+            error = f"ModuleNotFoundError: {path}"
+        except Exception:
+            return None, path, traceback.format_exc(limit=3)
+    return None, ", ".join(paths), error
+
+
+def get_page(name: str) -> Optional[ModuleType]:
+    """Moduł strony – importowany przy pierwszym wywołaniu (czas i błąd trafiają do profilu)."""
+    if name in _LOADED:
+        return _LOADED[name]
+    with _LOCK:
+        if name in _LOADED:
+            return _LOADED[name]
+        paths = _PAGES.get(name, ())
+        before = len(sys.modules)
+        t = time.perf_counter()
+        mod, path, error = _import_first(paths) if paths else (None, "", f"Nieznana strona: {name}")
+        took = (time.perf_counter() - t) * 1000.0
+        _REPORT.append({
+            "etap": f"import: {name}",
+            "moduł": path,
+            "czas_ms": round(took, 1),
+            "od_startu_ms": round(_since_start_ms(), 1),
+            "nowe_moduły": len(sys.modules) - before,
+            "błąd": error,
+        })
+        _LOADED[name] = mod
+        return mod
+
+
+def mark(stage: str) -> None:
+    """Jednorazowy znacznik etapu (np. pierwszy render) – czas od startu procesu aplikacji."""
+    if stage in _MARKED:
+        return
+    _MARKED.add(stage)
+    _REPORT.append({"etap": stage, "moduł": "", "czas_ms": None,
+                    "od_startu_ms": round(_since_start_ms(), 1), "nowe_moduły": None, "błąd": None})
+
+
+def startup_report() -> List[Dict]:
+    """Wpisy profilu startu w kolejności zdarzeń; `ponad_budżet` względem budget_ms()."""
+    limit = budget_ms()
+    return [dict(r, ponad_budżet=r["od_startu_ms"] > limit) for r in _REPORT]
+
+
+def loaded_pages() -> List[str]:
+    return [n for n, m in _LOADED.items() if m is not None]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Profil zimnego startu: python -m core.page_registry [strona ...]
+# (import Operacje + wskazane strony, domyślnie wszystkie zarejestrowane)
+# ──────────────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+
+    reg = sys.modules[__name__]
+    sys.modules["core.page_registry"] = reg  # Operacje rejestruje strony w tej samej instancji
+    parser = argparse.ArgumentParser(description="Profil zimnego startu aplikacji")
+    parser.add_argument("pages", nargs="*", help="strony do zaimportowania (domyślnie wszystkie)")
+    args = parser.parse_args()
+
+    before, t = len(sys.modules), time.perf_counter()
+    importlib.import_module("Operacje")
+    _REPORT.insert(0, {"etap": "import: Operacje", "moduł": "Operacje",
+                       "czas_ms": round((time.perf_counter() - t) * 1000.0, 1),
+                       "od_startu_ms": round(_since_start_ms(), 1), "nowe_moduły": len(sys.modules) - before,
+                       "błąd": None})
+    for name in args.pages or list(_PAGES):
+        get_page(name)
+    for row in startup_report():
+        flag = "  !" if row["ponad_budżet"] else ""
+        took = "" if row["czas_ms"] is None else f"{row['czas_ms']:8.1f} ms"
+        print(f"{row['etap']:<28} {took:>11}  od startu {row['od_startu_ms']:8.1f} ms  "
+              f"moduły +{row['nowe_moduły'] or 0}{flag}")
+        if row["błąd"]:
+            print("    " + row["błąd"].strip().replace("\n", "\n    "))
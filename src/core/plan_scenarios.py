@@ -0,0 +1,217 @@
+# src/core/plan_scenarios.py
+from __future__ import annotations
+
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.exec_store import next_generation
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Scenariusze planu: plan bazowy + nadpisania komórek per scenariusz (copy-on-write)
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Scenariusz = posortowane klucze komórek (wiersz * liczba_kolumn + kolumna) + wartości.
+# Plan bazowy trzymany jest raz; materializacja kopiuje tylko kolumny z nadpisaniami
+# (reszta to widoki bazy – pandas copy-on-write). Klucze liczone są od pozycji wiersza
+# w planie bazowym, więc nowa baza przychodzi z mapą wierszy (skąd pochodzi każdy wiersz:
+# indeks z data_editor albo kolumna etykiet, np. miesiąc) – nadpisania idą za swoimi
+# wierszami, a odrzucane są tylko te z usuniętych wierszy/kolumn (set_base zwraca ich liczbę).
+
+BASE = "bazowy"
+
+
+class PlanScenarios:
+    def __init__(self, base: pd.DataFrame):
+        self._scen: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # nazwa → (klucze, wartości)
+        self._gen: Dict[str, int] = {}                               # nazwa → generacja nadpisań
+        self._cache: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+        self.set_base(base)
+
+    # --- Plan bazowy ---
+    def set_base(self, base: pd.DataFrame, rows: Optional[Sequence[int]] = None, label: Optional[str] = None) -> int:
+        """
+        Nowy plan bazowy. `rows[i]` = pozycja wiersza i w dotychczasowej bazie (-1 – nowy wiersz);
+        bez `rows` wiersze łączy unikalna kolumna `label`, a bez niej – pozycja (przy tej samej liczbie wierszy).
+        Nadpisania przechodzą na swoje wiersze; zwraca liczbę odrzuconych (usunięte wiersze/kolumny).
+        """
+        old = getattr(self, "base", None)
+        old_cols = list(getattr(self, "columns", []))
+        base = base.reset_index(drop=True)
+        if old is None:
+            src = np.zeros(0, dtype="int64")
+        elif rows is not None:
+            src = np.asarray(rows, dtype="int64")
+        else:
+            src = _match_rows(old, base, label)
+        self.base = base
+        self.columns: List[str] = [str(c) for c in self.base.columns]
+        self._col_index = {c: i for i, c in enumerate(self.columns)}
+        old_len, old_n = (len(old) if old is not None else 0), max(len(old_cols), 1)
+        moved = np.full(old_len, -1, dtype="int64")  # stara pozycja → nowa
+        kept = (src >= 0) & (src < old_len)
+        moved[src[kept]] = np.nonzero(kept)[0]
+        dropped = 0
+        for name, (keys, vals) in list(self._scen.items()):
+            new_rows = moved[keys // old_n]
+            new_cols = np.array([self._col_index.get(old_cols[c], -1) for c in keys % old_n], dtype="int64")
+            ok = (new_rows >= 0) & (new_cols >= 0)
+            dropped += int((~ok).sum())
+            self._scen[name] = self._sorted(new_rows[ok] * len(self.columns) + new_cols[ok], vals[ok])
+        self.base_generation = self.generation = next_generation()
+        return dropped
+
+    def _sorted(self, keys: np.ndarray, vals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(keys, kind="stable")
+        return keys[order], vals[order]
+
+    # --- Scenariusze ---
+    def names(self) -> List[str]:
+        return [BASE, *self._scen]
+
+    def create(self, name: str, source: str = BASE) -> None:
+        """Nowy scenariusz – kopia nadpisań `source` (same tablice nadpisań, bez kopii planu)."""
+        if name == BASE or name in self._scen:
+            raise ValueError(f"Scenariusz „{name}” już istnieje.")
+        keys, vals = self._overrides(source)
+        self._scen[name] = (keys.copy(), vals.copy())
+        self._gen[name] = self.generation = next_generation()
+
+    def drop(self, name: str) -> None:
+        self._scen.pop(name, None)
+        self._gen.pop(name, None)
+        self._cache.pop(name, None)
+        self.generation = next_generation()
+
+    def _overrides(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        if name == BASE:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype=object)
+        return self._scen[name]
+
+    def override_count(self, name: str) -> int:
+        return len(self._overrides(name)[0])
+
+    def _coerce(self, col: str, values: Sequence) -> np.ndarray:
+        """Wartości edycji w typie kolumny bazy (liczbowe → float, reszta bez zmian)."""
+        out = np.empty(len(values), dtype=object)
+        if pd.api.types.is_numeric_dtype(self.base[col]):
+            out[:] = pd.to_numeric(pd.Series(list(values), dtype=object), errors="coerce").to_numpy("float64")
+        else:
+            out[:] = list(values)
+        return out
+
+    def set_cells(self, name: str, edits: Mapping[int, Mapping[str, object]]) -> int:
+        """
+        Nadpisuje komórki scenariusza ({wiersz: {kolumna: wartość}}, np. edited_rows data_editor).
+        Wartość równa bazie usuwa nadpisanie – scenariusz trzyma tylko realne różnice. Zwraca liczbę nadpisań.
+        """
+        if name == BASE:
+            raise ValueError("Plan bazowy zmienia się przez set_base().")
+        ncols = len(self.columns)
+        by_col: Dict[str, Tuple[List[int], List[object]]] = {}
+        for row, cells in edits.items():
+            for col, value in cells.items():
+                if col in self._col_index and 0 <= int(row) < len(self.base):
+                    rows, vals = by_col.setdefault(col, ([], []))
+                    rows.append(int(row))
+                    vals.append(value)
+        keys, vals = self._scen[name]
+        for col, (rows, new_vals) in by_col.items():
+            r = np.asarray(rows, dtype="int64")
+            v = self._coerce(col, new_vals)
+            same = _equal(v, self.base[col].to_numpy(dtype=object)[r])
+            k = r * ncols + self._col_index[col]
+            keep = ~np.isin(keys, k)
+            keys, vals = np.concatenate([keys[keep], k[~same]]), np.concatenate([vals[keep], v[~same]])
+        self._scen[name] = self._sorted(keys, vals)
+        self._gen[name] = self.generation = next_generation()
+        return len(keys)
+
+    # --- Materializacja ---
+    def materialize(self, name: str) -> pd.DataFrame:
+        """Pełny plan scenariusza; kopiowane są tylko kolumny z nadpisaniami (cache do następnej zmiany)."""
+        key = (self.base_generation, self._gen.get(name, 0))
+        hit = self._cache.get(name)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        keys, vals = self._overrides(name)
+        out = self.base.copy(deep=False)
+        if len(keys):
+            rows, cols = keys // len(self.columns), keys % len(self.columns)
+            for c in np.unique(cols):
+                sel = cols == c
+                col = self.columns[c]
+                numeric = pd.api.types.is_numeric_dtype(out[col]) and not pd.api.types.is_bool_dtype(out[col])
+                arr = out[col].to_numpy(dtype="float64" if numeric else object, copy=True)
+                arr[rows[sel]] = vals[sel]
+                out[col] = arr
+        self._cache[name] = (key, out)
+        return out
+
+    def column(self, name: str, col: str) -> np.ndarray:
+        """Jedna kolumna scenariusza (baza + nadpisania tej kolumny) – bez materializacji całości."""
+        keys, vals = self._overrides(name)
+        arr = self.base[col].to_numpy(dtype=object, copy=True)
+        sel = keys % len(self.columns) == self._col_index[col]
+        arr[keys[sel] // len(self.columns)] = vals[sel]
+        return arr
+
+    # --- Porównania ---
+    def diff(self, a: str, b: str) -> pd.DataFrame:
+        """
+        Różnice komórek między scenariuszami (wektorowo). Różnić się mogą tylko komórki nadpisane
+        w którymkolwiek z nich, więc porównanie idzie po sumie ich kluczy – nie po całym planie.
+        """
+        ka, va = self._overrides(a)
+        kb, vb = self._overrides(b)
+        keys = np.union1d(ka, kb)
+        ncols = len(self.columns)
+        rows, cols = keys // ncols, keys % ncols
+        base_vals = np.empty(len(keys), dtype=object)
+        for c in np.unique(cols):
+            sel = cols == c
+            base_vals[sel] = self.base[self.columns[c]].to_numpy(dtype=object)[rows[sel]]
+        val_a, val_b = _lookup(keys, ka, va, base_vals), _lookup(keys, kb, vb, base_vals)
+        changed = ~_equal(val_a, val_b)
+        num_a = pd.to_numeric(pd.Series(val_a[changed], dtype=object), errors="coerce").to_numpy("float64")
+        num_b = pd.to_numeric(pd.Series(val_b[changed], dtype=object), errors="coerce").to_numpy("float64")
+        return pd.DataFrame({
+            "wiersz": rows[changed],
+            "kolumna": np.asarray(self.columns, dtype=object)[cols[changed]],
+            a: val_a[changed],
+            b: val_b[changed],
+            "różnica": num_b - num_a,
+        })
+
+    def side_by_side(self, names: Sequence[str], col: str, label: Optional[str] = None) -> pd.DataFrame:
+        """Kolumna `col` w kilku scenariuszach obok siebie (wiersze opisane kolumną `label`, jeśli jest)."""
+        index = self.base[label] if label in self._col_index else self.base.index
+        data = {n: pd.to_numeric(pd.Series(self.column(n, col)), errors="coerce").to_numpy() for n in names}
+        return pd.DataFrame(data, index=pd.Index(index, name=label or "wiersz"))
+
+
+def _match_rows(old: pd.DataFrame, new: pd.DataFrame, label: Optional[str]) -> np.ndarray:
+    """Pozycje wierszy `new` w `old`: po unikalnej kolumnie `label`, inaczej po pozycji (ten sam kształt)."""
+    if label in old.columns and label in new.columns and old[label].is_unique and new[label].is_unique:
+        return pd.Index(old[label]).get_indexer(new[label]).astype("int64")
+    if len(old) == len(new):
+        return np.arange(len(new), dtype="int64")
+    return np.full(len(new), -1, dtype="int64")
+
+
+def _lookup(keys: np.ndarray, skeys: np.ndarray, svals: np.ndarray, default: np.ndarray) -> np.ndarray:
+    """Wartości scenariusza dla `keys` (posortowane klucze nadpisań `skeys`), w pozostałych – `default`."""
+    out = default.copy()
+    if len(skeys):
+        pos = np.minimum(np.searchsorted(skeys, keys), len(skeys) - 1)
+        hit = skeys[pos] == keys
+        out[hit] = svals[pos[hit]]
+    return out
+
+
+def _equal(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Równość elementów (tablice object, porównanie elementowe numpy); dwa puste (None/NaN) są równe."""
+    na, nb = pd.isna(a), pd.isna(b)
+    eq = np.asarray(a == b, dtype=bool) if len(a) else np.zeros(0, dtype=bool)
+    return (na & nb) | (~na & ~nb & eq)
@@ -0,0 +1,288 @@
+# src/core/portfolio.py
+from __future__ import annotations
+
+import atexit
+import multiprocessing as mp
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core.exec_store import YearStore
+from core.kpi_defs import compute_kpis, fnb_kpi, rooms_kpi
+from core.schema import REGISTRY
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Portfel hoteli: KPI per hotel + skonsolidowane, z częściowych agregatów
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Hotel = źródło danych wykonania:
+#   - {rok: YearStore} w sesji – sumy miesięcy z cache magazynu (liczone w procesie),
+#   - ścieżka do bazy SQLite (core.exec_db) – sumy liczy SQL (GROUP BY rok, miesiąc)
+#     w puli procesów; dane dzienne innych hoteli nie trafiają do pamięci aplikacji.
+# Częściowy agregat = {rok: sumy kolumn 12 × REGISTRY.columns}; konsolidacja to ich suma,
+# a KPI (kpi_rooms_* / kpi_fnb_* oraz KPI_REGISTRY) liczone są z sum – nie z uśrednień.
+
+HotelSource = Union[str, Mapping[int, YearStore]]
+Partial = Dict[int, np.ndarray]
+
+PORTFOLIO_KPIS = ["ADR", "OCC", "RevPAR", "TRevPAR", "GOP%"]
+_INNE_PLN = REGISTRY.idx([c for c, s in REGISTRY.specs.items() if s.department == "inne" and s.unit == "pln"])
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor:
+    """Wspólna pula procesów (spawn – bezpieczny przy wątkach serwera Streamlit)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = int(os.environ.get("PORTFOLIO_WORKERS", "0")) or (os.cpu_count() or 1)
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+            atexit.register(_POOL.shutdown, wait=False, cancel_futures=True)
+        return _POOL
+
+
+# --- Częściowe agregaty ---
+def db_partial(path: str, years: Sequence[int]) -> Partial:
+    """Sumy miesięcy z bazy hotelu – redukcja w SQLite, tylko odczyt (funkcja workera puli)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        have = {r[1] for r in conn.execute("PRAGMA table_info(exec)")}
+        cols = [c for c in REGISTRY.columns if c in have]
+        marks = ", ".join("?" for _ in years)
+        sums = ", ".join(f'TOTAL("{c}")' for c in cols)
+        rows = conn.execute(
+            f"SELECT year, month, {sums} FROM exec WHERE year IN ({marks}) GROUP BY year, month",
+            [int(y) for y in years],
+        ).fetchall() if cols and years else []
+    finally:
+        conn.close()
+    idx = REGISTRY.idx(cols)
+    out: Partial = {int(y): np.zeros((12, len(REGISTRY.columns))) for y in years}
+    for r in rows:
+        out[int(r[0])][int(r[1]) - 1, idx] = r[2:]
+    return out
+
+
+def store_partial(stores: Mapping[int, YearStore], years: Sequence[int]) -> Partial:
+    """Sumy miesięcy z magazynów w sesji (cache agregatów YearStore)."""
+    out: Partial = {}
+    for y in years:
+        store = stores.get(y)
+        out[int(y)] = store.month_sums().copy() if isinstance(store, YearStore) else np.zeros((12, len(REGISTRY.columns)))
+    return out
+
+
+def merge_partials(parts: Sequence[Partial]) -> Partial:
+    out: Partial = {}
+    for p in parts:
+        for y, s in p.items():
+            out[y] = out[y] + s if y in out else s.copy()
+    return out
+
+
+# --- KPI z sum ---
+def monthly_frame(part: Partial, months: Sequence[int] = range(1, 13)) -> pd.DataFrame:
+    """Miesięczne wskaźniki w układzie „insights” (ADR, occ, RevPAR, …) – wejście dla KPI_REGISTRY."""
+    keys = [(y, m) for y in sorted(part) for m in months]
+    if not keys:
+        return pd.DataFrame(columns=["month", "ADR", "occ", "RevPAR", "TRevPAR", "var_cost_per_occ_room", "fixed_costs"])
+    S = np.stack([part[y][m - 1] for y, m in keys])
+    t = {k: S[:, ix].sum(axis=1) for k, ix in REGISTRY.kpi_idx.items()}
+    capacity = t["dostepne"] - t["oos"]
+    sold = t["sprzedane"]
+    total_rev = t["przychod_pokoje"] + t["fnb"] + S[:, _INNE_PLN].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df = pd.DataFrame({
+            "month": pd.to_datetime([f"{y}-{m:02d}-01" for y, m in keys]),
+            "ADR": np.where(sold > 0, t["przychod_pokoje"] / sold, np.nan),
+            "occ": np.where(capacity > 0, sold / capacity, np.nan),
+            "RevPAR": np.where(capacity > 0, t["przychod_pokoje"] / capacity, np.nan),
+            "TRevPAR": np.where(capacity > 0, total_rev / capacity, np.nan),
+            # koszty departamentów na sprzedany pokój; kosztów niepodzielonych magazyn nie zna
+            "var_cost_per_occ_room": np.where(sold > 0, (t["koszt_r"] + t["koszt_g"]) / sold, np.nan),
+            "fixed_costs": 0.0,
+        })
+    return df
+
+
+def partial_kpis(part: Partial, months: Sequence[int] = range(1, 13),
+                 kpis: Sequence[str] = PORTFOLIO_KPIS) -> Dict[str, Optional[float]]:
+    """KPI jednego hotelu albo całego portfela (z sumy częściowych agregatów)."""
+    total = sum((part[y][[m - 1 for m in months]].sum(axis=0) for y in part), np.zeros(len(REGISTRY.columns)))
+    agg = REGISTRY.kpi_totals(total)
+    out: Dict[str, Optional[float]] = {**rooms_kpi(agg), **fnb_kpi(agg)}
+    values, _ = compute_kpis(monthly_frame(part, months), list(kpis))
+    out.update(values)
+    return out
+
+
+def db_hotel(path: str, years: Sequence[int], months: Sequence[int],
+             kpis: Sequence[str]) -> Tuple[Partial, Dict[str, Optional[float]]]:
+    """Zadanie workera: agregat częściowy + KPI hotelu z jego bazy (do procesu rodzica wraca ~KB)."""
+    part = db_partial(path, years)
+    return part, partial_kpis(part, months, kpis)
+
+
+@dataclass
+class PortfolioResult:
+    hotels: pd.DataFrame           # wiersz = hotel, kolumny = KPI
+    consolidated: Dict[str, Optional[float]]
+    monthly: pd.DataFrame          # skonsolidowane wskaźniki miesięczne (insights)
+
+    def table(self, total_label: str = "Portfel") -> pd.DataFrame:
+        return pd.concat([self.hotels, pd.DataFrame([self.consolidated], index=[total_label])])
+
+
+def consolidate(
+    hotels: Mapping[str, HotelSource],
+    years: Sequence[int],
+    months: Sequence[int] = range(1, 13),
+    *,
+    kpis: Sequence[str] = PORTFOLIO_KPIS,
+    executor: Optional[Executor] = None,
+) -> PortfolioResult:
+    """
+    KPI per hotel i skonsolidowane za `years` × `months`.
+    Bazy SQLite redukowane są równolegle w puli procesów (albo w przekazanym `executor`),
+    magazyny z sesji – od razu z cache sum.
+    """
+    years, months, kpis = [int(y) for y in years], [int(m) for m in months], list(kpis)
+    parts: Dict[str, Partial] = {}
+    rows: Dict[str, Dict[str, Optional[float]]] = {}
+    pending = {}
+    for name, src in hotels.items():
+        if isinstance(src, (str, os.PathLike)):
+            pending[name] = (executor or _pool()).submit(db_hotel, os.fspath(src), years, months, kpis)
+        else:
+            parts[name] = store_partial(src, years)
+            rows[name] = partial_kpis(parts[name], months, kpis)
+    for name, fut in pending.items():
+        parts[name], rows[name] = fut.result()
+    order = list(hotels)
+    total = merge_partials([parts[n] for n in order])
+    return PortfolioResult(
+        hotels=pd.DataFrame.from_dict({n: rows[n] for n in order}, orient="index"),
+        consolidated=partial_kpis(total, months, kpis),
+        monthly=monthly_frame(total, months),
+    )
+
+
+# --- Nazwy hoteli = nazwy plików baz w PORTFOLIO_DB_DIR ---
+_BAD_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def hotel_name(raw: str) -> str:
+    """
+    Nazwa hotelu (np. z pola „Dodaj hotel”) bez spacji na brzegach. Nazwa wyznacza plik bazy
+    <PORTFOLIO_DB_DIR>/<nazwa>.db, więc separatory ścieżek, znaki niedozwolone w nazwach plików
+    i kropka na początku (`..`, pliki ukryte) dają ValueError.
+    """
+    name = str(raw).strip()
+    if not name or name.startswith(".") or _BAD_NAME.search(name):
+        raise ValueError(f"Nieprawidłowa nazwa hotelu „{name}” – bez znaków / \\ : * ? \" < > | i bez kropki na początku.")
+    return name
+
+
+def hotel_db_path(root: str, hotel: str) -> str:
+    """Plik bazy hotelu w katalogu portfela (nazwa sprawdzona przez hotel_name)."""
+    return os.path.join(root, f"{hotel_name(hotel)}.db")
+
+
+def discover_db_hotels(directory: str) -> Dict[str, str]:
+    """{nazwa hotelu: ścieżka} dla plików *.db w katalogu portfela (nazwa = nazwa pliku)."""
+    try:
+        names = sorted(n[:-3] for n in os.listdir(directory) if n.endswith(".db"))
+    except OSError:
+        return {}
+    out = {}
+    for n in names:
+        try:
+            out[n] = hotel_db_path(directory, n)
+        except ValueError:  # np. plik ukryty – nie jest hotelem portfela
+            continue
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Portfel w sesji: przełączanie aktywnego hotelu + KPI skonsolidowane
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# Aktywny hotel żyje w session_state["exec"] / ["audit"] (cała reszta aplikacji bez zmian);
+# pozostałe hotele z sesji czekają w session_state["portfolio"] = {hotel: {"exec", "audit"}}.
+# Hotele tylko z bazy (PORTFOLIO_DB_DIR/*.db) nie są wczytywane – sumy liczy pula procesów.
+# streamlit i core.state_local importowane są w funkcjach: workery puli (spawn) importują
+# ten moduł tylko dla db_hotel.
+
+def _session():
+    import streamlit as st
+
+    from core.state_local import DEFAULT_HOTEL
+
+    s = st.session_state
+    for key in ("exec", "audit", "portfolio"):
+        s.setdefault(key, {})
+    s.setdefault("hotel", DEFAULT_HOTEL)
+    return s
+
+
+def active_hotel() -> str:
+    return _session()["hotel"]
+
+
+def portfolio_hotels() -> List[str]:
+    """Hotele portfela: aktywny, odłożone w sesji i bazy z PORTFOLIO_DB_DIR (bez powtórzeń)."""
+    from core.state_local import setting
+
+    s = _session()
+    names = [s["hotel"], *s["portfolio"]]
+    root = setting("PORTFOLIO_DB_DIR")
+    if root:
+        names += list(discover_db_hotels(str(root)))
+    return list(dict.fromkeys(names))
+
+
+def switch_hotel(name: str) -> None:
+    """
+    Odkłada dane aktywnego hotelu do portfela i przywraca (albo zakłada) dane hotelu `name`.
+    Nazwa spoza hotel_name() → ValueError, bez zmiany aktywnego hotelu.
+    """
+    s = _session()
+    name = hotel_name(name)
+    current = s["hotel"]
+    if not name or name == current:
+        return
+    port = s["portfolio"]
+    port[current] = {"exec": s["exec"], "audit": s["audit"]}
+    state = port.pop(name, None) or {"exec": {}, "audit": {}}
+    s["exec"] = state["exec"]
+    s["audit"] = state["audit"]
+    s["hotel"] = name
+
+
+def portfolio_kpis(years: List[int], months: List[int]) -> PortfolioResult:
+    """
+    KPI per hotel i skonsolidowane: hotele z sesji z cache sum YearStore,
+    hotele tylko z bazy – redukcja SQL równolegle w puli procesów.
+    """
+    from core.state_local import init_exec_year, migrate_to_new_schema, setting
+
+    s = _session()
+    migrate_to_new_schema()
+    root = setting("PORTFOLIO_DB_DIR")
+    sources: Dict[str, HotelSource] = dict(discover_db_hotels(str(root))) if root else {}
+    for name, state in s["portfolio"].items():
+        sources[name] = state["exec"]
+    for y in years:
+        init_exec_year(int(y))
+    sources[s["hotel"]] = s["exec"]
+    order = [n for n in portfolio_hotels() if n in sources]
+    return consolidate({n: sources[n] for n in order}, years, months)
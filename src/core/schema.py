@@ -0,0 +1,350 @@
+# src/core/schema.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 1) Nowy, docelowy schemat nazw (spójne prefiksy + sufiksy)
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Stare -> Nowe (komplet mapowań używanych dotąd)
+OLD2NEW: Dict[str, str] = {
+    # POKOJE (przychody/ilości)
+    "pokoje_do_sprzedania": "pokoje_dostepne_qty",
+    "pokoje_oos": "pokoje_oos_qty",
+    "sprzedane_pokoje_bez": "pokoje_sprzedane_bez_qty",
+    "sprzedane_pokoje_ze": "pokoje_sprzedane_ze_qty",
+    "przychody_pokoje_netto": "pokoje_przychod_netto_pln",
+    # F&B – przychody
+    "fnb_sniadania_pakietowe": "fnb_sniadania_pakietowe_pln",
+    "fnb_kolacje_pakietowe": "fnb_kolacje_pakietowe_pln",
+    "fnb_zywnosc_a_la_carte": "fnb_zywnosc_a_la_carte_pln",
+    "fnb_napoje_a_la_carte": "fnb_napoje_a_la_carte_pln",
+    "fnb_zywnosc_bankiety": "fnb_zywnosc_bankiety_pln",
+    "fnb_napoje_bankiety": "fnb_napoje_bankiety_pln",
+    "fnb_catering": "fnb_catering_pln",
+    "fnb_wynajem_sali": "sprzedaz_wynajem_sali_pln",
+    # Inne centra – przychody
+    "proc_pokoi_parking": "inne_proc_pokoi_parking_pct",
+    "przychody_parking": "inne_parking_przychod_pln",
+    "przychody_sklep_recepcyjny": "inne_sklep_recepcja_przychod_pln",
+    "przychody_pralnia_gosci": "inne_pralnia_gosci_przychod_pln",
+    "przychody_transport_gosci": "inne_transport_przychod_pln",
+    "przychody_rekreacja": "inne_rekreacja_przychod_pln",
+    "przychody_pozostale": "inne_pozostale_przychod_pln",
+    # KOSZTY – Pokoje (prefiks r_ -> koszt_r_)
+    "r_osobowe_wynagrodzenia": "koszt_r_osobowe_wynagrodzenia_pln",
+    "r_osobowe_zus": "koszt_r_osobowe_zus_pln",
+    "r_osobowe_pfron": "koszt_r_osobowe_pfron_pln",
+    "r_osobowe_wyzywienie": "koszt_r_osobowe_wyzywienie_pln",
+    "r_osobowe_odziez_bhp": "koszt_r_osobowe_odziez_bhp_pln",
+    "r_osobowe_medyczne": "koszt_r_osobowe_medyczne_pln",
+    "r_osobowe_inne": "koszt_r_osobowe_inne_pln",
+    "r_materialy_eksploatacyjne_spozywcze": "koszt_r_materialy_eksplo_spozywcze_pln",
+    "r_materialy_kosmetyki_srodki": "koszt_r_materialy_kosmetyki_czystosc_pln",
+    "r_materialy_inne_biurowe": "koszt_r_materialy_inne_biurowe_pln",
+    "r_uslugi_sprzatania": "koszt_r_uslugi_sprzatanie_pln",
+    "r_uslugi_pranie_zew": "koszt_r_uslugi_pranie_zew_pln",
+    "r_uslugi_pranie_odziezy_sluzbowej": "koszt_r_uslugi_pranie_odziezy_pln",
+    "r_uslugi_wynajem_sprzetu": "koszt_r_uslugi_wynajem_sprzetu_pln",
+    "r_uslugi_inne_bhp": "koszt_r_uslugi_inne_pln",
+    "r_pozostale_prowizje_ota_gds": "koszt_r_prowizje_ota_gds_pln",
+    # KOSZTY – F&B (prefiks g_ -> koszt_g_)
+    "g_koszt_surowca_zywnosc_pln": "koszt_g_surowiec_zywnosc_pln",
+    "g_koszt_surowca_napoje_pln": "koszt_g_surowiec_napoje_pln",
+    "g_osobowe_wynagrodzenia": "koszt_g_osobowe_wynagrodzenia_pln",
+    "g_osobowe_zus": "koszt_g_osobowe_zus_pln",
+    "g_osobowe_pfron": "koszt_g_osobowe_pfron_pln",
+    "g_osobowe_wyzywienie": "koszt_g_osobowe_wyzywienie_pln",
+    "g_osobowe_odziez_bhp": "koszt_g_osobowe_odziez_bhp_pln",
+    "g_osobowe_medyczne": "koszt_g_osobowe_medyczne_pln",
+    "g_osobowe_inne": "koszt_g_osobowe_inne_pln",
+    "g_materialy_zastawa": "koszt_g_materialy_zastawa_pln",
+    "g_materialy_drobne_wyposazenie": "koszt_g_materialy_drobne_wypos_pln",
+    "g_materialy_bielizna_dekoracje": "koszt_g_materialy_bielizna_dekor_pln",
+    "g_materialy_karty_dan": "koszt_g_materialy_karty_dan_pln",
+    "g_materialy_srodki_czystosci": "koszt_g_materialy_srodki_czystosci_pln",
+    "g_materialy_inne": "koszt_g_materialy_inne_pln",
+    "g_uslugi_sprzatania_tapicerki": "koszt_g_uslugi_sprzatanie_pln",
+    "g_uslugi_pranie_odziezy_sluzbowej": "koszt_g_uslugi_pranie_odziezy_pln",
+    "g_uslugi_pranie_bielizny_gastro": "koszt_g_uslugi_pranie_bielizny_pln",
+    "g_uslugi_wynajem_sprzetu_lokali": "koszt_g_uslugi_wynajem_sprzetu_pln",
+    "g_uslugi_inne": "koszt_g_uslugi_inne_pln",
+}
+
+# Pełen zbiór nowych nazw (przydaje się do uzupełniania braków)
+NEW_SCHEMA_COLS: List[str] = sorted(set(OLD2NEW.values())) + [
+    # nowo-nowe, które nie mają odpowiednika w OLD (gdyby były dodawane później)
+    "pokoje_dostepne_qty",
+    "pokoje_oos_qty",
+    "pokoje_sprzedane_bez_qty",
+    "pokoje_sprzedane_ze_qty",
+    "pokoje_przychod_netto_pln",
+]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 2) Skompilowany rejestr kolumn (nazwa, aliasy, jednostka, grupa, etykieta, pozycje)
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Etykiety kolumn w UI
+DISPLAY_LABELS: Dict[str, str] = {
+    # Pokoje
+    "pokoje_dostepne_qty": "🛏️ Pokoje do sprzedaży",
+    "pokoje_oos_qty": "🚫 Pokoje OOS",
+    "pokoje_sprzedane_bez_qty": "🛏️ Sprzedane BEZ śn.",
+    "pokoje_sprzedane_ze_qty": "🥐 Sprzedane ZE śn.",
+    "pokoje_przychod_netto_pln": "💰 Przychody pokoje (netto)",
+    # Gastronomia
+    "fnb_sniadania_pakietowe_pln": "🥐 Śniadania pakietowe",
+    "fnb_kolacje_pakietowe_pln": "🍽️ Kolacje pakietowe",
+    "fnb_zywnosc_a_la_carte_pln": "🍲 Żywność a la carte",
+    "fnb_napoje_a_la_carte_pln": "🥤 Napoje a la carte",
+    "fnb_zywnosc_bankiety_pln": "🎉 Żywność bankiety",
+    "fnb_napoje_bankiety_pln": "🥂 Napoje bankiety",
+    "fnb_catering_pln": "🧺 Catering",
+    # Dział sprzedaży
+    "sprzedaz_wynajem_sali_pln": "🏢 Wynajem sal",
+    # Inne centra
+    "inne_proc_pokoi_parking_pct": "🅿️ % pokoi z parkingiem",
+    "inne_parking_przychod_pln": "🅿️ Przychody parking",
+    "inne_sklep_recepcja_przychod_pln": "🛒 Sklep recepcyjny",
+    "inne_pralnia_gosci_przychod_pln": "🧺 Pralnia (goście)",
+    "inne_transport_przychod_pln": "🚖 Transport (goście)",
+    "inne_rekreacja_przychod_pln": "🏊 Rekreacja",
+    "inne_pozostale_przychod_pln": "➕ Pozostałe przychody",
+    # Koszty – pokoje
+    "koszt_r_osobowe_wynagrodzenia_pln": "👥 Pokoje: wynagrodzenia",
+    "koszt_r_osobowe_zus_pln": "👥 Pokoje: ZUS",
+    "koszt_r_osobowe_pfron_pln": "👥 Pokoje: PFRON",
+    "koszt_r_osobowe_wyzywienie_pln": "👥 Pokoje: wyżywienie",
+    "koszt_r_osobowe_odziez_bhp_pln": "👥 Pokoje: odzież/BHP",
+    "koszt_r_osobowe_medyczne_pln": "👥 Pokoje: medyczne",
+    "koszt_r_osobowe_inne_pln": "👥 Pokoje: inne osobowe",
+    "koszt_r_materialy_eksplo_spozywcze_pln": "📦 Pokoje: materiały eksploat./spoż.",
+    "koszt_r_materialy_kosmetyki_czystosc_pln": "📦 Pokoje: kosmetyki/środki czystości",
+    "koszt_r_materialy_inne_biurowe_pln": "📦 Pokoje: inne/biurowe",
+    "koszt_r_uslugi_sprzatanie_pln": "🛠️ Pokoje: sprzątanie",
+    "koszt_r_uslugi_pranie_zew_pln": "🛠️ Pokoje: pranie (zew.)",
+    "koszt_r_uslugi_pranie_odziezy_pln": "🛠️ Pokoje: pranie odzieży sł.",
+    "koszt_r_uslugi_wynajem_sprzetu_pln": "🛠️ Pokoje: wynajem sprzętu",
+    "koszt_r_uslugi_inne_pln": "🛠️ Pokoje: inne usługi",
+    "koszt_r_prowizje_ota_gds_pln": "💳 Pokoje: prowizje OTA/GDS",
+    # Koszty – gastronomia
+    "koszt_g_surowiec_zywnosc_pln": "🍴 F&B: surowiec – żywność",
+    "koszt_g_surowiec_napoje_pln": "🍷 F&B: surowiec – napoje",
+    "koszt_g_osobowe_wynagrodzenia_pln": "👥 F&B: wynagrodzenia",
+    "koszt_g_osobowe_zus_pln": "👥 F&B: ZUS",
+    "koszt_g_osobowe_pfron_pln": "👥 F&B: PFRON",
+    "koszt_g_osobowe_wyzywienie_pln": "👥 F&B: wyżywienie",
+    "koszt_g_osobowe_odziez_bhp_pln": "👥 F&B: odzież/BHP",
+    "koszt_g_osobowe_medyczne_pln": "👥 F&B: medyczne",
+    "koszt_g_osobowe_inne_pln": "👥 F&B: inne osobowe",
+    "koszt_g_materialy_zastawa_pln": "📦 F&B: zastawa",
+    "koszt_g_materialy_drobne_wypos_pln": "📦 F&B: drobne wyposażenie",
+    "koszt_g_materialy_bielizna_dekor_pln": "📦 F&B: bielizna/dekoracje",
+    "koszt_g_materialy_karty_dan_pln": "📦 F&B: karty dań",
+    "koszt_g_materialy_srodki_czystosci_pln": "📦 F&B: środki czystości",
+    "koszt_g_materialy_inne_pln": "📦 F&B: inne materiały",
+    "koszt_g_uslugi_sprzatanie_pln": "🛠️ F&B: sprzątanie",
+    "koszt_g_uslugi_pranie_odziezy_pln": "🛠️ F&B: pranie odzieży sł.",
+    "koszt_g_uslugi_pranie_bielizny_pln": "🛠️ F&B: pranie bielizny",
+    "koszt_g_uslugi_wynajem_sprzetu_pln": "🛠️ F&B: wynajem sprzętu",
+    "koszt_g_uslugi_inne_pln": "🛠️ F&B: inne usługi",
+}
+
+# prefiks nazwy → (dział, grupa w UI); kolejność ma znaczenie (koszt_r_ przed koszt_)
+_DEPARTMENTS: List[Tuple[str, str, str]] = [
+    ("pokoje_", "pokoje", "Pokoje"),
+    ("fnb_", "fnb", "Gastronomia"),
+    ("sprzedaz_", "sprzedaz", "Dział Sprzedaży"),
+    ("inne_", "inne", "Inne Centra"),
+    ("koszt_r_", "koszt_r", "Koszty"),
+    ("koszt_g_", "koszt_g", "Koszty"),
+]
+_UNITS = ("qty", "pln", "pct")
+
+# sumy używane przez KPI (Pokoje / F&B) – nazwy kolumn albo całe działy
+KPI_SUMS: Dict[str, List[str]] = {
+    "dostepne": ["pokoje_dostepne_qty"],
+    "oos": ["pokoje_oos_qty"],
+    "sprzedane": ["pokoje_sprzedane_bez_qty", "pokoje_sprzedane_ze_qty"],
+    "przychod_pokoje": ["pokoje_przychod_netto_pln"],
+    "koszt_r": ["@koszt_r"],
+    "koszt_g": ["@koszt_g"],
+    "fnb": ["@fnb", "sprzedaz_wynajem_sali_pln"],
+}
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str                  # nazwa kanoniczna (bieżący schemat)
+    index: int                 # pozycja w tablicy roku (YearStore) i w REGISTRY.columns
+    aliases: Tuple[str, ...]   # dawne nazwy (łańcuch migracji)
+    unit: str                  # qty / pln / pct
+    dtype: str
+    department: str            # pokoje / fnb / sprzedaz / inne / koszt_r / koszt_g
+    group: str                 # grupa kolumn w edytorze
+    label: str
+
+
+class SchemaRegistry:
+    """
+    Wiedza o kolumnach w jednym miejscu, policzona raz przy imporcie modułu.
+    Pozycje (`index`, tablice `dept_idx` / `kpi_idx`) odpowiadają kolumnom YearStore,
+    więc sumy i KPI to indeksowanie tablic zamiast skanowania prefiksów nazw.
+    """
+
+    def __init__(self, columns: Sequence[str], renames: Dict[str, str], labels: Dict[str, str]):
+        self.columns: Tuple[str, ...] = tuple(dict.fromkeys(columns))
+        self.index: Dict[str, int] = {c: i for i, c in enumerate(self.columns)}
+        aliases: Dict[str, List[str]] = {}
+        for old, new in renames.items():
+            aliases.setdefault(new, []).append(old)
+        specs = {}
+        for i, c in enumerate(self.columns):
+            dept, group = next(((d, g) for p, d, g in _DEPARTMENTS if c.startswith(p)), ("", ""))
+            unit = c.rsplit("_", 1)[-1]
+            specs[c] = ColumnSpec(
+                name=c, index=i, aliases=tuple(aliases.get(c, ())),
+                unit=unit if unit in _UNITS else "", dtype="float64",
+                department=dept, group=group, label=labels.get(c, c),
+            )
+        self.specs: Dict[str, ColumnSpec] = specs
+        # nazwa kanoniczna lub dawna → kanoniczna
+        self.resolve_map: Dict[str, str] = {a: s.name for s in specs.values() for a in s.aliases}
+        self.resolve_map.update({c: c for c in self.columns})
+        self.groups: Dict[str, Tuple[str, ...]] = {}
+        for _, _, g in _DEPARTMENTS:
+            self.groups[g] = tuple(sorted(c for c, s in specs.items() if s.group == g))
+        self.dept_idx: Dict[str, np.ndarray] = {
+            d: self.idx([c for c, s in specs.items() if s.department == d]) for _, d, _ in _DEPARTMENTS
+        }
+        self.kpi_idx: Dict[str, np.ndarray] = {
+            k: np.concatenate([self.dept_idx[n[1:]] if n.startswith("@") else self.idx([n]) for n in names])
+            for k, names in KPI_SUMS.items()
+        }
+
+    def idx(self, cols: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.index[c] for c in cols), dtype="int64")
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self.resolve_map.get(name)
+
+    def positions(self, columns: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """(pozycje w ramce, pozycje w schemacie) dla kolumn znanych pod nową lub dawną nazwą."""
+        return _positions(self, tuple(columns))
+
+    def frame_sums(self, df: pd.DataFrame) -> np.ndarray:
+        """Sumy kolumn ramki (stare lub nowe nazwy) ułożone jak `columns`; brak/NaN → 0."""
+        out = np.zeros(len(self.columns))
+        if df is None or df.empty:
+            return out
+        src, dst = self.positions(df.columns)
+        if len(src):
+            block = df.iloc[:, src]
+            if any(dt.kind not in "fiu" for dt in block.dtypes):
+                block = block.apply(pd.to_numeric, errors="coerce")
+            out[dst] = np.nansum(block.to_numpy(dtype="float64", na_value=np.nan), axis=0)
+        return out
+
+    def kpi_totals(self, sums: np.ndarray) -> Dict[str, float]:
+        """Sumy grup KPI (KPI_SUMS) z wektora sum kolumn ułożonego jak `columns`."""
+        return {k: float(sums[ix].sum()) for k, ix in self.kpi_idx.items()}
+
+
+@lru_cache(maxsize=256)
+def _positions(reg: SchemaRegistry, columns: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    src, dst, seen = [], [], set()
+    # nazwa bieżąca wygrywa z dawną, gdy ramka ma obie
+    order = sorted(range(len(columns)), key=lambda i: columns[i] not in reg.index)
+    for i in order:
+        name = reg.resolve_map.get(columns[i]) if isinstance(columns[i], str) else None
+        if name is not None and name not in seen:
+            seen.add(name)
+            src.append(i)
+            dst.append(reg.index[name])
+    return np.array(src, dtype="int64"), np.array(dst, dtype="int64")
+
+
+REGISTRY = SchemaRegistry(NEW_SCHEMA_COLS, OLD2NEW, DISPLAY_LABELS)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 3) Wersjonowane migracje schematu (łańcuch v1, v2, …) + znacznik wersji ramki
+# ──────────────────────────────────────────────────────────────────────────────
+
+SCHEMA_VERSION_ATTR = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Jeden krok łańcucha: zmiana nazw kolumn (+ opcjonalna dodatkowa transformacja ramki)."""
+    version: int
+    renames: Dict[str, str]
+    description: str = ""
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = field(default=None, compare=False)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, OLD2NEW, "stare nazwy kolumn → prefiksy działów + sufiksy jednostek"),
+]
+CURRENT_SCHEMA_VERSION: int = MIGRATIONS[-1].version
+
+
+def schema_version(df: pd.DataFrame) -> int:
+    """Wersja schematu zapisana w df.attrs (0 = ramka sprzed migracji / bez znacznika)."""
+    return int(df.attrs.get(SCHEMA_VERSION_ATTR, 0))
+
+
+def stamp_schema(df: pd.DataFrame, version: int = CURRENT_SCHEMA_VERSION) -> pd.DataFrame:
+    df.attrs[SCHEMA_VERSION_ATTR] = version
+    return df
+
+
+def renames_since(version: int) -> Dict[str, str]:
+    """Złożone mapowanie nazw ze wszystkich kroków nowszych niż `version` (do remapu audytu)."""
+    out: Dict[str, str] = {}
+    for mig in MIGRATIONS:
+        if mig.version <= version:
+            continue
+        out = {old: mig.renames.get(new, new) for old, new in out.items()}
+        for old, new in mig.renames.items():
+            out.setdefault(old, new)
+    return out
+
+
+def apply_new_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Migruje DataFrame do bieżącej wersji schematu:
+    - ramka już w bieżącej wersji → zwracana bez kopii (O(1)),
+    - w p.p. jedna kopia, kolejne kroki łańcucha (rename starych -> nowe),
+      dopisanie brakujących kolumn (NaN), 'data' jako datetime, sortowanie, znacznik wersji,
+    - nie usuwa kolumn ponad schemat (żeby nic nie zginęło).
+    """
+    if df is None or df.empty:
+        return df
+    version = schema_version(df)
+    if version >= CURRENT_SCHEMA_VERSION:
+        return df
+    out = df.copy()
+    for mig in MIGRATIONS:
+        if mig.version <= version:
+            continue
+        ren = {old: new for old, new in mig.renames.items() if old in out.columns and new not in out.columns}
+        if ren:
+            out = out.rename(columns=ren)
+        if mig.transform is not None:
+            out = mig.transform(out)
+    # dopisz brakujące nowe
+    add_cols = [c for c in REGISTRY.columns if c not in out.columns]
+    if add_cols:
+        out = pd.concat([out, pd.DataFrame(np.nan, index=out.index, columns=add_cols)], axis=1)
+    # kolumna data
+    if "data" in out.columns:
+        out["data"] = pd.to_datetime(out["data"], errors="coerce")
+        out = out.sort_values("data")
+    return stamp_schema(out.reset_index(drop=True), CURRENT_SCHEMA_VERSION)
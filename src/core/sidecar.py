@@ -0,0 +1,191 @@
+# src/core/sidecar.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:  # pyarrow jest opcjonalny – bez niego arkusze są zawsze parsowane z Excela
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except Exception:  # pragma: no cover
+    pa = None
+    feather = None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Kolumnowe „sidecary” arkuszy (Arrow IPC) w lokalnym katalogu cache
+# ──────────────────────────────────────────────────────────────────────────────
+#
+# <root>/books/<sha256 skoroszytu>.json      – lista arkuszy pliku (bez otwierania Excela)
+# <root>/sheets/<sha1 klucza + nazwy>.json   – typy kolumn (albo {"skip": true})
+# <root>/sheets/<sha1 klucza + nazwy>.arrow  – tabela bez kompresji (mmap)
+#
+# Klucz arkusza = jego odcisk (data_io.sheet_fingerprints; dla plików spoza OOXML –
+# skrót całego pliku), tak jak w cache parsowania w procesie. Nowa wersja skoroszytu
+# z niezmienionym arkuszem trafia więc w istniejący sidecar także po restarcie.
+# Powyżej KEEP_BOOKS list arkuszy i KEEP_SHEETS arkuszy usuwane są najdawniej użyte.
+
+KEEP_BOOKS = 8
+KEEP_SHEETS = 256
+_LOCK = threading.Lock()
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _root() -> str:
+    return os.environ.get("SIDECAR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "hotel_sidecars")
+
+
+def _books_dir() -> str:
+    return os.path.join(_root(), "books")
+
+
+def _sheets_dir() -> str:
+    return os.path.join(_root(), "sheets")
+
+
+def _sheet_base(key: str, name: str) -> str:
+    return os.path.join(_sheets_dir(), hashlib.sha1(f"{key}\0{name}".encode("utf-8")).hexdigest())
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, payload: Dict) -> None:
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _prune(directory: str, suffix: str, keep: int) -> None:
+    """Zostawia `keep` najświeżej używanych wpisów (plików `*suffix` wraz z plikami o tej samej nazwie bazowej)."""
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(suffix)]
+    except OSError:
+        return
+    if len(names) <= keep:
+        return
+    paths = sorted((os.path.join(directory, n) for n in names), key=_mtime, reverse=True)
+    for p in paths[keep:]:
+        base = p[: -len(suffix)]
+        for ext in (".json", ".arrow"):
+            try:
+                os.remove(base + ext)
+            except OSError:
+                pass
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _touch(path: str) -> None:
+    try:
+        os.utime(path)  # LRU
+    except OSError:
+        pass
+
+
+# --- API ---
+def sheet_names(digest: str) -> Optional[List[str]]:
+    """Lista arkuszy skoroszytu (None – plik jeszcze nie przetworzony)."""
+    if not available():
+        return None
+    path = os.path.join(_books_dir(), f"{digest}.json")
+    m = _read_json(path)
+    if m is None:
+        return None
+    _touch(path)
+    return list(m["sheets"])
+
+
+def register(digest: str, names: List[str]) -> None:
+    """Zapamiętuje listę arkuszy skoroszytu."""
+    if not available():
+        return
+    path = os.path.join(_books_dir(), f"{digest}.json")
+    with _LOCK:
+        if _read_json(path) is not None:
+            return
+        _write_json(path, {"sheets": list(names)})
+        _prune(_books_dir(), ".json", KEEP_BOOKS)
+
+
+def load(key: str, name: str) -> Optional[pd.DataFrame]:
+    """Arkusz z sidecara (memory-mapped) albo None, gdy go nie ma."""
+    if not available():
+        return None
+    base = _sheet_base(key, name)
+    meta = _read_json(base + ".json")
+    if not meta or meta.get("skip"):
+        return None
+    try:
+        table = feather.read_table(base + ".arrow", memory_map=True)
+    except Exception:
+        return None
+    _touch(base + ".json")
+    df = table.to_pandas(split_blocks=True)
+    # typy jak po parsowaniu Excela (np. datetime64[ns] zamiast [us])
+    fix = {c: t for c, t in meta["dtypes"].items() if str(df[c].dtype) != t}
+    return df.astype(fix) if fix else df
+
+
+def store(key: str, name: str, df: pd.DataFrame) -> bool:
+    """
+    Zapisuje arkusz jako sidecar. Tylko gdy odczyt wraca identyczną ramkę –
+    arkusze z kolumnami mieszanych typów albo nietekstowymi nagłówkami zostają w Excelu
+    (zapamiętane jako {"skip": true}, żeby nie próbować ponownie).
+    """
+    if not available():
+        return False
+    base = _sheet_base(key, name)
+    meta = _read_json(base + ".json")
+    if meta is not None:
+        return not meta.get("skip")
+    tmp = None
+    try:
+        if not all(isinstance(c, str) for c in df.columns) or not df.columns.is_unique:
+            raise TypeError("nagłówki kolumn nie są unikalnymi tekstami")
+        os.makedirs(_sheets_dir(), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=_sheets_dir(), suffix=".tmp")
+        os.close(fd)
+        feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+        os.replace(tmp, base + ".arrow")
+        tmp = None
+        _write_json(base + ".json", {"dtypes": {str(c): str(t) for c, t in df.dtypes.items()}})
+        back = load(key, name)
+        if back is not None and back.equals(df.reset_index(drop=True)):
+            with _LOCK:
+                _prune(_sheets_dir(), ".json", KEEP_SHEETS)
+            return True
+    except Exception:
+        pass
+    for p in (tmp, base + ".arrow"):
+        try:
+            if p:
+                os.remove(p)
+        except OSError:
+            pass
+    try:
+        _write_json(base + ".json", {"skip": True})
+    except OSError:
+        pass
+    return False
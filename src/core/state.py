@@ -1,14 +1,19 @@
-# core/state_local.py
+# core/state.py
 from __future__ import annotations
 
+import weakref
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+from core.drive_sync import get_sync
+from core.kpi_defs import fnb_kpi, rooms_kpi
+from core.schema import REGISTRY
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Dane w sesji
@@ -19,15 +24,59 @@ def _ensure_state():
         st.session_state["exec"] = {}       # {year: {month: DataFrame}}
     if "audit" not in st.session_state:
         st.session_state["audit"] = {}      # {year: {month: DataFrame}}
+    if "drive_plan_file" not in st.session_state:
+        # priorytet: secrets → UI może nadpisać
+        try:
+            ref = st.secrets.get("PLAN_FILE_ID") or st.secrets.get("PLAN_FILE_URL") or ""
+        except Exception:
+            ref = ""
+        st.session_state["drive_plan_file"] = ref
+    if "_drive_sync_token" not in st.session_state:
+        # koniec sesji (usunięcie jej stanu) → zaległe zapisy idą od razu, bez czekania na okno
+        token = st.session_state["_drive_sync_token"] = _SessionToken()
+        weakref.finalize(token, get_sync().kick)
+
+
+class _SessionToken:
+    """Znacznik życia sesji (weakref.finalize wymaga obiektu ze słabą referencją)."""
+
+
+def _sheet_name(year: int, month: int) -> str:
+    return f"WYKONANIE_{year}_{month:02d}"
+
+
+def load_exec_sheets(file_ref: str, year: int) -> Dict[int, pd.DataFrame]:
+    """
+    Arkusze WYKONANIE_YYYY_MM roku z pliku na Drive: jedno pobranie pliku,
+    równoległe parsowanie tylko tych arkuszy (cache per rewizja pliku – kolejne
+    wywołania i inne sesje kosztują jedno zapytanie o metadane).
+    """
+    from core.cloud_drive import read_sheets
+
+    names = {_sheet_name(year, m): m for m in range(1, 13)}
+    out: Dict[int, pd.DataFrame] = {}
+    for name, df in read_sheets(file_ref, names).items():
+        if "data" in df.columns:
+            out[names[name]] = _normalize_df(df)
+    return out
 
 
-def init_exec_year(year: int) -> None:
-    """Utwórz puste miesiące (1..12) w danym roku, jeśli brak."""
+def init_exec_year(year: int, drive_id_or_url: Optional[str] = None) -> None:
+    """Utwórz miesiące (1..12) w danym roku, jeśli brak – z arkuszy na Drive, gdy plik jest znany."""
     _ensure_state()
+    if drive_id_or_url:
+        st.session_state["drive_plan_file"] = drive_id_or_url
     y = st.session_state["exec"].setdefault(year, {})
-    for m in range(1, 13):
-        if m not in y:
-            y[m] = _empty_month_df(year, m)
+    missing = [m for m in range(1, 13) if m not in y]
+    cloud: Dict[int, pd.DataFrame] = {}
+    file_ref = st.session_state["drive_plan_file"]
+    if missing and file_ref:
+        try:
+            cloud = load_exec_sheets(file_ref, year)
+        except Exception as e:
+            st.warning(f"Nie udało się wczytać wykonania z Google Drive: {e}")
+    for m in missing:
+        y[m] = cloud[m] if m in cloud else _empty_month_df(year, m)
     a = st.session_state["audit"].setdefault(year, {})
     for m in range(1, 13):
         if m not in a:
@@ -67,30 +116,41 @@ def save_month_df(year: int, month: int, new_df: pd.DataFrame, user: str = "GM")
     old_i = old_i.reindex(columns=all_cols)
     new_i = new_i.reindex(columns=all_cols)
 
-    neq = (old_i.fillna(np.nan).astype(object) != new_i.fillna(np.nan).astype(object))
-    changes_list = []
-    ts = datetime.now()
-    for d, row in neq.iterrows():
-        changed_cols = row.index[row.values]
-        for c in changed_cols:
-            changes_list.append({
-                "czas": ts,
-                "uzytkownik": user,
-                "data": pd.to_datetime(d),
-                "kolumna": c,
-                "stara": _to_str(old_i.at[d, c]),
-                "nowa": _to_str(new_i.at[d, c]),
-            })
+    delta = _diff_rows(old_i, new_i, datetime.now(), user)
 
     st.session_state["exec"][year][month] = new_df.reset_index(drop=True)
 
-    if changes_list:
-        delta = pd.DataFrame(changes_list)
+    if not delta.empty:
         st.session_state["audit"][year][month] = pd.concat(
             [st.session_state["audit"][year][month], delta], ignore_index=True
         )
-        return delta
-    return pd.DataFrame(columns=["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"])
+
+    # podmiana arkusza w TYM SAMYM pliku na Drive – w tle, kolejne zapisy miesiąca się scalają
+    file_ref = st.session_state.get("drive_plan_file", "")
+    if file_ref and not delta.empty:
+        get_sync().enqueue(file_ref, _sheet_name(year, month), st.session_state["exec"][year][month])
+    return delta
+
+
+def drive_sync_caption() -> Tuple[str, Optional[str]]:
+    """
+    (podpis stanu synchronizacji z Drive, ostatni błąd lub None). Pusty podpis, dopóki kolejka
+    nie dostała żadnego zapisu tego pliku – sam skonfigurowany plik niczego jeszcze nie synchronizuje.
+    """
+    _ensure_state()
+    file_ref = st.session_state.get("drive_plan_file", "")
+    if not file_ref:
+        return "", None
+    s = get_sync().status(file_ref)
+    if s.syncing:
+        text = "Drive: zapisywanie…"
+    elif s.pending:
+        text = f"Drive: {s.pending} ark. czeka na zapis"
+    elif s.last_ok:
+        text = "Drive: zapisano " + datetime.fromtimestamp(s.last_ok).strftime("%H:%M:%S")
+    else:
+        text = ""
+    return text, s.last_error
 
 
 def get_audit(year: int, month: int) -> pd.DataFrame:
@@ -116,130 +176,70 @@ def _normalize_df(df: pd.DataFrame) -> pd.DataFrame:
     return out.reset_index(drop=True)
 
 
-def _to_str(v) -> str:
-    if pd.isna(v):
-        return ""
-    return str(v)
+def _to_str(v: np.ndarray) -> np.ndarray:
+    """Wektorowo: komórki → tekst, puste → ''."""
+    out = v.astype(str)
+    out[pd.isna(v)] = ""
+    return out
+
+
+def _diff_rows(old_i: pd.DataFrame, new_i: pd.DataFrame, ts: datetime, user: str) -> pd.DataFrame:
+    """Diff (maska → np.nonzero) dwóch ramek z indeksem 'data'; kolejność: dzień, potem kolumna."""
+    new_i = new_i.reindex(index=old_i.index)
+    old_v = old_i.to_numpy(dtype=object, copy=True)
+    new_v = new_i.to_numpy(dtype=object, copy=True)
+    old_na, new_na = pd.isna(old_v), pd.isna(new_v)
+    old_v[old_na] = np.nan
+    new_v[new_na] = np.nan
+    r, c = np.nonzero((old_v != new_v) & ~(old_na & new_na))
+    return pd.DataFrame(
+        {
+            "czas": np.full(len(r), np.datetime64(ts, "ns")),
+            "uzytkownik": user,
+            "data": old_i.index[r],
+            "kolumna": np.asarray(old_i.columns, dtype=object)[c],
+            "stara": _to_str(old_v[r, c]),
+            "nowa": _to_str(new_v[r, c]),
+        },
+        columns=["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"],
+    )
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# KPI – kompatybilne nazwy (stare i nowe)
+# KPI – kompatybilne nazwy (stare i nowe): pozycje kolumn z core.schema.REGISTRY
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _col(df: pd.DataFrame, *candidates: str) -> pd.Series:
-    """Zwróć serię pierwszej istniejącej kolumny z listy (float, NaN→0)."""
-    for c in candidates:
-        if c in df.columns:
-            return pd.to_numeric(df[c], errors="coerce").fillna(0.0)
-    # brak kolumny → zera
-    return pd.Series(0.0, index=df.index, dtype="float64")
+def _month_totals(df: pd.DataFrame) -> Dict[str, float]:
+    """Sumy grup KPI miesiąca; stare i nowe nazwy kolumn rozpoznaje rejestr (bez skanowania prefiksów)."""
+    return REGISTRY.kpi_totals(REGISTRY.frame_sums(df))
 
 
-def _sum_prefix(df: pd.DataFrame, prefixes: List[str]) -> float:
-    cols = [c for c in df.columns if any(c.startswith(p) for p in prefixes)]
-    if not cols:
-        return 0.0
-    val = pd.to_numeric(df[cols].stack(), errors="coerce").fillna(0.0).sum()
-    return float(val)
+def _ytd_totals(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
+    _ensure_state()
+    data = st.session_state["exec"] if not exec_state else exec_state
+    sums = np.zeros(len(REGISTRY.columns))
+    for m in range(1, month + 1):
+        df = data.get(year, {}).get(m)
+        if isinstance(df, pd.DataFrame):
+            sums += REGISTRY.frame_sums(df)
+    return REGISTRY.kpi_totals(sums)
 
 
-# ── Pokoje (miesiąc)
+# ── Pokoje / F&B – miesiąc
 
 def kpi_rooms_month(df: pd.DataFrame) -> Dict[str, float]:
-    # dostępne: nowe (pokoje_dostepne_qty) lub stare (pokoje_do_sprzedania)
-    rooms_available = float((_col(df, "pokoje_dostepne_qty", "pokoje_do_sprzedania")
-                             - _col(df, "pokoje_oos_qty", "pokoje_oos")).sum())
-    sold = float((_col(df, "pokoje_sprzedane_bez_qty", "sprzedane_pokoje_bez")
-                  + _col(df, "pokoje_sprzedane_ze_qty", "sprzedane_pokoje_ze")).sum())
-    revenue_rooms = float(_col(df, "pokoje_przychod_netto_pln", "przychody_pokoje_netto").sum())
-
-    frekwencja = (sold / rooms_available) if rooms_available > 0 else 0.0
-    revpor = (revenue_rooms / sold) if sold > 0 else 0.0
-
-    # koszty wydziałowe (Pokoje) – nowe prefiks 'koszt_r_' lub stare 'r_'
-    k_wydzialowe = _sum_prefix(df, ["koszt_r_", "r_"])
-    wynik = revenue_rooms - k_wydzialowe
-
-    return {
-        "zdolnosc": rooms_available,
-        "sprzedane": sold,
-        "frekwencja": frekwencja,
-        "revpor": revpor,
-        "k_wydzialowe": k_wydzialowe,
-        "wynik": wynik,
-    }
+    return rooms_kpi(_month_totals(df))
 
 
 def kpi_fnb_month(df: pd.DataFrame) -> Dict[str, float]:
-    # sprzedaż F&B = suma kolumn zaczynających się od 'fnb_' (wyłączamy ew. pola nie-PLN jeżeli się pojawią)
-    fnb_cols = [c for c in df.columns if c.startswith("fnb_")]
-    sprzedaz_fnb = 0.0
-    if fnb_cols:
-        # bierzemy tylko numeryczne
-        sprzedaz_fnb = float(pd.to_numeric(df[fnb_cols].stack(), errors="coerce").fillna(0.0).sum())
-
-    # koszty F&B – nowe 'koszt_g_' lub stare 'g_'
-    g_k_razem = _sum_prefix(df, ["koszt_g_", "g_"])
-    g_wynik = sprzedaz_fnb - g_k_razem
-
-    return {
-        "sprzedaz_fnb": sprzedaz_fnb,
-        "g_k_razem": g_k_razem,
-        "g_wynik": g_wynik,
-    }
+    return fnb_kpi(_month_totals(df))
 
 
 # ── Pokoje / F&B – YTD
 
 def kpi_rooms_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
-    _ensure_state()
-    data = st.session_state["exec"] if not exec_state else exec_state
-    total = {"zdolnosc": 0.0, "sprzedane": 0.0, "frekwencja": 0.0, "revpor": 0.0, "k_wydzialowe": 0.0, "wynik": 0.0}
-    agg_available = 0.0
-    agg_sold = 0.0
-    agg_revenue = 0.0
-    agg_koszty = 0.0
-
-    for m in range(1, month + 1):
-        df = data.get(year, {}).get(m)
-        if not isinstance(df, pd.DataFrame):
-            continue
-        # MIESIĄC
-        available = float((_col(df, "pokoje_dostepne_qty", "pokoje_do_sprzedania")
-                           - _col(df, "pokoje_oos_qty", "pokoje_oos")).sum())
-        sold = float((_col(df, "pokoje_sprzedane_bez_qty", "sprzedane_pokoje_bez")
-                      + _col(df, "pokoje_sprzedane_ze_qty", "sprzedane_pokoje_ze")).sum())
-        revenue = float(_col(df, "pokoje_przychod_netto_pln", "przychody_pokoje_netto").sum())
-        k_r = _sum_prefix(df, ["koszt_r_", "r_"])
-        agg_available += available
-        agg_sold += sold
-        agg_revenue += revenue
-        agg_koszty += k_r
-
-    total["zdolnosc"] = agg_available
-    total["sprzedane"] = agg_sold
-    total["frekwencja"] = (agg_sold / agg_available) if agg_available > 0 else 0.0
-    total["revpor"] = (agg_revenue / agg_sold) if agg_sold > 0 else 0.0
-    total["k_wydzialowe"] = agg_koszty
-    total["wynik"] = agg_revenue - agg_koszty
-    return total
+    return rooms_kpi(_ytd_totals(exec_state, year, month))
 
 
 def kpi_fnb_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
-    _ensure_state()
-    data = st.session_state["exec"] if not exec_state else exec_state
-    sprzedaz = 0.0
-    koszty = 0.0
-    for m in range(1, month + 1):
-        df = data.get(year, {}).get(m)
-        if not isinstance(df, pd.DataFrame):
-            continue
-        fnb_cols = [c for c in df.columns if c.startswith("fnb_")]
-        if fnb_cols:
-            sprzedaz += float(pd.to_numeric(df[fnb_cols].stack(), errors="coerce").fillna(0.0).sum())
-        koszty += _sum_prefix(df, ["koszt_g_", "g_"])
-    return {
-        "sprzedaz_fnb": sprzedaz,
-        "g_k_razem": koszty,
-        "g_wynik": sprzedaz - koszty,
-    }
+    return fnb_kpi(_ytd_totals(exec_state, year, month))
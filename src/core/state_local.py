@@ -1,226 +1,192 @@
 # src/core/state_local.py
 from __future__ import annotations
 
+import os
+import re
 from datetime import date, datetime
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+from core.audit_log import AUDIT_COLS, AuditLog
+from core.exec_store import YearStore
+from core.kpi_defs import fnb_kpi, rooms_kpi
+from core.memo import memoize  # noqa: F401  (re-eksport dla _wykonanie)
+from core.schema import (  # noqa: F401  (re-eksport dla dotychczasowych importów)
+    CURRENT_SCHEMA_VERSION,
+    NEW_SCHEMA_COLS,
+    OLD2NEW,
+    REGISTRY,
+    SCHEMA_VERSION_ATTR,
+    apply_new_schema,
+    renames_since,
+)
+
+if TYPE_CHECKING:  # moduły importów/eksportu i bazy ładowane dopiero przy użyciu (zimny start)
+    from core.exec_db import ExecDB
+    from core.exec_ingest import IngestReport
+
 # ──────────────────────────────────────────────────────────────────────────────
-# 1) Nowy, docelowy schemat nazw (spójne prefiksy + sufiksy)
+# 1) Warstwa danych w sesji + migracja do nowego schematu (łańcuch w core.schema)
 # ──────────────────────────────────────────────────────────────────────────────
 
-# Stare -> Nowe (komplet mapowań używanych dotąd)
-OLD2NEW: Dict[str, str] = {
-    # POKOJE (przychody/ilości)
-    "pokoje_do_sprzedania": "pokoje_dostepne_qty",
-    "pokoje_oos": "pokoje_oos_qty",
-    "sprzedane_pokoje_bez": "pokoje_sprzedane_bez_qty",
-    "sprzedane_pokoje_ze": "pokoje_sprzedane_ze_qty",
-    "przychody_pokoje_netto": "pokoje_przychod_netto_pln",
-    # F&B – przychody
-    "fnb_sniadania_pakietowe": "fnb_sniadania_pakietowe_pln",
-    "fnb_kolacje_pakietowe": "fnb_kolacje_pakietowe_pln",
-    "fnb_zywnosc_a_la_carte": "fnb_zywnosc_a_la_carte_pln",
-    "fnb_napoje_a_la_carte": "fnb_napoje_a_la_carte_pln",
-    "fnb_zywnosc_bankiety": "fnb_zywnosc_bankiety_pln",
-    "fnb_napoje_bankiety": "fnb_napoje_bankiety_pln",
-    "fnb_catering": "fnb_catering_pln",
-    "fnb_wynajem_sali": "sprzedaz_wynajem_sali_pln",
-    # Inne centra – przychody
-    "proc_pokoi_parking": "inne_proc_pokoi_parking_pct",
-    "przychody_parking": "inne_parking_przychod_pln",
-    "przychody_sklep_recepcyjny": "inne_sklep_recepcja_przychod_pln",
-    "przychody_pralnia_gosci": "inne_pralnia_gosci_przychod_pln",
-    "przychody_transport_gosci": "inne_transport_przychod_pln",
-    "przychody_rekreacja": "inne_rekreacja_przychod_pln",
-    "przychody_pozostale": "inne_pozostale_przychod_pln",
-    # KOSZTY – Pokoje (prefiks r_ -> koszt_r_)
-    "r_osobowe_wynagrodzenia": "koszt_r_osobowe_wynagrodzenia_pln",
-    "r_osobowe_zus": "koszt_r_osobowe_zus_pln",
-    "r_osobowe_pfron": "koszt_r_osobowe_pfron_pln",
-    "r_osobowe_wyzywienie": "koszt_r_osobowe_wyzywienie_pln",
-    "r_osobowe_odziez_bhp": "koszt_r_osobowe_odziez_bhp_pln",
-    "r_osobowe_medyczne": "koszt_r_osobowe_medyczne_pln",
-    "r_osobowe_inne": "koszt_r_osobowe_inne_pln",
-    "r_materialy_eksploatacyjne_spozywcze": "koszt_r_materialy_eksplo_spozywcze_pln",
-    "r_materialy_kosmetyki_srodki": "koszt_r_materialy_kosmetyki_czystosc_pln",
-    "r_materialy_inne_biurowe": "koszt_r_materialy_inne_biurowe_pln",
-    "r_uslugi_sprzatania": "koszt_r_uslugi_sprzatanie_pln",
-    "r_uslugi_pranie_zew": "koszt_r_uslugi_pranie_zew_pln",
-    "r_uslugi_pranie_odziezy_sluzbowej": "koszt_r_uslugi_pranie_odziezy_pln",
-    "r_uslugi_wynajem_sprzetu": "koszt_r_uslugi_wynajem_sprzetu_pln",
-    "r_uslugi_inne_bhp": "koszt_r_uslugi_inne_pln",
-    "r_pozostale_prowizje_ota_gds": "koszt_r_prowizje_ota_gds_pln",
-    # KOSZTY – F&B (prefiks g_ -> koszt_g_)
-    "g_koszt_surowca_zywnosc_pln": "koszt_g_surowiec_zywnosc_pln",
-    "g_koszt_surowca_napoje_pln": "koszt_g_surowiec_napoje_pln",
-    "g_osobowe_wynagrodzenia": "koszt_g_osobowe_wynagrodzenia_pln",
-    "g_osobowe_zus": "koszt_g_osobowe_zus_pln",
-    "g_osobowe_pfron": "koszt_g_osobowe_pfron_pln",
-    "g_osobowe_wyzywienie": "koszt_g_osobowe_wyzywienie_pln",
-    "g_osobowe_odziez_bhp": "koszt_g_osobowe_odziez_bhp_pln",
-    "g_osobowe_medyczne": "koszt_g_osobowe_medyczne_pln",
-    "g_osobowe_inne": "koszt_g_osobowe_inne_pln",
-    "g_materialy_zastawa": "koszt_g_materialy_zastawa_pln",
-    "g_materialy_drobne_wyposazenie": "koszt_g_materialy_drobne_wypos_pln",
-    "g_materialy_bielizna_dekoracje": "koszt_g_materialy_bielizna_dekor_pln",
-    "g_materialy_karty_dan": "koszt_g_materialy_karty_dan_pln",
-    "g_materialy_srodki_czystosci": "koszt_g_materialy_srodki_czystosci_pln",
-    "g_materialy_inne": "koszt_g_materialy_inne_pln",
-    "g_uslugi_sprzatania_tapicerki": "koszt_g_uslugi_sprzatanie_pln",
-    "g_uslugi_pranie_odziezy_sluzbowej": "koszt_g_uslugi_pranie_odziezy_pln",
-    "g_uslugi_pranie_bielizny_gastro": "koszt_g_uslugi_pranie_bielizny_pln",
-    "g_uslugi_wynajem_sprzetu_lokali": "koszt_g_uslugi_wynajem_sprzetu_pln",
-    "g_uslugi_inne": "koszt_g_uslugi_inne_pln",
-}
-
-# Pełen zbiór nowych nazw (przydaje się do uzupełniania braków)
-NEW_SCHEMA_COLS: List[str] = sorted(set(OLD2NEW.values())) + [
-    # nowo-nowe, które nie mają odpowiednika w OLD (gdyby były dodawane później)
-    "pokoje_dostepne_qty",
-    "pokoje_oos_qty",
-    "pokoje_sprzedane_bez_qty",
-    "pokoje_sprzedane_ze_qty",
-    "pokoje_przychod_netto_pln",
-]
+DEFAULT_HOTEL = "Hotel"  # aktywny hotel: session_state["hotel"] (core.portfolio)
 
-# ──────────────────────────────────────────────────────────────────────────────
-# 2) Warstwa danych w sesji + migracja do nowego schematu
-# ──────────────────────────────────────────────────────────────────────────────
 
 def _ensure_state() -> None:
     if "exec" not in st.session_state:
-        st.session_state["exec"] = {}       # {rok: {miesiac: DataFrame}}
+        st.session_state["exec"] = {}       # {rok: YearStore}  (YearStore ~ {miesiac: DataFrame})
     if "audit" not in st.session_state:
-        st.session_state["audit"] = {}      # {rok: {miesiac: DataFrame}}
+        st.session_state["audit"] = {}      # {rok: {miesiac: AuditLog}}
+
+
+def setting(name: str) -> Optional[str]:
+    """Ustawienie z st.secrets, a bez niego – ze zmiennej środowiskowej."""
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    return value or os.environ.get(name)
+
+
+def _exec_db() -> Optional[ExecDB]:
+    """
+    Trwały magazyn (SQLite) aktywnego hotelu, jeśli skonfigurowany:
+      - hotel domyślny – secrets/env EXEC_DB_PATH,
+      - pozostałe hotele portfela – PORTFOLIO_DB_DIR/<hotel>.db.
+    Bez konfiguracji dane żyją wyłącznie w sesji (jak dotąd).
+    """
+    hotel = st.session_state.get("hotel", DEFAULT_HOTEL)
+    if hotel == DEFAULT_HOTEL:
+        path = setting("EXEC_DB_PATH")
+    else:
+        from core.portfolio import hotel_db_path  # nazwa bez separatorów ścieżek – plik zostaje w katalogu
+
+        root = setting("PORTFOLIO_DB_DIR")
+        path = hotel_db_path(str(root), hotel) if root else None
+    if not path:
+        return None
+    from core.exec_db import open_exec_db
+
+    return open_exec_db(str(path), REGISTRY.columns)
+
+
+def storage_caption() -> str:
+    """Opis miejsca przechowywania danych (do paska bocznego)."""
+    db = _exec_db()
+    if db is None:
+        return "Dane żyją lokalnie w sesji. Eksport do XLSX wykonasz w zakładce „Wykonanie”."
+    return f"Dane zapisywane w lokalnej bazie SQLite ({db.path}); miesiące ładowane przy pierwszym użyciu."
+
+
+def _new_year_store(year: int) -> YearStore:
+    # widoki miesięcy niosą znacznik bieżącej wersji → apply_new_schema nie kopiuje ich ponownie
+    db = _exec_db()
+    return YearStore(
+        year,
+        REGISTRY.columns,
+        frame_attrs={SCHEMA_VERSION_ATTR: CURRENT_SCHEMA_VERSION},
+        loader=(lambda m: db.load_month(year, m)) if db is not None else None,
+    )
+
+
+def _year_store(year: int) -> YearStore:
+    """Zwraca magazyn roku; stary układ {miesiac: DataFrame} przepisuje jednorazowo do YearStore."""
+    ex = st.session_state["exec"]
+    store = ex.get(year)
+    if isinstance(store, YearStore):
+        return store
+    new_store = _new_year_store(year)
+    for m, df in (store or {}).items():
+        if isinstance(df, pd.DataFrame) and 1 <= int(m) <= 12:
+            new_store.write_month(int(m), apply_new_schema(df))
+    ex[year] = new_store
+    return new_store
 
 
 def init_exec_year(year: int) -> None:
-    """Tworzy puste miesiące 1..12; zapewnia nowy schemat."""
+    """Tworzy magazyn roku (12 miesięcy, nowy schemat); dzienniki zmian powstają przy pierwszym użyciu."""
     _ensure_state()
-    y = st.session_state["exec"].setdefault(year, {})
-    for m in range(1, 13):
-        if m not in y:
-            y[m] = _new_empty_month_df(year, m)
-        else:
-            y[m] = apply_new_schema(y[m])  # doprowadź istniejące do schematu
-
-    a = st.session_state["audit"].setdefault(year, {})
-    for m in range(1, 13):
-        if m not in a:
-            a[m] = _empty_audit_df()
-        else:
-            a[m] = _normalize_audit(a[m])
-
-
-def _new_empty_month_df(year: int, month: int) -> pd.DataFrame:
-    days = pd.date_range(f"{year}-{month:02d}-01", periods=32, freq="D")
-    days = days[days.month == month]
-    df = pd.DataFrame({"data": pd.to_datetime(days)})
-    for c in NEW_SCHEMA_COLS:
-        if c not in df.columns:
-            df[c] = np.nan
-    df = df.astype({"data": "datetime64[ns]"})
-    return df
-
-
-def _empty_audit_df() -> pd.DataFrame:
-    cols = ["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"]
-    dtypes = {
-        "czas": "datetime64[ns]",
-        "uzytkownik": "string",
-        "data": "datetime64[ns]",
-        "kolumna": "string",
-        "stara": "string",
-        "nowa": "string",
-    }
-    return pd.DataFrame(columns=cols).astype(dtypes)
-
-
-def _normalize_audit(df: pd.DataFrame) -> pd.DataFrame:
-    cols = {"czas": "datetime64[ns]", "uzytkownik": "string", "data": "datetime64[ns]",
-            "kolumna": "string", "stara": "string", "nowa": "string"}
-    out = df.copy()
-    for c, t in cols.items():
-        if c in out.columns:
-            try:
-                out[c] = out[c].astype(t)
-            except Exception:
-                pass
-    return out
+    _year_store(year)
 
 
-def apply_new_schema(df: pd.DataFrame) -> pd.DataFrame:
+def _audit_log(year: int, month: int) -> AuditLog:
     """
-    Migruje DataFrame do nowych nazw:
-    - rename starych -> nowe,
-    - dopisuje brakujące nowe kolumny (NaN),
-    - nie usuwa kolumn ponad schemat (żeby nic nie zginęło).
+    Dziennik zmian miesiąca. Stary audit (DataFrame) przepisuje jednorazowo do AuditLog,
+    a nazwy kolumn doprowadza do bieżącej wersji schematu (raz na dziennik).
     """
-    if df is None or df.empty:
-        return df
-    out = df.copy()
-    # rename
-    ren = {old: new for old, new in OLD2NEW.items() if old in out.columns and new not in out.columns}
-    if ren:
-        out = out.rename(columns=ren)
-    # dopisz brakujące nowe
-    add_cols = [c for c in NEW_SCHEMA_COLS if c not in out.columns]
-    for c in add_cols:
-        out[c] = np.nan
-    # kolumna data
-    if "data" in out.columns:
-        out["data"] = pd.to_datetime(out["data"], errors="coerce")
-        out = out.sort_values("data")
-    return out.reset_index(drop=True)
+    months = st.session_state["audit"].setdefault(year, {})
+    log = months.get(month)
+    if not isinstance(log, AuditLog):
+        fresh = log is None
+        db = _exec_db() if fresh else None
+        log = months[month] = AuditLog.from_frame(db.load_audit(year, month) if db is not None else log)
+        if fresh:
+            log.schema_version = CURRENT_SCHEMA_VERSION
+    if log.schema_version < CURRENT_SCHEMA_VERSION:
+        log.rename_columns(renames_since(log.schema_version))
+        log.schema_version = CURRENT_SCHEMA_VERSION
+    return log
 
 
 def migrate_to_new_schema() -> None:
     """
-    Jednorazowa, bezpieczna migracja całej sesji do nowych nazw.
+    Bezpieczna migracja całej sesji do bieżącej wersji schematu (raz na wersję).
     Migruje:
-      - exec[rok][miesiac] – DataFrame'y z danymi,
-      - audit[rok][miesiac] – pole 'kolumna' (stare nazwy na nowe).
+      - exec[rok] – stare układy {miesiac: DataFrame} → YearStore (kroki łańcucha z core.schema),
+      - audit[rok][miesiac] – słownik kolumn (stare nazwy na nowe).
+    Obiekty już w bieżącej wersji są pomijane bez kopiowania.
     """
     _ensure_state()
-    if st.session_state.get("_migration_new_schema_v1_done"):
+    if st.session_state.get("_schema_version", 0) >= CURRENT_SCHEMA_VERSION:
         return
 
-    # Exec
-    ex = st.session_state["exec"]
-    for y, months in list(ex.items()):
-        for m, df in list(months.items()):
-            if isinstance(df, pd.DataFrame):
-                ex[y][m] = apply_new_schema(df)
-
-    # Audit – przemapuj nazwy kolumn w historii
-    ad = st.session_state["audit"]
-    for y, months in list(ad.items()):
-        for m, df in list(months.items()):
-            if isinstance(df, pd.DataFrame) and "kolumna" in df.columns:
-                df = df.copy()
-                df["kolumna"] = df["kolumna"].map(lambda k: OLD2NEW.get(str(k), str(k)))
-                ad[y][m] = _normalize_audit(df)
-
-    st.session_state["_migration_new_schema_v1_done"] = True
+    for y in list(st.session_state["exec"].keys()):
+        _year_store(y)
+    for y, months in list(st.session_state["audit"].items()):
+        for m in list(months.keys()):
+            _audit_log(y, m)
+
+    st.session_state["_schema_version"] = CURRENT_SCHEMA_VERSION
     st.toast("Migracja nazw do nowego schematu zakończona.", icon="✅")
 
 
 def get_month_df(year: int, month: int) -> pd.DataFrame:
+    """Widok miesiąca z magazynu roku (bez kopii, tylko do odczytu; zawsze nowy schemat)."""
     _ensure_state()
-    df = st.session_state["exec"][year][month]
-    return apply_new_schema(df)  # zawsze oddaj w nowym schemacie
+    return _year_store(year).month_frame(month)
 
 
 def _normalize_df_for_save(df: pd.DataFrame) -> pd.DataFrame:
-    out = apply_new_schema(df)  # wymuś schemat przed zapisem
-    if "data" in out.columns:
-        out["data"] = pd.to_datetime(out["data"], errors="coerce")
-        out = out.sort_values("data")
-    return out.reset_index(drop=True)
+    # wymuś schemat przed zapisem (ramka z bieżącym znacznikiem wersji – bez kopii);
+    # kolejność wierszy nie ma znaczenia – zapis i diff idą po dacie
+    return apply_new_schema(df)
+
+
+def _diff_audit_rows(old_i: pd.DataFrame, new_i: pd.DataFrame, ts: datetime, user: str) -> pd.DataFrame:
+    """
+    Wektorowy diff dwóch ramek (indeks = data, te same kolumny) → wiersze audytu.
+    Porównuje wartości liczbowe (tak, jak trafią do magazynu); puste → puste nie jest zmianą.
+    Kolejność: dzień po dniu, w dniu kolumny w kolejności ramek.
+    """
+    new_i = new_i.reindex(index=old_i.index).apply(pd.to_numeric, errors="coerce")
+    old_v = old_i.to_numpy(dtype="float64", na_value=np.nan)
+    new_v = new_i.to_numpy(dtype="float64", na_value=np.nan)
+    mask = (old_v != new_v) & ~(np.isnan(old_v) & np.isnan(new_v))
+    r, c = np.nonzero(mask)
+    return pd.DataFrame(
+        {
+            "czas": np.full(len(r), np.datetime64(ts, "ns")),
+            "uzytkownik": user,
+            "data": old_i.index[r],
+            "kolumna": np.asarray(old_i.columns, dtype=object)[c],  # już nowe nazwy
+            "stara": old_v[r, c],
+            "nowa": new_v[r, c],
+        },
+        columns=AUDIT_COLS,
+    )
 
 
 def save_month_df(year: int, month: int, new_df: pd.DataFrame, user: str = "GM") -> pd.DataFrame:
@@ -230,46 +196,243 @@ def save_month_df(year: int, month: int, new_df: pd.DataFrame, user: str = "GM")
     _ensure_state()
     new_df = _normalize_df_for_save(new_df)
 
-    old = apply_new_schema(st.session_state["exec"][year][month])
+    store = _year_store(year)
+    old = store.month_frame(month)
     old_i = old.set_index("data")
     new_i = new_df.set_index("data")
 
-    # wyrównanie kolumn (pełny zbiór)
-    all_cols = sorted(set(old_i.columns) | set(new_i.columns))
+    # wyrównanie kolumn – porównujemy to, co faktycznie trafia do magazynu
+    all_cols = sorted(store.columns)
     old_i = old_i.reindex(columns=all_cols)
     new_i = new_i.reindex(columns=all_cols)
 
-    neq = (old_i.fillna(np.nan).astype(object) != new_i.fillna(np.nan).astype(object))
-    changes = []
-    ts = datetime.now()
-    for d, row in neq.iterrows():
-        for c in row.index[row.values]:
-            changes.append(
-                {
-                    "czas": ts,
-                    "uzytkownik": user,
-                    "data": pd.to_datetime(d),
-                    "kolumna": c,  # już nowe nazwy
-                    "stara": "" if pd.isna(old_i.at[d, c]) else str(old_i.at[d, c]),
-                    "nowa": "" if pd.isna(new_i.at[d, c]) else str(new_i.at[d, c]),
-                }
-            )
+    delta = _diff_audit_rows(old_i, new_i, datetime.now(), user)
+
+    store.write_month(month, new_df)  # zapis w miejscu, do tablicy roku
 
-    st.session_state["exec"][year][month] = new_df.reset_index(drop=True)
+    # dziennik otwieramy PRZED zapisem do bazy – pierwsze otwarcie wczytuje audit z SQLite,
+    # więc po zapisie wczytałby już `delta` i dopisanie niżej zdublowałoby wpisy
+    log = _audit_log(year, month)
+    _persist(year, month, delta)
 
-    if not changes:
-        return pd.DataFrame(columns=["czas", "uzytkownik", "data", "kolumna", "stara", "nowa"])
-    delta = pd.DataFrame(changes)
-    # audit – trzymajmy wszystko w nowych nazwach
-    st.session_state["audit"][year][month] = pd.concat(
-        [st.session_state["audit"][year][month], _normalize_audit(delta)], ignore_index=True
+    # audit – append-only, wszystko w nowych nazwach
+    log.append(delta)
+    return delta
+
+
+def _persist(year: int, month: int, delta: pd.DataFrame) -> None:
+    """Do bazy (jeśli skonfigurowana) tylko zmienione komórki + audit – jedna transakcja."""
+    db = _exec_db()
+    if db is None or delta.empty:
+        return
+    try:
+        db.save_month(year, month, delta)
+    except Exception as e:
+        st.warning(f"Nie udało się zapisać do bazy SQLite: {e}")
+
+
+def _edit_cells(store: YearStore, month: int, edits: Mapping) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """{data: {kolumna: wartość}} → (dni miesiąca od 0, indeksy kolumn, wartości); kolumny spoza schematu pomijane."""
+    days, cols, vals = [], [], []
+    for day, cells in edits.items():
+        for col, value in cells.items():
+            if col in store.col_index:
+                days.append(day)
+                cols.append(store.col_index[col])
+                vals.append(value)
+    rows = store.day_ordinals(days) - store.month_slice(month).start if days else np.zeros(0, dtype="int64")
+    values = pd.to_numeric(pd.Series(vals, dtype=object), errors="coerce").to_numpy("float64", na_value=np.nan)
+    return rows, np.asarray(cols, dtype="int64"), values
+
+
+def save_cell_edits(year: int, month: int, edits: Mapping, user: str = "GM") -> pd.DataFrame:
+    """
+    Zapis tylko edytowanych komórek ({data: {kolumna: wartość}}, np. z edited_rows data_editor).
+    Audyt budowany wprost ze starych/nowych wartości, sumy (KPI) korygowane przyrostowo,
+    do bazy trafiają tylko zmienione komórki – koszt zależy od liczby komórek, nie od miesiąca.
+    """
+    _ensure_state()
+    store = _year_store(year)
+    rows, cols, old, new = store.write_cells(month, *_edit_cells(store, month, edits))
+    names = np.asarray(store.columns, dtype=object)[cols]
+    order = np.lexsort((names, rows))  # dzień po dniu, w dniu kolumny alfabetycznie (jak save_month_df)
+    rows, names, old, new = rows[order], names[order], old[order], new[order]
+    sl = store.month_slice(month)
+    delta = pd.DataFrame(
+        {
+            "czas": np.full(len(rows), np.datetime64(datetime.now(), "ns")),
+            "uzytkownik": user,
+            "data": store.dates[sl.start + rows],
+            "kolumna": names,
+            "stara": old,
+            "nowa": new,
+        },
+        columns=AUDIT_COLS,
     )
+    if delta.empty:
+        return delta
+
+    log = _audit_log(year, month)  # przed zapisem do bazy (patrz save_month_df)
+    _persist(year, month, delta)
+    log.append(delta)
     return delta
 
 
 def get_audit(year: int, month: int) -> pd.DataFrame:
+    """Cała historia zmian miesiąca (materializuje wszystkie wpisy – do eksportu)."""
+    _ensure_state()
+    return _audit_log(year, month).to_frame()
+
+
+def query_audit(
+    year: int,
+    month: int,
+    limit: int = 50,
+    offset: int = 0,
+    *,
+    day=None,
+    column: str | None = None,
+    user: str | None = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Strona historii zmian (najnowsze pierwsze) + liczba wszystkich pasujących wpisów."""
+    _ensure_state()
+    log = _audit_log(year, month)
+    key = (log.generation, limit, offset, day, column, user)
+    return memoize(f"audit_{year}_{month}", key,
+                   lambda: log.query(limit, offset, day=day, column=column, user=user))
+
+
+_EXEC_SHEET_RE = re.compile(r"^WYKONANIE_(\d{4})_(\d{2})$")
+
+
+def import_exec_workbook(
+    book: Mapping, previous: Optional[Dict[str, str]] = None, user: str = "import"
+) -> Dict[Tuple[int, int], int]:
+    """
+    Wczytuje arkusze WYKONANIE_YYYY_MM z pliku (np. z eksportu) do magazynu.
+    Z `previous` (odciski arkuszy poprzedniej wersji, data_io.sheet_fingerprints)
+    bierze tylko arkusze zmienione – niezmienione miesiące nie są ani parsowane,
+    ani unieważniane. Zwraca {(rok, miesiąc): liczba zmian w audycie}.
+    """
+    from core.data_io import LazyWorkbook, changed_sheets
+
+    _ensure_state()
+    names = changed_sheets(book, previous) if isinstance(book, LazyWorkbook) else list(book)
+    out: Dict[Tuple[int, int], int] = {}
+    for name in names:
+        hit = _EXEC_SHEET_RE.match(str(name))
+        if not hit:
+            continue
+        year, month = int(hit.group(1)), int(hit.group(2))
+        df = book[name]
+        if not 1 <= month <= 12 or "data" not in df.columns:
+            continue
+        out[(year, month)] = len(save_month_df(year, month, df, user=user))
+    return out
+
+
+def ingest_operational_workbook(src, user: str = "import") -> IngestReport:
+    """
+    Import arkuszy operacyjnych (raw_matrix / raw / cost*) do magazynu – core.exec_ingest.
+    Komórki z pliku nadpisują wartości w sesji (puste w pliku niczego nie kasują).
+    Jedna partia audytu (wspólny znacznik czasu) i, przy bazie SQLite, jedna transakcja.
+    """
+    from core.exec_ingest import stage_workbook
+
+    _ensure_state()
+    staged, rep = stage_workbook(src, REGISTRY.columns)
+    ts = np.datetime64(datetime.now(), "ns")
+    db = _exec_db()
+    batch = []
+    for y, (vals, touched) in sorted(staged.years.items()):
+        store = _year_store(y)
+        cols = np.asarray(store.columns, dtype=object)
+        for m in range(1, 13):
+            sl = store.month_slice(m)
+            t = touched[sl]
+            if not t.any():
+                continue
+            store.ensure_loaded(m)
+            old = store.values[sl]
+            new = np.where(t, vals[sl], old)
+            r, c = np.nonzero(t & (old != new))
+            if not len(r):
+                continue
+            delta = pd.DataFrame(
+                {
+                    "czas": np.full(len(r), ts),
+                    "uzytkownik": user,
+                    "data": store.dates[sl][r],
+                    "kolumna": cols[c],
+                    "stara": old[r, c],
+                    "nowa": new[r, c],
+                },
+                columns=AUDIT_COLS,
+            )
+            store.write_values(m, new)
+            _audit_log(y, m).append(delta)
+            if db is not None:
+                batch.append((y, m, delta))
+    if batch:
+        try:
+            db.save_many(batch)
+        except Exception as e:
+            st.warning(f"Nie udało się zapisać do bazy SQLite: {e}")
+    return rep
+
+
+def export_exec_archive(fmt: str = "parquet", dest: Optional[str] = None) -> str:
+    """Cały stan sesji (exec + audit) do archiwum ZIP (core.exec_archive); zwraca ścieżkę."""
+    from core.exec_archive import export_archive
+
+    migrate_to_new_schema()
+    for y in list(st.session_state["exec"]):
+        for m in range(1, 13):
+            _audit_log(y, m)
+    return export_archive(st.session_state["exec"], st.session_state["audit"], fmt, dest,
+                          schema_version=CURRENT_SCHEMA_VERSION)
+
+
+def import_exec_archive(src) -> Dict:
+    """
+    Zastępuje stan sesji zawartością archiwum (dokładnie – wartości, audit, kolejność); zwraca manifest.
+    Przy bazie SQLite zastępuje też całą jej zawartość (jedna transakcja) – inaczej przywrócenie
+    znikałoby po restarcie, a miesiące spoza archiwum dociągałyby stare dane z bazy.
+    Gdy zapis do bazy się nie uda, sesja wraca do stanu sprzed importu, a błąd idzie wyżej.
+    """
+    from core.exec_archive import import_archive
+
     _ensure_state()
-    return _normalize_audit(st.session_state["audit"][year][month].copy())
+    exec_state, audit_state, manifest = import_archive(src, store_factory=lambda y, cols: _new_year_store(y))
+    before = {k: st.session_state.get(k) for k in ("exec", "audit", "_schema_version")}
+    st.session_state["exec"] = exec_state
+    st.session_state["audit"] = audit_state
+    st.session_state["_schema_version"] = 0  # dzienniki ze starszej wersji dociągnie migracja
+    migrate_to_new_schema()
+    db = _exec_db()
+    if db is not None:
+        try:
+            _replace_db(db)
+        except Exception:
+            for k, v in before.items():
+                st.session_state[k] = v
+            raise
+    return manifest
+
+
+def _replace_db(db: ExecDB) -> None:
+    """Cała sesja (dni z wartościami + dzienniki zmian) jako nowa zawartość bazy."""
+    months, audit = [], []
+    for y, store in sorted(st.session_state["exec"].items()):
+        for m in range(1, 13):
+            vals = store.values[store.month_slice(m)]
+            keep = ~np.isnan(vals).all(axis=1)
+            if keep.any():
+                months.append((int(y), m, np.nonzero(keep)[0] + 1, vals[keep]))
+    for y, logs in sorted(st.session_state["audit"].items()):
+        for m, log in sorted(logs.items()):
+            audit.append((int(y), int(m), log.to_frame()))
+    db.replace_all(months, audit)
 
 
 def split_editable(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -280,90 +443,183 @@ def split_editable(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     mask = df["data"] <= today
     return df.loc[mask].reset_index(drop=True), df.loc[~mask].reset_index(drop=True)
 
+
+def month_missing(year: int, month: int, cols: List[str]) -> np.ndarray:
+    """
+    Maska braków (puste lub 0) miesiąca: dni × `cols` z indeksu magazynu – bez parsowania ramek.
+    Wiersze w kolejności dni, jak w get_month_df / split_editable.
+    """
+    _ensure_state()
+    return _year_store(year).missing_mask(month, cols)
+
+
+def year_completeness(year: int, cols: List[str]) -> pd.DataFrame:
+    """
+    Kompletność roku do mapy cieplnej: miesiące (wiersze 1..12) × dni (kolumny 1..31),
+    wartość = udział uzupełnionych komórek `cols` (0..1); dni przyszłe i nieistniejące → NaN.
+    """
+    _ensure_state()
+    store = _year_store(year)
+    ratio = store.fill_ratio(cols).copy()
+    ratio[store.dates > pd.Timestamp(date.today())] = np.nan
+    grid = np.full((12, 31), np.nan)
+    grid[store.dates.month - 1, store.dates.day - 1] = ratio
+    return pd.DataFrame(grid, index=range(1, 13), columns=range(1, 32))
+
+# ── Generacje (klucze cache): numery rosną tylko przy zapisie, unikalne w całym procesie
+
+def year_generation(year: int) -> int:
+    """Generacja danych roku – zmienia się przy zapisie dowolnego miesiąca."""
+    _ensure_state()
+    return _year_store(year).generation
+
+
+def month_generation(year: int, month: int) -> int:
+    """Generacja miesiąca: wartości + dziennik zmian (jeśli już otwarty)."""
+    _ensure_state()
+    log = st.session_state["audit"].get(year, {}).get(month)
+    audit_gen = log.generation if isinstance(log, AuditLog) else 0
+    return max(int(_year_store(year).month_gen[month - 1]), audit_gen)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
-# 3) KPI – wyłącznie na nowych nazwach
+# 2) KPI – wyłącznie na nowych nazwach
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _num(s: pd.Series) -> pd.Series:
-    return pd.to_numeric(s, errors="coerce").fillna(0.0)
+def kpi_rooms_month(df: pd.DataFrame) -> Dict[str, float]:
+    """KPI Pokoje dla dowolnej ramki miesiąca (stare lub nowe nazwy – pozycje z REGISTRY)."""
+    return rooms_kpi(REGISTRY.kpi_totals(REGISTRY.frame_sums(df)))
 
 
-def kpi_rooms_month(df: pd.DataFrame) -> Dict[str, float]:
-    df = apply_new_schema(df)
-    available = float((_num(df.get("pokoje_dostepne_qty", 0)) - _num(df.get("pokoje_oos_qty", 0))).sum())
-    sold = float((_num(df.get("pokoje_sprzedane_bez_qty", 0)) + _num(df.get("pokoje_sprzedane_ze_qty", 0))).sum())
-    revenue = float(_num(df.get("pokoje_przychod_netto_pln", 0)).sum())
+def kpi_fnb_month(df: pd.DataFrame) -> Dict[str, float]:
+    """KPI F&B (fnb_* + wynajem sal) dla dowolnej ramki miesiąca."""
+    return fnb_kpi(REGISTRY.kpi_totals(REGISTRY.frame_sums(df)))
 
-    frekw = (sold / available) if available > 0 else 0.0
-    revpor = (revenue / sold) if sold > 0 else 0.0
 
-    # koszty Pokoje = suma wszystkich kolumn z prefiksem koszt_r_
-    koszt_cols = [c for c in df.columns if c.startswith("koszt_r_")]
-    koszty = float(_num(df[koszt_cols].stack()).sum()) if koszt_cols else 0.0
+# ── Cache agregatów (sumy per miesiąc w YearStore, YTD z sum prefiksowych)
 
-    return {
-        "zdolnosc": available,
-        "sprzedane": sold,
-        "frekwencja": frekw,
-        "revpor": revpor,
-        "k_wydzialowe": koszty,
-        "wynik": revenue - koszty,
-    }
+def _idx(cols: List[str]) -> np.ndarray:
+    return REGISTRY.idx(cols)
 
 
-def kpi_fnb_month(df: pd.DataFrame) -> Dict[str, float]:
-    df = apply_new_schema(df)
-    # sprzedaż F&B – wszystkie fnb_* + sprzedaz_wynajem_sali_pln
-    fnb_cols = [c for c in df.columns if c.startswith("fnb_")] + ["sprzedaz_wynajem_sali_pln"]
-    fnb_cols = [c for c in fnb_cols if c in df.columns]
-    sprzedaz = float(_num(df[fnb_cols].stack()).sum()) if fnb_cols else 0.0
+def _aggregates(sums: np.ndarray) -> Dict[str, float]:
+    return REGISTRY.kpi_totals(sums)
 
-    koszt_cols = [c for c in df.columns if c.startswith("koszt_g_")]
-    koszty = float(_num(df[koszt_cols].stack()).sum()) if koszt_cols else 0.0
 
-    return {"sprzedaz_fnb": sprzedaz, "g_k_razem": koszty, "g_wynik": sprzedaz - koszty}
+def _store_for(exec_state: Dict, year: int) -> YearStore:
+    """Magazyn roku z sesji albo – dla przekazanego słownika {miesiac: DataFrame} – tymczasowy."""
+    if not exec_state:
+        _ensure_state()
+        return _year_store(year)
+    store = exec_state.get(year)
+    if isinstance(store, YearStore):
+        return store
+    tmp = _new_year_store(year)
+    for m, df in (store or {}).items():
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            tmp.write_month(int(m), apply_new_schema(df))
+    return tmp
 
 
-def kpi_rooms_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
-    _ensure_state()
-    data = st.session_state["exec"] if not exec_state else exec_state
+def month_aggregates(year: int, month: int) -> Dict[str, float]:
+    """Sumy miesiąca z cache: dostepne, oos, sprzedane, przychod_pokoje, koszt_r, koszt_g, fnb."""
+    return _aggregates(_store_for({}, year).month_sum(month))
 
-    avail = sold = revenue = koszty = 0.0
-    for m in range(1, month + 1):
-        df = apply_new_schema(data.get(year, {}).get(m, pd.DataFrame()))
-        if df.empty:
-            continue
-        avail += float((_num(df.get("pokoje_dostepne_qty", 0)) - _num(df.get("pokoje_oos_qty", 0))).sum())
-        sold += float((_num(df.get("pokoje_sprzedane_bez_qty", 0)) + _num(df.get("pokoje_sprzedane_ze_qty", 0))).sum())
-        revenue += float(_num(df.get("pokoje_przychod_netto_pln", 0)).sum())
-        koszt_cols = [c for c in df.columns if c.startswith("koszt_r_")]
-        koszty += float(_num(df[koszt_cols].stack()).sum()) if koszt_cols else 0.0
-
-    return {
-        "zdolnosc": avail,
-        "sprzedane": sold,
-        "frekwencja": (sold / avail) if avail > 0 else 0.0,
-        "revpor": (revenue / sold) if sold > 0 else 0.0,
-        "k_wydzialowe": koszty,
-        "wynik": revenue - koszty,
-    }
 
+def month_aggregates_with_edits(year: int, month: int, edits: Mapping) -> Dict[str, float]:
+    """Agregaty miesiąca z niezapisanymi edycjami: zapisane sumy + różnice edytowanych komórek."""
+    store = _store_for({}, year)
+    store.ensure_loaded(month)  # stare wartości edytowanych komórek – nie NaN z niewczytanego miesiąca
+    sl = store.month_slice(month)
+    rows, cols, vals = _edit_cells(store, month, edits)
+    ok = (rows >= 0) & (rows < sl.stop - sl.start)
+    old = store.values[sl.start + rows[ok], cols[ok]]
+    sums = store.month_sum(month).copy()
+    sums += np.bincount(cols[ok], weights=np.nan_to_num(vals[ok]) - np.nan_to_num(old), minlength=len(sums))
+    return _aggregates(sums)
 
-def kpi_fnb_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
+
+def year_month_sums(year: int, cols: List[str]) -> np.ndarray:
+    """Sumy `cols` per miesiąc roku (12 × len(cols)) z cache agregatów magazynu."""
+    return _store_for({}, year).month_sums()[:, _idx(cols)]
+
+
+def year_column_max(year: int, col: str) -> float:
+    """Największa dzienna wartość kolumny w roku (0, gdy brak danych)."""
+    store = _store_for({}, year)
+    for m in range(1, 13):
+        store.ensure_loaded(m)
+    v = store.values[:, store.col_index[col]]
+    return float(np.nanmax(v)) if not np.isnan(v).all() else 0.0
+
+
+# serie trendu dziennego: etykieta → grupy KPI_SUMS
+DAILY_SERIES: Dict[str, Tuple[str, ...]] = {
+    "Przychód pokoje": ("przychod_pokoje",),
+    "Sprzedaż F&B": ("fnb",),
+    "Koszty wydziałowe": ("koszt_r", "koszt_g"),
+}
+
+
+def exec_years() -> List[int]:
+    """Lata z danymi wykonania: otwarte w sesji oraz zapisane w bazie aktywnego hotelu."""
     _ensure_state()
-    data = st.session_state["exec"] if not exec_state else exec_state
+    db = _exec_db()
+    return sorted({int(y) for y in st.session_state["exec"]} | set(db.years() if db is not None else []))
 
-    sprzedaz = koszty = 0.0
-    for m in range(1, month + 1):
-        df = apply_new_schema(data.get(year, {}).get(m, pd.DataFrame()))
-        if df.empty:
-            continue
-        fnb_cols = [c for c in df.columns if c.startswith("fnb_")] + ["sprzedaz_wynajem_sali_pln"]
-        fnb_cols = [c for c in fnb_cols if c in df.columns]
-        if fnb_cols:
-            sprzedaz += float(_num(df[fnb_cols].stack()).sum())
-        koszt_cols = [c for c in df.columns if c.startswith("koszt_g_")]
-        if koszt_cols:
-            koszty += float(_num(df[koszt_cols].stack()).sum())
-
-    return {"sprzedaz_fnb": sprzedaz, "g_k_razem": koszty, "g_wynik": sprzedaz - koszty}
+
+def daily_kpi_series(years: List[int]) -> pd.DataFrame:
+    """
+    Dzienne sumy grup DAILY_SERIES dla `years` na jednej osi dat (trend wieloletni).
+    Dni przyszłe i dni bez żadnej wartości w tych grupach są pomijane.
+    """
+    _ensure_state()
+    today = pd.Timestamp(date.today())
+    frames = []
+    for y in years:
+        store = _year_store(y)
+        for m in range(1, 13):
+            store.ensure_loaded(m)
+        out: Dict[str, object] = {"data": store.dates}
+        filled = np.zeros(len(store.dates), dtype=bool)
+        for label, groups in DAILY_SERIES.items():
+            block = store.values[:, np.concatenate([REGISTRY.kpi_idx[g] for g in groups])]
+            filled |= ~np.isnan(block).all(axis=1)
+            out[label] = np.nansum(block, axis=1)
+        frames.append(pd.DataFrame(out).loc[filled & (store.dates <= today)])
+    if not frames:
+        return pd.DataFrame(columns=["data", *DAILY_SERIES])
+    return pd.concat(frames, ignore_index=True)
+
+
+def ytd_aggregates(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
+    """Jak month_aggregates, ale narastająco od stycznia (O(1) z sum prefiksowych)."""
+    return _aggregates(_store_for(exec_state, year).ytd_sums(month))
+
+
+def kpi_rooms_month_cached(year: int, month: int) -> Dict[str, float]:
+    """KPI Pokoje dla zapisanego miesiąca – z cache agregatów."""
+    return rooms_kpi(month_aggregates(year, month))
+
+
+def kpi_fnb_month_cached(year: int, month: int) -> Dict[str, float]:
+    """KPI F&B dla zapisanego miesiąca – z cache agregatów."""
+    return fnb_kpi(month_aggregates(year, month))
+
+
+def kpi_rooms_month_edits(year: int, month: int, edits: Mapping) -> Dict[str, float]:
+    """KPI Pokoje z niezapisanymi edycjami (przyrostowo, bez scalania ramek)."""
+    return rooms_kpi(month_aggregates_with_edits(year, month, edits))
+
+
+def kpi_fnb_month_edits(year: int, month: int, edits: Mapping) -> Dict[str, float]:
+    """KPI F&B z niezapisanymi edycjami (przyrostowo, bez scalania ramek)."""
+    return fnb_kpi(month_aggregates_with_edits(year, month, edits))
+
+
+def kpi_rooms_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
+    return rooms_kpi(ytd_aggregates(exec_state, year, month))
+
+
+def kpi_fnb_ytd(exec_state: Dict, year: int, month: int) -> Dict[str, float]:
+    return fnb_kpi(ytd_aggregates(exec_state, year, month))
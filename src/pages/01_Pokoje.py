@@ -1,16 +1,18 @@
 # src/pages/01_Pokoje.py
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from core.memo import fingerprint, memoize
+
 # ──────────────────────────────────────────────────────────────────────────────
-# Próba importu get_month_df; jeśli brak – zwróć pusty DataFrame (fallback)
+# Próba importu agregatów magazynu; jeśli brak – liczymy z dziennika w sesji (fallback)
 # ──────────────────────────────────────────────────────────────────────────────
 try:
-    from core.state_local import get_month_df  # noqa: F401
+    from core.state_local import year_column_max, year_generation, year_month_sums
 except Exception:
-    def get_month_df(year: int, month: int) -> pd.DataFrame:  # type: ignore
-        return pd.DataFrame()
+    year_month_sums = year_column_max = year_generation = None  # type: ignore
 
 MONTHS = ["sty","lut","mar","kwi","maj","cze","lip","sie","wrz","paź","lis","gru"]
 
@@ -46,6 +48,7 @@ ROWS = [
     "Prowizje OTA&GDS",
 
     "— WYNIK DEPARTAMENTU —",
+    "WYNIK DEPARTAMENTU",
     "koszt na sprzedany pokój",
 ]
 
@@ -60,6 +63,36 @@ COL = {
     "sales_sm": "Sprzedaż pokoi S&M (netto)",        # opcjonalnie
 }
 
+# Wiersze kosztów departamentu ← kolumny koszt_r_* magazynu (nowy schemat)
+COST_ROWS = {
+    "Wynagrodzenie brutto i umowy zlecenia": "koszt_r_osobowe_wynagrodzenia_pln",
+    "ZUS": "koszt_r_osobowe_zus_pln",
+    "PFRON": "koszt_r_osobowe_pfron_pln",
+    "Wyżywienie": "koszt_r_osobowe_wyzywienie_pln",
+    "Odzież służbowa i bhp": "koszt_r_osobowe_odziez_bhp_pln",
+    "Usługi medyczne": "koszt_r_osobowe_medyczne_pln",
+    "Inne": "koszt_r_osobowe_inne_pln",
+    "Materiały eksploatacyjne, Artykuły spożywcze": "koszt_r_materialy_eksplo_spozywcze_pln",
+    "Kosmetyki dla gości (płyn, mydło), Środki czystości 1,5": "koszt_r_materialy_kosmetyki_czystosc_pln",
+    "Inne materiały, w tym karty meldunkowe, galanteria papiernicza, art. biurowe": "koszt_r_materialy_inne_biurowe_pln",
+    "Usługi sprzątania": "koszt_r_uslugi_sprzatanie_pln",
+    "Usługi prania (z wyłączeniem odzieży służbowej)": "koszt_r_uslugi_pranie_zew_pln",
+    "Usługi prania odzieży służbowej": "koszt_r_uslugi_pranie_odziezy_pln",
+    "Wynajem sprzętu (kopiarka , maty, maszyna do butów )": "koszt_r_uslugi_wynajem_sprzetu_pln",
+    "Inne usługi (szkolenie BHP)": "koszt_r_uslugi_inne_pln",
+    "Prowizje OTA&GDS": "koszt_r_prowizje_ota_gds_pln",
+}
+
+# Kolumny magazynu potrzebne do macierzy (kolejność = kolumny wyniku year_month_sums)
+STORE_COLS = [
+    "pokoje_dostepne_qty", "pokoje_oos_qty",
+    "pokoje_sprzedane_bez_qty", "pokoje_sprzedane_ze_qty",
+    "pokoje_przychod_netto_pln",
+] + list(COST_ROWS.values())
+
+PCT_ROWS = {"frekwencja"}
+COUNT_ROWS = {"liczba pokoi", "zdolność eksploatacyjna", "sprzedane pokojonoce"}
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
@@ -88,109 +121,103 @@ def _detect_date_col(df: pd.DataFrame) -> str | None:
             pass
     return best
 
-def _month_from_exec(year: int, month: int) -> pd.DataFrame:
-    """Fallback: weź dziennik 'Operacje' z session_state i wyfiltruj YYYY-MM."""
-    exec_df = st.session_state.get("exec")
-    if not isinstance(exec_df, pd.DataFrame) or exec_df.empty:
-        return pd.DataFrame()
+def _year_from_exec(exec_df: pd.DataFrame, year: int) -> tuple[pd.DataFrame, pd.Series]:
+    """Fallback: wiersze roku z dziennika 'Operacje' (DataFrame w sesji) + miesiąc każdego wiersza."""
     dcol = _detect_date_col(exec_df)
     if not dcol:
-        return pd.DataFrame()
-    df = exec_df.copy()
-    df[dcol] = pd.to_datetime(df[dcol], errors="coerce")
-    return df[(df[dcol].dt.year == year) & (df[dcol].dt.month == month)]
+        return pd.DataFrame(), pd.Series(dtype="int64")
+    d = pd.to_datetime(exec_df[dcol], errors="coerce")
+    sel = (d.dt.year == year).to_numpy()
+    return exec_df.loc[sel], d[sel].dt.month
 
 # ──────────────────────────────────────────────────────────────────────────────
-# KPI jednego miesiąca (zgodnie z „Podsumowania KPI”)
+# Sumy miesięcy (12 × kolumny) – magazyn roku albo jedno grupowanie dziennika
 # ──────────────────────────────────────────────────────────────────────────────
-def _kpi_month(df: pd.DataFrame) -> dict[str, float]:
-    if df is None or df.empty:
-        return dict(available=0.0, sold=0.0, occ=0.0, revpor=0.0, sm=0.0)
-    av  = _n(df.get(COL["available"])).sum()
-    oos = _n(df.get(COL["oos"])).sum()
-    capacity = max(float(av - oos), 0.0)
-    sold = (_n(df.get(COL["sold_bez"])) + _n(df.get(COL["sold_ze"]))).sum()
-    revenue_rooms = _n(df.get(COL["revenue_rooms"])).sum()
-    revpor = float(revenue_rooms / sold) if sold > 0 else 0.0
-    occ = float(sold / capacity) if capacity > 0 else 0.0
-    sm = _n(df.get(COL["sales_sm"])).sum() if COL.get("sales_sm") in df.columns else 0.0
-    return dict(available=capacity, sold=float(sold), occ=occ, revpor=revpor, sm=float(sm))
+def _sums_from_exec(exec_df: pd.DataFrame, year: int) -> dict[str, np.ndarray]:
+    df, month = _year_from_exec(exec_df, year)
+    def col(name: str | None) -> np.ndarray:
+        if df.empty or name not in df.columns:
+            return np.zeros(12)
+        return _n(df[name]).groupby(month.to_numpy()).sum().reindex(range(1, 13), fill_value=0.0).to_numpy()
+    return dict(
+        available=col(COL["available"]), oos=col(COL["oos"]),
+        sold=col(COL["sold_bez"]) + col(COL["sold_ze"]),
+        revenue=col(COL["revenue_rooms"]), sm=col(COL.get("sales_sm")),
+        costs=np.zeros((12, len(COST_ROWS))),
+    )
+
+def _sums_from_store(year: int) -> dict[str, np.ndarray]:
+    s = year_month_sums(year, STORE_COLS)
+    return dict(
+        available=s[:, 0], oos=s[:, 1], sold=s[:, 2] + s[:, 3], revenue=s[:, 4],
+        sm=np.zeros(12), costs=s[:, 5:],
+    )
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Budowa macierzy 12×N (get_month_df → fallback na dziennik z Operacji)
+# Budowa macierzy wiersze × 12 (wektorowo, wszystkie miesiące naraz)
 # ──────────────────────────────────────────────────────────────────────────────
-def _build_rooms_matrix(year: int, rooms_static: float) -> pd.DataFrame:
-    months: dict[int, dict[str, float]] = {}
-    for m in range(1, 13):
-        df_m = get_month_df(year, m)
-        if df_m is None or getattr(df_m, "empty", True):
-            df_m = _month_from_exec(year, m)
-        months[m] = _kpi_month(df_m)
-
-    mat = pd.DataFrame(0.0, index=ROWS, columns=MONTHS, dtype=float)
-    for m in range(1, 13):
-        col = MONTHS[m-1]
-        k = months[m]
-        capacity = k["available"]
-        sold     = k["sold"]
-        occ      = k["occ"]
-        revpor   = k["revpor"]
-        sm       = k["sm"]
-        sales_rooms = sold * revpor  # Twoja reguła
-
-        mat.at["liczba pokoi", col]                 = rooms_static
-        mat.at["zdolność eksploatacyjna", col]      = capacity
-        mat.at["sprzedane pokojonoce", col]         = sold
-        mat.at["frekwencja", col]                   = occ
-        mat.at["średnia cena (RevPOR)", col]        = revpor
-
-        mat.at["Sprzedaż pokoi", col]               = sales_rooms
-        mat.at["Sprzedaż pokoi S&M", col]           = sm
-        mat.at["Koszty wydziałowe", col]            = 0.0  # placeholders do podpięcia
-
-        for r in [
-            "Wynagrodzenie brutto i umowy zlecenia","ZUS","PFRON","Wyżywienie",
-            "Odzież służbowa i bhp","Usługi medyczne","Inne",
-            "Materiały eksploatacyjne, Artykuły spożywcze",
-            "Kosmetyki dla gości (płyn, mydło), Środki czystości 1,5",
-            "Inne materiały, w tym karty meldunkowe, galanteria papiernicza, art. biurowe",
-            "Usługi sprzątania","Usługi prania (z wyłączeniem odzieży służbowej)",
-            "Usługi prania odzieży służbowej","Wynajem sprzętu (kopiarka , maty, maszyna do butów )",
-            "Inne usługi (szkolenie BHP)","Prowizje OTA&GDS",
-        ]:
-            mat.at[r, col] = 0.0
-
-        mat.at["WYNIK DEPARTAMENTU", col]           = sales_rooms  # do czasu kosztów
-        mat.at["koszt na sprzedany pokój", col]     = 0.0
-
-    for r in ROWS:
-        if r.startswith("—"):
-            mat.loc[r, :] = None
-    return mat
+def _build_rooms_matrix(sums: dict[str, np.ndarray], rooms_static: float) -> pd.DataFrame:
+    capacity = np.maximum(sums["available"] - sums["oos"], 0.0)
+    sold = sums["sold"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        revpor = np.where(sold > 0, sums["revenue"] / sold, 0.0)
+        occ = np.where(capacity > 0, sold / capacity, 0.0)
+    sales_rooms = sold * revpor  # Twoja reguła
+    costs = sums["costs"]
+    dept_costs = costs.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost_per_room = np.where(sold > 0, dept_costs / sold, 0.0)
+
+    ri = {r: i for i, r in enumerate(ROWS)}
+    mat = np.zeros((len(ROWS), 12))
+    mat[ri["liczba pokoi"]] = rooms_static
+    mat[ri["zdolność eksploatacyjna"]] = capacity
+    mat[ri["sprzedane pokojonoce"]] = sold
+    mat[ri["frekwencja"]] = occ
+    mat[ri["średnia cena (RevPOR)"]] = revpor
+    mat[ri["Sprzedaż pokoi"]] = sales_rooms
+    mat[ri["Sprzedaż pokoi S&M"]] = sums["sm"]
+    mat[ri["Koszty wydziałowe"]] = dept_costs
+    mat[[ri[r] for r in COST_ROWS]] = costs.T
+    mat[ri["WYNIK DEPARTAMENTU"]] = sales_rooms - dept_costs
+    mat[ri["koszt na sprzedany pokój"]] = cost_per_room
+    mat[[i for r, i in ri.items() if r.startswith("—")]] = np.nan
+    return pd.DataFrame(mat, index=ROWS, columns=MONTHS)
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Formatowanie do prezentacji
+# Formatowanie do prezentacji (blokami wierszy tego samego rodzaju)
 # ──────────────────────────────────────────────────────────────────────────────
-def _fmt(row: str, v):
-    if pd.isna(v) or row.startswith("—"):
-        return ""
-    if row == "frekwencja":
-        return f"{float(v)*100:,.1f}%".replace(",", " ")
-    money_rows = {
-        "średnia cena (RevPOR)", "Sprzedaż pokoi", "Sprzedaż pokoi S&M",
-        "Koszty wydziałowe", "Wynagrodzenie brutto i umowy zlecenia", "ZUS", "PFRON",
-        "Wyżywienie", "Odzież służbowa i bhp", "Usługi medyczne", "Inne",
-        "Materiały eksploatacyjne, Artykuły spożywcze",
-        "Kosmetyki dla gości (płyn, mydło), Środki czystości 1,5",
-        "Inne materiały, w tym karty meldunkowe, galanteria papiernicza, art. biurowe",
-        "Usługi sprzątania", "Usługi prania (z wyłączeniem odzieży służbowej)",
-        "Usługi prania odzieży służbowej", "Wynajem sprzętu (kopiarka , maty, maszyna do butów )",
-        "Inne usługi (szkolenie BHP)", "Prowizje OTA&GDS", "WYNIK DEPARTAMENTU",
-        "koszt na sprzedany pokój",
-    }
-    if row in money_rows:
-        return f"{float(v):,.2f}".replace(",", " ").replace(".", ",")
-    return f"{float(v):,.0f}".replace(",", " ")
+def _fmt_block(v: np.ndarray, kind: str) -> np.ndarray:
+    s = pd.Series(v.ravel())
+    if kind == "pct":
+        out = (s * 100).map("{:,.1f}%".format).str.replace(",", " ", regex=False)
+    elif kind == "count":
+        out = s.map("{:,.0f}".format).str.replace(",", " ", regex=False)
+    else:  # kwoty: spacja tysięcy, przecinek dziesiętny
+        out = (s.map("{:,.2f}".format).str.replace(",", " ", regex=False)
+                .str.replace(".", ",", regex=False))
+    return out.where(s.notna(), "").to_numpy(dtype=object).reshape(v.shape)
+
+def _format_matrix(mat: pd.DataFrame) -> pd.DataFrame:
+    kinds = np.array(["pct" if r in PCT_ROWS else "count" if r in COUNT_ROWS else "money" for r in mat.index])
+    vals = mat.to_numpy()
+    out = np.full(vals.shape, "", dtype=object)
+    for kind in ("pct", "count", "money"):
+        sel = kinds == kind
+        if sel.any():
+            out[sel] = _fmt_block(vals[sel], kind)
+    return pd.DataFrame(out, index=mat.index, columns=mat.columns)
+
+def _rooms_view(year: int, rooms_static: float, exec_df) -> pd.DataFrame:
+    """Sformatowana macierz z cache sesji – przeliczana tylko po zmianie danych roku lub liczby pokoi."""
+    if year_month_sums is not None and isinstance(exec_df, dict):
+        key = (year_generation(year), rooms_static)
+        build = lambda: _sums_from_store(year)  # noqa: E731
+    else:
+        # dziennik (DataFrame) może być zmieniony w miejscu – klucz z treści, nie z id() obiektu
+        key = (fingerprint(exec_df), rooms_static)
+        build = lambda: _sums_from_exec(exec_df, year)  # noqa: E731
+    return memoize(f"rooms_matrix_{year}", key, lambda: _format_matrix(_build_rooms_matrix(build(), rooms_static)))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # UI
@@ -198,7 +225,8 @@ def _fmt(row: str, v):
 def render() -> None:
     # Czekaj na dziennik z Operacji; bez tego nie liczymy KPI
     exec_df = st.session_state.get("exec")
-    if not isinstance(exec_df, pd.DataFrame) or exec_df.empty:
+    has_store = isinstance(exec_df, dict) and bool(exec_df)  # {rok: YearStore} z core.state_local
+    if not has_store and (not isinstance(exec_df, pd.DataFrame) or exec_df.empty):
         st.info("Brak danych w sesji. Wejdź najpierw do zakładki Operacje i zapisz miesiąc.")
         return
 
@@ -218,10 +246,11 @@ def render() -> None:
     rooms_store = st.session_state.setdefault("rooms_static_by_year", {})
     # podpowiedź: max 'Pokoje do sprzedaży' w danym roku
     try:
-        dcol = _detect_date_col(exec_df)
-        df_tmp = exec_df.copy()
-        df_tmp[dcol] = pd.to_datetime(df_tmp[dcol], errors="coerce")
-        default_guess = int(_n(df_tmp.loc[df_tmp[dcol].dt.year == year, COL["available"]]).max())
+        if has_store and year_column_max is not None:
+            default_guess = int(year_column_max(year, "pokoje_dostepne_qty"))
+        else:
+            df_year, _ = _year_from_exec(exec_df, year)
+            default_guess = int(_n(df_year[COL["available"]]).max())
     except Exception:
         default_guess = 0
     current_value = int(rooms_store.get(year, default_guess))
@@ -230,13 +259,8 @@ def render() -> None:
         rooms_store[year] = int(new_value)
         st.session_state["rooms_static_by_year"] = rooms_store
 
-    matrix = _build_rooms_matrix(year, rooms_static=float(rooms_store.get(year, new_value)))
-
-    display = matrix.copy().astype(object)
-    for r in display.index:
-        for c in display.columns:
-            display.at[r, c] = _fmt(r, display.at[r, c])
-    st.dataframe(display, use_container_width=True)
+    display = _rooms_view(year, float(rooms_store.get(year, new_value)), exec_df)
+    st.dataframe(display, width="stretch")
 
 # W multipage Streamlit plik strony jest wykonywany po wejściu w zakładkę,
 # nie wywołujemy render() na siłę, aby nie kolidować z „Operacjami”.
@@ -1,16 +1,29 @@
 # file: dashboard_gm.py
 import streamlit as st
 from components.kpi import kpi_tile
-from components.charts import line
+from components.charts import cached_figure, line
+from core.memo import fingerprint, memoize
 from typing import Any
 
+_COLS = ["ADR", "RevPAR", "BE_rooms"]
+
+
+def _stats(insights):
+    num = insights[_COLS].astype(float)
+    return {"adr": float(num["ADR"].mean()), "revpar": float(num["RevPAR"].mean()),
+            "be": float(num["BE_rooms"].median())}
+
+
 def render(project_cfg: Any = None, readonly: bool = False, **_):
     st.title("DASHBOARD — GM")
     insights = st.session_state["insights"]
+    # statystyki i figura przeliczane tylko po zmianie danych (odcisk treści kolumn)
+    stats = memoize("dash_gm_stats", fingerprint(insights, _COLS), lambda: _stats(insights))
     c1, c2, c3, c4 = st.columns(4)
-    kpi_tile(c1, "ADR (avg)", float(insights["ADR"].astype(float).mean()))
-    kpi_tile(c2, "RevPAR (avg)", float(insights["RevPAR"].astype(float).mean()))
-    kpi_tile(c3, "BE rooms (median)", float(insights["BE_rooms"].astype(float).median()))
+    kpi_tile(c1, "ADR (avg)", stats["adr"])
+    kpi_tile(c2, "RevPAR (avg)", stats["revpar"])
+    kpi_tile(c3, "BE rooms (median)", stats["be"])
     kpi_tile(c4, "Plan rows", len(st.session_state["plan"]))
-    fig = line(insights.reset_index(), x="month", ys=["ADR", "RevPAR"], title="ADR & RevPAR (plan baseline)")
+    fig = cached_figure(line, insights.reset_index(), x="month", ys=["ADR", "RevPAR"],
+                        title="ADR & RevPAR (plan baseline)")
     st.plotly_chart(fig, width="stretch")  # nowy parametr width
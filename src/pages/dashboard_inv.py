@@ -1,20 +1,29 @@
 # file: dashboard_inv.py
 import streamlit as st
 from components.kpi import kpi_tile
-from components.charts import bar
+from components.charts import bar, cached_figure
+from core.memo import fingerprint, memoize
+
+_COLS = ["ADR", "RevPAR", "var_cost_per_occ_room", "BE_rooms"]
+
+
+def _stats(insights):
+    num = insights[_COLS].astype(float)
+    adr, revpar = float(num["ADR"].mean()), float(num["RevPAR"].mean())
+    proxy = (revpar - float(num["var_cost_per_occ_room"].mean())) / max(adr, 1) * 100
+    return {"adr": adr, "revpar": revpar, "proxy": proxy, "be": float(num["BE_rooms"].median())}
+
 
 def render():
     st.title("DASHBOARD — Inwestor")
     insights = st.session_state["insights"]
+    # statystyki i figura przeliczane tylko po zmianie danych (odcisk treści kolumn)
+    stats = memoize("dash_inv_stats", fingerprint(insights, _COLS), lambda: _stats(insights))
     c1, c2, c3, c4 = st.columns(4)
-    kpi_tile(c1, "ADR (avg)", float(insights["ADR"].astype(float).mean()))
-    kpi_tile(c2, "RevPAR (avg)", float(insights["RevPAR"].astype(float).mean()))
-    proxy = (
-        (insights["RevPAR"].astype(float).mean() - insights["var_cost_per_occ_room"].astype(float).mean())
-        / max(insights["ADR"].astype(float).mean(), 1) * 100
-    )
-    kpi_tile(c3, "EBITDA% (proxy)", float(proxy))
-    kpi_tile(c4, "BE rooms (median)", float(insights["BE_rooms"].astype(float).median()))
-    fig = bar(insights.reset_index(), x="month", y="RevPAR", title="RevPAR (mies.)")
+    kpi_tile(c1, "ADR (avg)", stats["adr"])
+    kpi_tile(c2, "RevPAR (avg)", stats["revpar"])
+    kpi_tile(c3, "EBITDA% (proxy)", stats["proxy"])
+    kpi_tile(c4, "BE rooms (median)", stats["be"])
+    fig = cached_figure(bar, insights.reset_index(), x="month", y="RevPAR", title="RevPAR (mies.)")
     st.plotly_chart(fig, width="stretch")
     st.info("Dostęp tylko do odczytu. Raporty w zakładce RAPORTY.")
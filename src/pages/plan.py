@@ -1,5 +1,73 @@
 # file: plan.py
-import streamlit as st, pandas as pd
+import numpy as np, streamlit as st, pandas as pd
+from core.plan_scenarios import BASE, PlanScenarios
+
+
+def _label_col(df: pd.DataFrame) -> str | None:
+    return next((c for c in ("month", "miesiac", "Miesiąc") if c in df.columns), None)
+
+
+def _publish(ps: PlanScenarios, name: str) -> pd.DataFrame:
+    """Aktywny scenariusz jako st.session_state["plan"]; zapamiętana ramka odróżnia plan podmieniony z zewnątrz."""
+    df = st.session_state["plan"] = st.session_state["_plan_shown"] = ps.materialize(name)
+    return df
+
+
+def _warn_dropped(n: int) -> None:
+    if n:
+        st.warning(f"Odrzucono {n} nadpisań scenariuszy – ich wiersze lub kolumny zniknęły z planu bazowego.")
+
+
+def _scenarios(df: pd.DataFrame) -> PlanScenarios:
+    """Magazyn scenariuszy w sesji; plan podmieniony z zewnątrz (np. import) staje się nową bazą."""
+    ps = st.session_state.get("plan_scenarios")
+    if not isinstance(ps, PlanScenarios):
+        ps = st.session_state["plan_scenarios"] = PlanScenarios(df)
+    elif df is not st.session_state.get("_plan_shown"):
+        # wiersze nowej bazy łączone ze starymi po kolumnie miesiąca (albo pozycji)
+        _warn_dropped(ps.set_base(df, label=_label_col(df)))
+    return ps
+
+
+def _scenario_admin(ps: PlanScenarios, active: str) -> None:
+    with st.expander("Scenariusze"):
+        c1, c2, c3 = st.columns([3, 2, 1])
+        name = c1.text_input("Nazwa nowego scenariusza", key="plan_new_name", placeholder="np. reforecast Q2")
+        source = c2.selectbox("Na bazie", ps.names(), index=ps.names().index(active), key="plan_new_source")
+        if c3.button("Utwórz", key="plan_new_btn") and name.strip():
+            try:
+                ps.create(name.strip(), source)
+                st.session_state["plan_scenario"] = name.strip()
+                st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+        if active != BASE and st.button(f"Usuń scenariusz „{active}”", key="plan_drop_btn"):
+            ps.drop(active)
+            st.session_state["plan_scenario"] = BASE
+            st.rerun()
+
+
+def _comparison(ps: PlanScenarios, df: pd.DataFrame) -> None:
+    names = ps.names()
+    with st.expander("Porównanie scenariuszy"):
+        numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(ps.base[c])]
+        if numeric:
+            c1, c2 = st.columns([3, 2])
+            chosen = c1.multiselect("Scenariusze", names, default=names, key="plan_cmp_names")
+            col = c2.selectbox("Kolumna", numeric, key="plan_cmp_col")
+            label = _label_col(df)
+            if chosen:
+                side = ps.side_by_side(chosen, col, label=label)
+                side.index = side.index.astype(str)  # wiersz „Suma” obok dat/liczb
+                st.dataframe(pd.concat([side, side.sum().to_frame("Suma").T]), width="stretch")
+        d1, d2 = st.columns(2)
+        a = d1.selectbox("Scenariusz A", names, index=0, key="plan_diff_a")
+        b = d2.selectbox("Scenariusz B", names, index=len(names) - 1, key="plan_diff_b")
+        diff = ps.diff(a, b) if a != b else pd.DataFrame()
+        st.caption(f"Różniących się komórek: {len(diff)}")
+        if not diff.empty:
+            st.dataframe(diff, width="stretch", hide_index=True)
+
 
 def render(readonly: bool):
     st.header("Plan")
@@ -16,18 +84,46 @@ def render(readonly: bool):
     if df is None or df.empty:
         st.info("Brak danych planu.")
         return
+
+    # scenariusze: baza + nadpisania komórek; st.session_state["plan"] = aktywny scenariusz
+    ps = _scenarios(df)
+    names = ps.names()
+    current = st.session_state.get("plan_scenario", BASE)
+    active = st.selectbox("Scenariusz", names, index=names.index(current) if current in names else 0)
+    st.session_state["plan_scenario"] = active
+    df = _publish(ps, active)
+    if not readonly:
+        _scenario_admin(ps, active)
+    if active != BASE:
+        st.caption(f"Scenariusz „{active}”: {ps.override_count(active)} nadpisanych komórek względem planu bazowego.")
+
     c1, c2 = st.columns(2)
     if "Occ_plan" in df.columns:
         c1.metric("OCC (plan)", f"{df['Occ_plan'].mean()*100:.1f}%")
     if "ADR_plan" in df.columns:
         c2.metric("ADR (plan)", f"{df['ADR_plan'].mean():.2f}")
+    editor_key = f"plan_editor_{active}"
     edited = st.data_editor(
         df,
         disabled=readonly,
         width="stretch",
-        num_rows="dynamic",
-        key="plan_editor",
+        num_rows="dynamic" if active == BASE else "fixed",  # scenariusz = te same wiersze co baza
+        key=editor_key,
     )
     if not readonly and st.button("Zapisz zmiany (sesja)"):
-        st.session_state["plan"] = edited
+        if active == BASE:
+            # indeks edytora = pozycja wiersza w bazie (dodane wiersze dostają indeksy za końcem)
+            idx = edited.index.to_numpy()
+            st.session_state["plan_dropped"] = ps.set_base(edited, rows=np.where(idx < len(ps.base), idx, -1))
+        else:
+            ps.set_cells(active, (st.session_state.get(editor_key) or {}).get("edited_rows") or {})
+        _publish(ps, active)
+        st.session_state.pop(editor_key, None)  # edycje są już w planie – edytor startuje od nowa
+        st.session_state["plan_saved"] = True
+        st.rerun()
+    if st.session_state.pop("plan_saved", False):
         st.success("Zapisano w sesji.")
+        _warn_dropped(st.session_state.pop("plan_dropped", 0))
+
+    if len(names) > 1:
+        _comparison(ps, df)
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# moduły aplikacji importowane są jak w `streamlit run src/Operacje.py` (core.*, components.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
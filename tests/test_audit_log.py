@@ -0,0 +1,75 @@
+# tests/test_audit_log.py
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.audit_log import AUDIT_COLS, AuditLog
+
+
+def _batch(i: int) -> pd.DataFrame:
+    """Partia zmian nr i: dwa wiersze (dzień i % 3 + 1, kolumny a/b, użytkownik GM albo REV)."""
+    day = pd.Timestamp(2025, 1, i % 3 + 1)
+    return pd.DataFrame({
+        "czas": [pd.Timestamp(2025, 2, 1) + pd.Timedelta(minutes=i)] * 2,
+        "uzytkownik": ["GM" if i % 2 == 0 else "REV"] * 2,
+        "data": [day, day],
+        "kolumna": ["a", "b"],
+        "stara": [float(i), np.nan],
+        "nowa": [float(i + 1), float(i)],
+    }, columns=AUDIT_COLS)
+
+
+@pytest.fixture
+def log():
+    log = AuditLog()
+    for i in range(10):
+        log.append(_batch(i))
+    return log
+
+
+def test_query_pages_from_the_newest_entry(log):
+    page, total = log.query(limit=3)
+    assert total == 20 and page["nowa"].tolist() == [9.0, 10.0, 8.0]
+
+    page, _ = log.query(limit=3, offset=18)
+    assert page["nowa"].tolist() == [0.0, 1.0]
+    assert log.query(limit=3, offset=25)[0].empty
+
+
+def test_filters_intersect_the_indexes(log):
+    page, total = log.query(limit=100, day="2025-01-02", column="a", user="REV")
+    # dzień 2 = partie 1, 4, 7; REV = partie nieparzyste → 1 i 7
+    assert total == 2 and page["stara"].tolist() == [7.0, 1.0]
+    assert log.query(column="nieznana")[1] == 0
+
+
+def test_compaction_keeps_rows_order_and_indexes(log):
+    before = log.to_frame()
+    filtered = log.query(limit=100, user="GM")[0]
+    log.compact()
+
+    assert len(log._chunks) == 1
+    pd.testing.assert_frame_equal(log.to_frame(), before)
+    pd.testing.assert_frame_equal(log.query(limit=100, user="GM")[0], filtered)
+    log.append(_batch(10))  # po scaleniu dopisywanie działa dalej
+    assert log.query(limit=1)[0]["nowa"].tolist() == [10.0]
+
+
+def test_background_compaction_starts_after_compact_at_chunks():
+    log = AuditLog()
+    for i in range(AuditLog.COMPACT_AT):
+        log.append(_batch(i))
+    deadline = time.monotonic() + 5.0
+    while (log._compacting or len(log._chunks) > 1) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(log._chunks) == 1 and len(log) == 2 * AuditLog.COMPACT_AT
+
+
+def test_rename_columns_merges_old_names_into_one(log):
+    gen = log.generation
+    log.rename_columns({"a": "x", "b": "x"})
+    assert log.columns == ["x"] and log.generation > gen
+    assert log.query(limit=100, column="x")[1] == 20
+    assert set(log.to_frame()["kolumna"]) == {"x"}
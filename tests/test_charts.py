@@ -0,0 +1,138 @@
+# tests/test_charts.py
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import charts
+from components.charts import MAX_POINTS, area, downsample_indices, line, lttb_indices, minmax_indices
+
+
+def _daily(years: int = 4) -> pd.DataFrame:
+    dates = pd.date_range("2021-01-01", periods=365 * years, freq="D")
+    return pd.DataFrame({"data": dates, "v": np.sin(np.arange(len(dates)) / 7.0)})
+
+
+def test_full_range_is_downsampled_and_a_narrow_window_keeps_every_day():
+    df = _daily()
+    full = line(df, "data", ["v"])
+    assert len(full.data[0].x) <= MAX_POINTS
+
+    window = (pd.Timestamp("2023-03-01").to_pydatetime(), pd.Timestamp("2023-05-31").to_pydatetime())
+    zoomed = line(df, "data", ["v"], x_range=window)
+    assert len(zoomed.data[0].x) == 92
+    assert list(pd.to_datetime(list(zoomed.layout.xaxis.range))) == [pd.Timestamp(w) for w in window]
+
+
+def _lttb_loop(x, y, n_out):
+    """LTTB pętlą w tym samym wariancie (kotwica = średnia poprzedniego kubełka)."""
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    buckets = [(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+    means = [(x[a:b].mean(), y[a:b].mean()) for a, b in buckets]
+    out = [0]
+    for k, (a, b) in enumerate(buckets):
+        ax, ay = (x[0], y[0]) if k == 0 else means[k - 1]
+        cx, cy = (x[-1], y[-1]) if k == len(buckets) - 1 else means[k + 1]
+        areas = [abs((ax - cx) * (y[j] - ay) - (ax - x[j]) * (cy - ay)) for j in range(a, b)]
+        out.append(a + int(np.argmax(areas)))
+    return np.array(out + [n - 1])
+
+
+@pytest.mark.parametrize("n, n_out", [(5000, 1000), (1001, 1000), (777, 50), (10, 3)])
+def test_vectorized_lttb_matches_the_loop(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype="float64")
+    y = np.cumsum(rng.normal(size=n))
+    got = lttb_indices(x, y, n_out)
+    np.testing.assert_array_equal(got, _lttb_loop(x, y, n_out))
+    assert len(got) == n_out and (np.diff(got) > 0).all()
+
+
+def test_lttb_returns_everything_when_nothing_to_drop():
+    assert lttb_indices(np.arange(10), np.arange(10.0), 10).tolist() == list(range(10))
+    assert lttb_indices(np.arange(10), np.arange(10.0), 2).tolist() == list(range(10))
+
+
+def test_minmax_keeps_the_extremes_of_every_bucket():
+    rng = np.random.default_rng(7)
+    y = rng.normal(size=1003)
+    idx = minmax_indices(y, 100)
+    assert (np.diff(idx) > 0).all() and len(idx) <= 100
+    assert y.argmin() in idx and y.argmax() in idx
+    b = (np.arange(len(y)) * 50) // len(y)
+    for k in range(50):
+        sel = np.flatnonzero(b == k)
+        assert y[sel].min() in y[idx] and y[sel].max() in y[idx]
+
+
+def test_downsampling_skips_gaps_and_keeps_short_series():
+    y = np.arange(3000, dtype="float64")
+    y[::3] = np.nan
+    idx = downsample_indices(np.arange(3000), y, 500)
+    assert np.isfinite(y[idx]).all() and len(idx) == 500
+    assert downsample_indices(np.arange(5), [1.0, np.nan, 3.0, 4.0, 5.0], 500).tolist() == [0, 2, 3, 4]
+
+
+def test_long_series_use_webgl_and_stacked_areas_share_x():
+    df = _daily().assign(w=lambda d: d["v"] * 2)
+    fig = line(df, "data", ["v", "w"])
+    assert {t.type for t in fig.data} == {"scattergl"}
+    assert line(df.head(100), "data", ["v"]).data[0].type == "scatter"
+    stacked = area(df, "data", ["v", "w"])
+    assert len(stacked.data[0].x) <= MAX_POINTS
+    assert list(stacked.data[0].x) == list(stacked.data[1].x)
+
+
+@pytest.fixture
+def fig_cache(monkeypatch):
+    monkeypatch.setattr(charts, "_FIG_CACHE", OrderedDict())
+    monkeypatch.setattr(charts, "_FIG_STATS", {"bytes": 0, "hits": 0, "misses": 0})
+
+
+def _counting_line(calls):
+    def build(df, **params):
+        calls.append(1)
+        return line(df, **params)
+    return build
+
+
+def test_repeated_figure_is_served_from_the_cache(fig_cache):
+    calls, df = [], _daily(1).assign(inna=0.0)
+    build = _counting_line(calls)
+    first = charts.cached_figure(build, df, x="data", ys=["v"], title="T")
+    again = charts.cached_figure(build, df.copy().assign(inna=1.0), x="data", ys=["v"], title="T")  # inna kolumna
+
+    assert len(calls) == 1 and isinstance(again, charts._CachedFigure)
+    assert again.to_dict() == json.loads(first.to_json())
+    info = charts.figure_cache_info()
+    assert (info["hits"], info["misses"], info["entries"]) == (1, 1, 1)
+
+
+def test_changed_series_or_parameters_build_a_new_figure(fig_cache):
+    calls, df = [], _daily(1)
+    build = _counting_line(calls)
+    charts.cached_figure(build, df, x="data", ys=["v"])
+    changed = df.copy()
+    changed.loc[5, "v"] += 1.0
+    charts.cached_figure(build, changed, x="data", ys=["v"])
+    charts.cached_figure(build, df, x="data", ys=["v"], title="inny")
+    assert len(calls) == 3
+
+
+def test_cache_keeps_within_its_memory_budget(fig_cache, monkeypatch):
+    monkeypatch.setenv("FIG_CACHE_MB", "0.001")
+    for i in range(3):
+        charts.cached_figure(line, _daily(1).assign(v=float(i)), x="data", ys=["v"])
+    info = charts.figure_cache_info()
+    assert info["entries"] == 1 and info["bytes"] > info["budget"]  # najnowsza zostaje, nawet ponad budżet
+
+
+def test_fingerprint_follows_content_not_identity():
+    df = _daily(1)
+    assert charts.fingerprint(df) == charts.fingerprint(df.copy())
+    assert charts.fingerprint(df, ["v"]) != charts.fingerprint(df.assign(v=df["v"].astype("float32")), ["v"])
+    text = pd.DataFrame({"k": ["a", "b"]})
+    assert charts.fingerprint(text) != charts.fingerprint(pd.DataFrame({"k": ["a", "c"]}))
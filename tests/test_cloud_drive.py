@@ -0,0 +1,156 @@
+# tests/test_cloud_drive.py
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from core import cloud_drive
+from core.cloud_drive import DiskCache, LocalDirTransport, read_sheet, read_sheets, upsert_sheet
+
+FID = "plan"
+
+
+def _write_book(path: str, sheets: dict) -> None:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
+        for name, df in sheets.items():
+            df.to_excel(wr, sheet_name=name, index=False)
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+
+
+def _month(year: int, month: int, value: float) -> pd.DataFrame:
+    days = pd.date_range(f"{year}-{month:02d}-01", periods=3, freq="D")
+    return pd.DataFrame({"data": days, "pokoje_sprzedane_bez_qty": [value] * 3})
+
+
+@pytest.fixture
+def drive(tmp_path):
+    """Lokalny „Drive” z plikiem FID (3 miesiące 2025 + inny arkusz) i pusty cache dyskowy."""
+    root = tmp_path / "drive"
+    root.mkdir()
+    _write_book(str(root / FID), {
+        **{f"WYKONANIE_2025_{m:02d}": _month(2025, m, float(m)) for m in (1, 2, 3)},
+        "Zakładki": pd.DataFrame({"strona": ["Plan"]}),
+    })
+    transport = LocalDirTransport(str(root))
+    cloud_drive.set_transport(transport)
+    cloud_drive.set_disk_cache(DiskCache(str(tmp_path / "cache")))
+    yield transport
+    cloud_drive.set_transport(None)
+    cloud_drive.set_disk_cache(None)
+
+
+def _touch(transport: LocalDirTransport, sheets: dict) -> None:
+    """Nowa wersja pliku – na pewno z inną rewizją (mtime + rozmiar)."""
+    path = os.path.join(transport.root, FID)
+    before = os.stat(path).st_mtime_ns
+    _write_book(path, sheets)
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+def test_year_sheets_come_from_one_download(drive):
+    names = [f"WYKONANIE_2025_{m:02d}" for m in range(1, 13)]
+    out = read_sheets(FID, names)
+    assert list(out) == names[:3]  # tylko istniejące arkusze, w kolejności zapytania
+    assert out["WYKONANIE_2025_02"]["pokoje_sprzedane_bez_qty"].tolist() == [2.0] * 3
+    assert drive.calls["download"] == 1
+
+
+def test_unchanged_revision_is_served_from_memory_cache(drive):
+    read_sheets(FID, ["WYKONANIE_2025_01", "WYKONANIE_2025_04"])
+    again = read_sheets(FID, ["WYKONANIE_2025_01", "WYKONANIE_2025_04"])
+    assert list(again) == ["WYKONANIE_2025_01"]  # brak arkusza też jest zapamiętany
+    assert drive.calls["download"] == 1
+    assert drive.calls["revision"] == 2  # tylko lekkie zapytanie o metadane
+
+
+def test_disk_cache_survives_process_cache_clear(drive):
+    read_sheets(FID, ["WYKONANIE_2025_01"])
+    cloud_drive.clear_cache()  # jak nowy proces: pamięć pusta, dysk zostaje
+    df = read_sheet(FID, "WYKONANIE_2025_01")
+    assert df["pokoje_sprzedane_bez_qty"].tolist() == [1.0] * 3
+    assert drive.calls["download"] == 1
+
+
+def test_new_revision_is_downloaded_again(drive):
+    assert read_sheet(FID, "WYKONANIE_2025_01")["pokoje_sprzedane_bez_qty"].iloc[0] == 1.0
+    _touch(drive, {"WYKONANIE_2025_01": _month(2025, 1, 42.0)})
+    assert read_sheet(FID, "WYKONANIE_2025_01")["pokoje_sprzedane_bez_qty"].iloc[0] == 42.0
+    assert read_sheet(FID, "WYKONANIE_2025_02") is None
+    assert drive.calls["download"] == 2
+
+
+def test_upsert_replaces_one_sheet_and_primes_the_cache(drive):
+    upsert_sheet(FID, "WYKONANIE_2025_02", _month(2025, 2, 7.0))
+    assert drive.calls["upload"] == 1
+    out = read_sheets(FID, ["WYKONANIE_2025_01", "WYKONANIE_2025_02", "Zakładki"])
+    assert out["WYKONANIE_2025_02"]["pokoje_sprzedane_bez_qty"].tolist() == [7.0] * 3
+    assert out["WYKONANIE_2025_01"]["pokoje_sprzedane_bez_qty"].tolist() == [1.0] * 3
+    assert list(out["Zakładki"]["strona"]) == ["Plan"]
+    assert drive.calls["download"] == 1  # nowa rewizja już w cache po wysłaniu
+
+
+def test_file_id_from_link():
+    assert cloud_drive.file_id_from_ref("https://docs.google.com/spreadsheets/d/abc_123-X/edit") == "abc_123-X"
+    assert cloud_drive.file_id_from_ref("https://drive.google.com/open?id=xyz") == "xyz"
+    assert cloud_drive.file_id_from_ref(" plain ") == "plain"
+
+
+def test_load_exec_sheets_maps_months(drive):
+    from core.state import load_exec_sheets
+
+    out = load_exec_sheets(FID, 2025)
+    assert sorted(out) == [1, 2, 3]
+    assert out[3]["data"].dt.month.eq(3).all()
+    assert drive.calls["download"] == 1
+
+
+# --- DiskCache ---
+
+def test_disk_cache_hit_miss_and_missing_sheet(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get_workbook(FID, "r1") is None
+    assert cache.get_sheet(FID, "r1", "A") == (False, None)
+    cache.put_workbook(FID, "r1", b"xlsx")
+    cache.put_sheet(FID, "r1", "A", _month(2025, 1, 1.0))
+    cache.put_sheet(FID, "r1", "brak", None)
+    assert cache.get_workbook(FID, "r1") == b"xlsx"
+    hit, df = cache.get_sheet(FID, "r1", "A")
+    assert hit and df["pokoje_sprzedane_bez_qty"].tolist() == [1.0] * 3
+    assert cache.get_sheet(FID, "r1", "brak") == (True, None)  # „arkusza nie ma” to też trafienie
+
+
+def test_disk_cache_new_revision_drops_the_old_one(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put_workbook(FID, "r1", b"a" * 100)
+    cache.put_workbook("inny", "r1", b"b" * 50)
+    cache.put_workbook(FID, "r2", b"c" * 10)
+    assert cache.get_workbook(FID, "r1") is None
+    assert cache.get_workbook("inny", "r1") == b"b" * 50
+    assert cache.total_bytes == 60
+
+
+def test_disk_cache_evicts_least_recently_used_within_budget(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    for fid in ("a", "b"):
+        cache.put_workbook(fid, "r", fid.encode() * 100)
+    assert cache.get_workbook("a", "r") is not None  # „a” świeższe niż „b”
+    cache.put_workbook("c", "r", b"c" * 100)
+    assert cache.get_workbook("b", "r") is None
+    assert cache.get_workbook("a", "r") is not None and cache.get_workbook("c", "r") is not None
+    assert cache.total_bytes == 200
+
+
+def test_disk_cache_scans_directory_once(tmp_path, monkeypatch):
+    DiskCache(str(tmp_path)).put_workbook("stary", "r", b"x" * 30)  # wpis z „poprzedniego procesu”
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(cloud_drive.os, "walk", lambda *a, **k: walks.append(a) or real_walk(*a, **k))
+    cache = DiskCache(str(tmp_path), max_bytes=10_000)
+    for i in range(20):
+        cache.put_sheet(FID, "r1", f"s{i}", None)
+    assert len(walks) == 1
+    on_disk = sum(os.path.getsize(os.path.join(b, f)) for b, _, fs in real_walk(str(tmp_path)) for f in fs)
+    assert cache.total_bytes == on_disk
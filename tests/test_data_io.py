@@ -0,0 +1,75 @@
+# tests/test_data_io.py
+import io
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+from core import data_io
+from core.data_io import LazyWorkbook, changed_sheets, read_project_excel, sheet_fingerprints
+
+
+def _xlsx(sheets) -> bytes:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as w:
+        for name, df in sheets.items():
+            df.to_excel(w, sheet_name=name, index=False)
+    return buf.getvalue()
+
+
+SHEETS = {
+    "Plan": pd.DataFrame({"month": ["sty", "lut"], "ADR_plan": [100.5, 110.5]}),
+    "raw": pd.DataFrame({"data": pd.to_datetime(["2025-01-01", "2025-01-02"]), "pokoje": [10, 12]}),
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    """Pusty cache parsowania w procesie i osobny katalog sidecarów na test."""
+    monkeypatch.setenv("SIDECAR_CACHE_DIR", str(tmp_path / "sidecars"))
+    monkeypatch.setattr(data_io, "_PARSED", OrderedDict())
+    monkeypatch.setattr(data_io, "_PARSED_BYTES", 0)
+    monkeypatch.setattr(data_io, "_BOOKS", OrderedDict())
+    monkeypatch.setattr(data_io, "_BOOK_KEYS", {})
+
+
+def test_sheets_are_parsed_on_first_access_only():
+    book = read_project_excel(io.BytesIO(_xlsx(SHEETS)))
+    assert isinstance(book, LazyWorkbook)
+    assert list(book) == ["Plan", "raw"] and "raw" in book
+    assert not book.is_parsed("Plan") and not book.is_parsed("raw")
+
+    pd.testing.assert_frame_equal(book["Plan"], SHEETS["Plan"])
+    assert book.is_parsed("Plan") and not book.is_parsed("raw")
+    with pytest.raises(KeyError):
+        book["brak"]
+
+
+def test_sessions_with_the_same_file_share_parsed_sheets():
+    data = _xlsx(SHEETS)
+    first = LazyWorkbook(data)["raw"]
+    assert LazyWorkbook(data)["raw"] is first
+
+
+def _edited():
+    """Nowa wersja pliku: zmieniona liczba w arkuszu raw, nowy arkusz cost."""
+    raw = SHEETS["raw"].assign(pokoje=[10, 13])
+    return {"Plan": SHEETS["Plan"], "raw": raw, "cost": pd.DataFrame({"data": [1], "koszt": [2.5]})}
+
+
+def test_only_edited_and_new_sheets_count_as_changed():
+    old, new = LazyWorkbook(_xlsx(SHEETS)), LazyWorkbook(_xlsx(_edited()))
+    assert old.fingerprints["Plan"] == new.fingerprints["Plan"]
+    assert old.fingerprints["raw"] != new.fingerprints["raw"]
+    assert changed_sheets(new, old.fingerprints) == ["raw", "cost"]
+    assert changed_sheets(new, None) == ["Plan", "raw", "cost"]
+
+
+def test_unchanged_sheet_of_a_new_file_version_is_not_parsed_again():
+    LazyWorkbook(_xlsx(SHEETS))["Plan"]
+    new = LazyWorkbook(_xlsx(_edited()))
+    assert new.is_parsed("Plan") and not new.is_parsed("raw")
+
+
+def test_files_that_are_not_ooxml_have_no_fingerprints():
+    assert sheet_fingerprints(b"nie zip") is None
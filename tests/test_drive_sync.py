@@ -0,0 +1,110 @@
+# tests/test_drive_sync.py
+import io
+import time
+
+import pandas as pd
+import pytest
+
+from core import cloud_drive
+from core.cloud_drive import DiskCache, LocalDirTransport, read_sheets
+from core.drive_sync import DriveSync
+
+FID = "plan"
+
+
+def _month(value: float) -> pd.DataFrame:
+    return pd.DataFrame({"data": pd.date_range("2025-01-01", periods=3, freq="D"), "v": [value] * 3})
+
+
+@pytest.fixture
+def drive(tmp_path):
+    """Katalog jako Drive z plikiem FID: dwa miesiące + arkusz, którego kolejka nie rusza."""
+    root = tmp_path / "drive"
+    root.mkdir()
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
+        _month(1.0).to_excel(wr, sheet_name="WYKONANIE_2025_01", index=False)
+        _month(2.0).to_excel(wr, sheet_name="WYKONANIE_2025_02", index=False)
+        pd.DataFrame({"strona": ["Plan"]}).to_excel(wr, sheet_name="Zakładki", index=False)
+    (root / FID).write_bytes(buf.getvalue())
+    transport = LocalDirTransport(str(root))
+    cloud_drive.set_transport(transport)
+    cloud_drive.set_disk_cache(DiskCache(str(tmp_path / "cache")))
+    yield transport
+    cloud_drive.set_transport(None)
+    cloud_drive.set_disk_cache(None)
+
+
+def test_repeated_saves_merge_into_one_upload(drive):
+    sync = DriveSync(debounce=0.2)
+    for v in (10.0, 11.0, 12.0):
+        sync.enqueue(FID, "WYKONANIE_2025_01", _month(v))
+    assert sync.status(FID).pending == 1
+    assert sync.flush(timeout=10)
+    assert drive.calls["upload"] == 1
+    out = read_sheets(FID, ["WYKONANIE_2025_01", "WYKONANIE_2025_02", "Zakładki"])
+    assert out["WYKONANIE_2025_01"]["v"].tolist() == [12.0] * 3  # ostatnia wersja
+    assert out["WYKONANIE_2025_02"]["v"].tolist() == [2.0] * 3   # czysty arkusz bez zmian
+    assert list(out["Zakładki"]["strona"]) == ["Plan"]
+    s = sync.status(FID)
+    assert s.pending == 0 and s.last_ok and s.last_error is None
+
+
+def test_enqueue_copies_the_frame(drive):
+    sync = DriveSync(debounce=0.2)
+    df = _month(5.0)
+    sync.enqueue(FID, "WYKONANIE_2025_01", df)
+    df["v"] = 99.0  # sesja edytuje dalej swoją ramkę
+    assert sync.flush(timeout=10)
+    assert read_sheets(FID, ["WYKONANIE_2025_01"])["WYKONANIE_2025_01"]["v"].tolist() == [5.0] * 3
+
+
+def test_kick_sends_without_waiting_for_the_window(drive):
+    sync = DriveSync(debounce=60.0)
+    sync.enqueue(FID, "WYKONANIE_2025_02", _month(3.0))
+    sync.kick()  # koniec sesji
+    for _ in range(100):
+        if drive.calls["upload"]:
+            break
+        time.sleep(0.05)
+    assert drive.calls["upload"] == 1
+
+
+def test_failure_keeps_sheets_and_reports_error(drive):
+    calls = []
+
+    def flaky(ref, sheets):
+        calls.append(dict(sheets))
+        if len(calls) == 1:
+            raise ConnectionError("offline")
+        return cloud_drive.upsert_sheets(ref, sheets)
+
+    sync = DriveSync(debounce=0.05, retry=0.2, writer=flaky)
+    sync.enqueue(FID, "WYKONANIE_2025_01", _month(7.0))
+    assert not sync.flush(timeout=10)  # pierwsza próba nie przeszła – arkusz wraca do kolejki
+    s = sync.status(FID)
+    assert s.pending == 1 and s.failures == 1 and "offline" in s.last_error
+    sync.enqueue(FID, "WYKONANIE_2025_02", _month(8.0))
+    assert sync.flush(timeout=10)
+    assert sorted(calls[-1]) == ["WYKONANIE_2025_01", "WYKONANIE_2025_02"]
+    assert sync.status(FID).last_error is None
+    assert read_sheets(FID, ["WYKONANIE_2025_01"])["WYKONANIE_2025_01"]["v"].tolist() == [7.0] * 3
+
+
+def test_sidebar_caption_is_empty_until_something_is_queued(drive, monkeypatch):
+    import streamlit as st
+
+    from core import drive_sync, state
+
+    sync = DriveSync(debounce=0.05)
+    monkeypatch.setattr(state, "get_sync", lambda: sync)
+    monkeypatch.setattr(drive_sync, "_SYNC", sync)
+    st.session_state["drive_plan_file"] = FID
+    try:
+        assert state.drive_sync_caption() == ("", None)  # plik skonfigurowany, ale nic nie wysłano
+        sync.enqueue(FID, "WYKONANIE_2025_01", _month(4.0))
+        assert state.drive_sync_caption()[0] == "Drive: 1 ark. czeka na zapis"
+        assert sync.flush(timeout=10)
+        assert state.drive_sync_caption()[0].startswith("Drive: zapisano ")
+    finally:
+        st.session_state.clear()
@@ -0,0 +1,58 @@
+# tests/test_exec_archive.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.audit_log import AUDIT_COLS, AuditLog
+from core.exec_archive import FORMATS, available_formats, export_archive, import_archive
+from core.exec_store import YearStore
+
+COLS = ["a", "b", "c"]
+
+
+@pytest.fixture
+def state():
+    rng = np.random.default_rng(1)
+    exec_state = {}
+    for y in (2024, 2025):
+        store = exec_state[y] = YearStore(y, COLS)
+        for m in (1, 2, 12):
+            sl = store.month_slice(m)
+            block = rng.normal(0, 1e6, (sl.stop - sl.start, len(COLS)))
+            block[rng.random(block.shape) < 0.4] = np.nan
+            store.write_values(m, block)
+        store.write_cells(2, [0, 1], [0, 1], [0.1 + 0.2, 1e-300])  # liczby, których zapis dziesiętny nie jest krótki
+    audit = pd.DataFrame({
+        "czas": pd.to_datetime(["2025-02-01 10:00:00.123456789", "2025-02-02 11:00:00.000000000"]),
+        "uzytkownik": ["GM", "NA"],  # „NA” to nazwa użytkownika, nie brak
+        "data": pd.to_datetime(["2025-02-01", "2025-02-02"]),
+        "kolumna": ["a", "b"],
+        "stara": [np.nan, 1.5],
+        "nowa": [0.1 + 0.2, np.nan],
+    }, columns=AUDIT_COLS)
+    return exec_state, {2025: {2: AuditLog.from_frame(audit)}}
+
+
+@pytest.mark.parametrize("fmt", list(FORMATS))
+def test_archive_round_trip_is_exact(fmt, state, tmp_path):
+    if fmt not in available_formats():
+        pytest.skip("format wymaga pyarrow")
+    exec_state, audit_state = state
+    path = export_archive(exec_state, audit_state, fmt, str(tmp_path / f"a.{fmt}.zip"), schema_version=1)
+
+    ex, au, manifest = import_archive(path)
+
+    assert manifest == {"format": fmt, "columns": COLS, "years": [2024, 2025], "schema_version": 1}
+    assert sorted(ex) == [2024, 2025]
+    for y, store in exec_state.items():
+        np.testing.assert_array_equal(ex[y].values, store.values)
+        np.testing.assert_array_equal(ex[y].month_sums(), store.month_sums())
+    assert list(au) == [2025] and list(au[2025]) == [2]
+    assert au[2025][2].schema_version == 1
+    pd.testing.assert_frame_equal(au[2025][2].to_frame(), audit_state[2025][2].to_frame(), check_categorical=False)
+
+
+def test_empty_state_round_trips(tmp_path):
+    path = export_archive({}, {}, "csv", str(tmp_path / "empty.zip"))
+    ex, au, manifest = import_archive(path)
+    assert (ex, au, manifest["years"]) == ({}, {}, [])
@@ -0,0 +1,68 @@
+# tests/test_exec_db.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.audit_log import AUDIT_COLS
+from core.exec_db import ExecDB, open_exec_db
+
+COLS = ["a", "b"]
+
+
+def _delta(rows) -> pd.DataFrame:
+    """Wiersze audytu (dzień marca 2025, kolumna, stara, nowa)."""
+    return pd.DataFrame(
+        [(pd.Timestamp("2025-04-01 12:00"), "GM", pd.Timestamp(2025, 3, d), k, o, n) for d, k, o, n in rows],
+        columns=AUDIT_COLS,
+    )
+
+
+@pytest.fixture
+def db(tmp_path):
+    return ExecDB(str(tmp_path / "exec.db"), COLS)
+
+
+def test_save_month_upserts_only_the_changed_cells(db):
+    db.save_month(2025, 3, _delta([(1, "a", np.nan, 1.0), (1, "b", np.nan, 2.0), (5, "a", np.nan, 3.0)]))
+    db.save_month(2025, 3, _delta([(1, "a", 1.0, 10.0), (5, "a", 3.0, np.nan), (2, "nieznana", np.nan, 9.0)]))
+
+    days, vals = db.load_month(2025, 3)
+    assert days.tolist() == [1, 5]
+    np.testing.assert_array_equal(vals, [[10.0, 2.0], [np.nan, np.nan]])
+    audit = db.load_audit(2025, 3)
+    assert len(audit) == 6 and audit["nowa"].iloc[-2:].isna().tolist() == [True, False]
+    assert db.years() == [2025] and db.load_month(2025, 4)[0].size == 0
+
+
+def test_save_many_rolls_back_cells_when_the_audit_insert_fails(db, monkeypatch):
+    def fail(rows):
+        raise RuntimeError("dysk pełny")
+
+    monkeypatch.setattr(db, "_insert_audit", fail)  # wywoływane po upsercie komórek, w tej samej transakcji
+    with pytest.raises(RuntimeError):
+        db.save_many([(2025, 3, _delta([(2, "b", np.nan, 4.0)])), (2025, 4, _delta([(1, "a", np.nan, 1.0)]))])
+    monkeypatch.undo()
+    assert db.years() == []
+    db.save_month(2025, 3, _delta([(2, "b", np.nan, 4.0)]))  # połączenie po ROLLBACK działa dalej
+    assert db.load_month(2025, 3)[0].tolist() == [2]
+
+
+def test_replace_all_swaps_the_whole_content(db):
+    db.save_month(2025, 3, _delta([(1, "a", np.nan, 1.0)]))
+    values = np.array([[7.0, np.nan], [np.nan, 8.0]])
+    db.replace_all([(2024, 2, np.array([28, 29]), values)], audit=[(2024, 2, _delta([(9, "b", 1.0, 2.0)]))])
+
+    assert db.years() == [2024] and db.load_audit(2025, 3).empty
+    days, vals = db.load_month(2024, 2)
+    assert days.tolist() == [28, 29]
+    np.testing.assert_array_equal(vals, values)
+    assert db.load_audit(2024, 2)["kolumna"].tolist() == ["b"]
+
+
+def test_new_schema_columns_are_added_and_connections_are_shared(tmp_path):
+    path = str(tmp_path / "exec.db")
+    ExecDB(path, COLS).save_month(2025, 3, _delta([(1, "a", np.nan, 1.0)]))
+    wider = open_exec_db(path, COLS + ["c"])
+
+    assert open_exec_db(path, COLS) is wider
+    np.testing.assert_array_equal(wider.load_month(2025, 3)[1], [[1.0, np.nan, np.nan]])
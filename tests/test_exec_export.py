@@ -0,0 +1,55 @@
+# tests/test_exec_export.py
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from core.exec_export import export_exec_zip, select_months, sheet_name
+
+
+def _month(year: int, month: int, value: float) -> pd.DataFrame:
+    days = pd.date_range(f"{year}-{month:02d}-01", periods=3, freq="D")
+    return pd.DataFrame({"data": days, "pokoje_dostepne_qty": [value, np.nan, 2.0]})
+
+
+EXEC = {
+    2024: {12: _month(2024, 12, 1.0)},
+    2025: {1: _month(2025, 1, 3.0), 2: _month(2025, 2, 4.0), 3: _month(2025, 3, 5.0)},
+}
+
+
+def _read(path: str):
+    with zipfile.ZipFile(path) as zf:
+        return {n: pd.read_excel(io.BytesIO(zf.read(n)), sheet_name=None) for n in zf.namelist()}
+
+
+def test_select_months_spans_years_inclusively():
+    assert select_months(EXEC, (2024, 12), (2025, 2)) == {2024: [12], 2025: [1, 2]}
+    assert select_months(EXEC, (2026, 1), (2026, 12)) == {}
+
+
+def test_zip_has_one_workbook_per_year_with_a_sheet_per_month(tmp_path):
+    path, digests, written = export_exec_zip(EXEC, {2024: [12], 2025: [1, 2]}, str(tmp_path / "out.zip"))
+
+    files = _read(path)
+    assert written == [(2024, 12), (2025, 1), (2025, 2)]
+    assert sorted(files) == ["wykonanie_2024.xlsx", "wykonanie_2025.xlsx"]
+    assert list(files["wykonanie_2025.xlsx"]) == [sheet_name(2025, 1), sheet_name(2025, 2)]
+    sheet = files["wykonanie_2025.xlsx"]["WYKONANIE_2025_02"]
+    assert sheet["pokoje_dostepne_qty"].isna().tolist() == [False, True, False]
+    pd.testing.assert_series_equal(sheet["data"], EXEC[2025][2]["data"], check_dtype=False)
+    assert set(digests) == {"WYKONANIE_2024_12", "WYKONANIE_2025_01", "WYKONANIE_2025_02"}
+
+
+def test_incremental_export_writes_only_changed_months(tmp_path):
+    sel = {2025: [1, 2, 3]}
+    _, digests, _ = export_exec_zip(EXEC, sel, str(tmp_path / "a.zip"))
+    assert export_exec_zip(EXEC, sel, previous=digests)[0] is None
+
+    changed = {2025: {**EXEC[2025], 2: _month(2025, 2, 40.0)}}
+    path, new_digests, written = export_exec_zip(changed, sel, str(tmp_path / "b.zip"), previous=digests)
+    assert written == [(2025, 2)]
+    assert list(_read(path)["wykonanie_2025.xlsx"]) == ["WYKONANIE_2025_02"]
+    assert new_digests["WYKONANIE_2025_01"] == digests["WYKONANIE_2025_01"]
+    assert new_digests["WYKONANIE_2025_02"] != digests["WYKONANIE_2025_02"]
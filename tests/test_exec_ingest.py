@@ -0,0 +1,62 @@
+# tests/test_exec_ingest.py
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from core.exec_ingest import parse_dates, parse_pl_numbers, stage_workbook
+
+
+def test_polish_number_text_is_parsed_and_numbers_pass_through():
+    out = parse_pl_numbers(["1 234,56", "1.234,56 zł", "1 234,5 PLN", "(12,5)", "-3", "abc", None, 7, 2.5])
+    np.testing.assert_array_equal(out, [1234.56, 1234.56, 1234.5, -12.5, -3.0, np.nan, np.nan, 7.0, 2.5])
+
+
+def test_percent_text_matches_a_numeric_excel_percent_cell():
+    out = parse_pl_numbers(["12,5%", "12,5 %", 0.125, "80%"])
+    np.testing.assert_allclose(out, [0.125, 0.125, 0.125, 0.8])
+
+
+def test_dates_are_day_first_except_iso():
+    out = parse_dates([datetime(2025, 1, 31, 15, 30), "01.02.2025", "2025-02-03", "31/01/2025", "jutro", None])
+    assert [str(d) for d in out] == ["2025-01-31", "2025-02-01", "2025-02-03", "2025-01-31", "NaT", "NaT"]
+
+
+def _workbook() -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "raw"
+    ws.append(["Dzień", "przychody_pokoje_netto", "pokoje_oos_qty", "Nieznana miara"])
+    ws.append(["01.01.2025", "1 000,50", 2, "x"])
+    ws.append([datetime(2025, 1, 2), 500, None, "y"])
+    ws.append(["zła data", 1, 1, None])
+    ws.append(["01.01.2025", "1 100", None, None])  # późniejszy wiersz nadpisuje wartość tego dnia
+    ws.append(["2024-12-31", 10, None, None])
+    m = wb.create_sheet("raw_matrix")
+    m.append(["miara", "2025-01-03", "04.01.2025"])
+    m.append(["pokoje_dostepne_qty", 40, "41"])
+    m.append(["obca", 1, 2])
+    wb.create_sheet("Notatki").append(["data", "pokoje_dostepne_qty"])  # arkusz nieoperacyjny
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_stage_workbook_reads_long_and_matrix_sheets_in_chunks():
+    staged, rep = stage_workbook(_workbook(), chunk_rows=2)
+
+    assert rep.sheets == ["raw", "raw_matrix"]
+    assert rep.unmapped == {"raw": ["Nieznana miara"], "raw_matrix": ["obca"]}
+    assert rep.bad_dates == 1 and rep.rows == 5 + 1
+    assert sorted(staged.years) == [2024, 2025]
+
+    vals, touched = staged.years[2025]
+    frame = pd.DataFrame(vals, columns=staged.columns)
+    assert frame.loc[0, "pokoje_przychod_netto_pln"] == 1100.0
+    assert frame.loc[1, "pokoje_przychod_netto_pln"] == 500.0
+    assert frame.loc[0, "pokoje_oos_qty"] == 2.0 and not touched[1, staged.columns.index("pokoje_oos_qty")]
+    assert frame.loc[2:3, "pokoje_dostepne_qty"].tolist() == [40.0, 41.0]
+    assert staged.years[2024][0][-1, staged.columns.index("pokoje_przychod_netto_pln")] == 10.0
+    assert rep.cells == int(touched.sum() + staged.years[2024][1].sum()) + 1  # dzień nadpisany liczony dwa razy
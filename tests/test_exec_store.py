@@ -0,0 +1,160 @@
+# tests/test_exec_store.py
+import numpy as np
+import pytest
+
+from core.exec_store import YearStore
+
+COLS = ["a", "b", "c"]
+
+
+def _loader(calls):
+    """Loader jak z ExecDB: marzec ma dni 1 i 3, pozostałe miesiące puste."""
+    def load(month):
+        calls.append(month)
+        if month == 3:
+            return np.array([1, 3]), np.array([[1.0, 2.0, np.nan], [4.0, 0.0, 6.0]])
+        return np.empty(0, dtype="int64"), np.empty((0, len(COLS)))
+    return load
+
+
+def test_ensure_loaded_pulls_a_month_once_and_places_days_by_date():
+    calls = []
+    store = YearStore(2025, COLS, loader=_loader(calls))
+    assert not store.is_loaded(3)
+
+    df = store[3]
+    store.ensure_loaded(3)
+
+    assert calls == [3]
+    assert df["data"].iloc[2].strftime("%Y-%m-%d") == "2025-03-03"
+    np.testing.assert_array_equal(df.iloc[[0, 2]][COLS].to_numpy(), [[1.0, 2.0, np.nan], [4.0, 0.0, 6.0]])
+    assert df[COLS].iloc[1].isna().all()
+    with pytest.raises(ValueError):
+        df.iloc[0, 1] = 9.0  # widok tylko do odczytu
+
+
+def test_write_values_on_an_unloaded_month_replaces_it_without_calling_the_loader():
+    calls = []
+    store = YearStore(2025, COLS, loader=_loader(calls))
+    sl = store.month_slice(3)
+    block = np.full((sl.stop - sl.start, len(COLS)), np.nan)
+    block[1, 0] = 7.0
+
+    store.write_values(3, block)
+
+    assert calls == [] and store.is_loaded(3)
+    np.testing.assert_array_equal(store.values[sl], block)  # dni 1 i 3 z bazy nie wracają
+    assert store.month_sum(3).tolist() == [7.0, 0.0, 0.0]
+
+
+def _nansum_months(store):
+    return np.array([np.nansum(store.values[store.month_slice(m)], axis=0) for m in range(1, 13)])
+
+
+def test_cell_writes_correct_cached_month_and_ytd_sums_incrementally():
+    rng = np.random.default_rng(0)
+    store = YearStore(2024, COLS)
+    for m in range(1, 13):
+        sl = store.month_slice(m)
+        block = rng.uniform(0, 100, (sl.stop - sl.start, len(COLS)))
+        block[rng.random(block.shape) < 0.3] = np.nan
+        store.write_values(m, block)
+    store.month_sums()
+    store.ytd_sums(12)  # sumy miesięcy i prefiksy aktualne – dalej tylko korekty o różnice
+
+    for _ in range(50):
+        m = int(rng.integers(1, 13))
+        n = int(rng.integers(1, 6))
+        vals = rng.uniform(-50, 50, n)
+        vals[rng.random(n) < 0.3] = np.nan  # także czyszczenie komórek
+        store.write_cells(m, rng.integers(0, 28, n), rng.integers(0, len(COLS), n), vals)
+        assert store._sums_ok.all() and store._prefix_valid == 12
+
+    want = _nansum_months(store)
+    np.testing.assert_allclose(store.month_sums(), want)
+    for m in (1, 6, 12):
+        np.testing.assert_allclose(store.ytd_sums(m), want[:m].sum(axis=0))
+
+
+def test_whole_month_write_invalidates_sums_from_that_month_on():
+    store = YearStore(2025, COLS)
+    store.write_cells(2, [0], [0], [5.0])
+    assert store.ytd_sums(12)[0] == 5.0
+
+    sl = store.month_slice(4)
+    block = np.full((sl.stop - sl.start, len(COLS)), np.nan)
+    block[:, 0] = 1.0
+    store.write_values(4, block)
+
+    assert store._prefix_valid == 3 and not store._sums_ok[3]
+    assert store.ytd_sums(3)[0] == 5.0
+    assert store.ytd_sums(12)[0] == 35.0
+    np.testing.assert_allclose(store.month_sums(), _nansum_months(store))
+
+
+def test_a_cell_repeated_in_one_write_keeps_the_last_value_and_counts_once():
+    store = YearStore(2025, COLS)
+    store.write_cells(1, [0], [0], [10.0])
+    store.ytd_sums(1)
+
+    rows, cols, old, new = store.write_cells(1, [0, 0, 1], [0, 0, 0], [20.0, 30.0, 1.0])
+
+    assert rows.tolist() == [0, 1] and new.tolist() == [30.0, 1.0]
+    assert old[0] == 10.0 and np.isnan(old[1])
+    assert store.values[0, 0] == 30.0
+    assert store.month_sum(1)[0] == 31.0 and store.ytd_sums(1)[0] == 31.0
+
+
+def test_missing_bitmap_tracks_nan_and_zero_through_every_write_path():
+    calls = []
+    store = YearStore(2025, COLS, loader=_loader(calls))
+    store.ensure_loaded(3)
+    store.write_cells(3, [1, 2], [0, 1], [8.0, 5.0])
+
+    sl = store.month_slice(3)
+    np.testing.assert_array_equal(store.missing[sl], np.isnan(store.values[sl]) | (store.values[sl] == 0.0))
+    assert store.missing_mask(3, ["b", "spoza"])[:3, 0].tolist() == [False, True, False]  # 0 z bazy → 5
+
+    block = np.zeros((sl.stop - sl.start, len(COLS)))
+    block[0] = 1.0
+    store.write_values(3, block)
+    assert store.missing[sl].sum() == block.size - len(COLS)
+
+
+def test_fill_ratio_recomputes_only_months_written_since_the_last_call():
+    store = YearStore(2025, COLS)
+    store.write_cells(1, [0], [0], [1.0])
+    ratio = store.fill_ratio(["a", "b"])
+    assert ratio[0] == 0.5 and ratio[1:].sum() == 0.0
+
+    jan = store.month_slice(1)
+    ratio[jan.start] = -1.0  # znacznik: styczeń nie zmieniony → nie liczony od nowa
+    store.write_cells(2, [0], [1], [2.0])
+    ratio = store.fill_ratio(["a", "b"])
+
+    assert ratio[jan.start] == -1.0
+    assert ratio[store.month_slice(2).start] == 0.5
+    store.write_cells(1, [0], [0], [0.0])  # zero = brak
+    assert store.fill_ratio(["a", "b"])[jan.start] == 0.0
+
+
+def test_generations_move_only_for_the_written_month_and_only_on_real_changes():
+    store = YearStore(2025, COLS)
+    other = YearStore(2025, COLS)
+    assert other.generation > store.generation  # wspólny licznik procesu – numery się nie powtarzają
+
+    before, months = store.generation, store.month_gen.copy()
+    store.write_cells(5, [0], [0], [1.0])
+    assert store.generation > before and store.month_gen[4] == store.generation
+    np.testing.assert_array_equal(np.delete(store.month_gen, 4), np.delete(months, 4))
+
+    gen = store.generation
+    store.write_cells(5, [0], [0], [1.0])  # ta sama wartość – nic się nie zmieniło
+    store.write_cells(5, [1], [0], [np.nan])
+    store.month_sums()
+    store.fill_ratio(COLS)
+    assert store.generation == gen
+
+    sl = store.month_slice(7)
+    store.write_values(7, np.full((sl.stop - sl.start, len(COLS)), np.nan))
+    assert store.generation > gen and store.month_gen[6] == store.generation
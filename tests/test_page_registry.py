@@ -0,0 +1,62 @@
+# tests/test_page_registry.py
+import subprocess
+import sys
+
+import pytest
+
+from core import page_registry as reg
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    """Pusty rejestr i pakiet stron testowych w tmp_path."""
+    for name, value in (("_PAGES", {}), ("_LOADED", {}), ("_REPORT", []), ("_MARKED", set())):
+        monkeypatch.setattr(reg, name, value)
+    pkg = tmp_path / "strony_testowe"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "pulpit.py").write_text("LOADS = []\nLOADS.append(1)\n")
+    (pkg / "zepsuta.py").write_text("import brakujacy_modul_xyz\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for mod in [m for m in sys.modules if m.startswith("strony_testowe")]:
+        del sys.modules[mod]
+
+
+def test_page_is_imported_on_first_use_only():
+    reg.register("Pulpit", "strony_testowe.pulpit")
+    assert "strony_testowe.pulpit" not in sys.modules
+
+    mod = reg.get_page("Pulpit")
+    assert reg.get_page("Pulpit") is mod and mod.LOADS == [1]
+    assert reg.loaded_pages() == ["Pulpit"]
+    (entry,) = reg.startup_report()
+    assert entry["etap"] == "import: Pulpit" and entry["błąd"] is None and entry["nowe_moduły"] >= 1
+
+
+def test_next_candidate_is_tried_only_when_the_page_module_itself_is_missing():
+    reg.register("Stara lokalizacja", "strony_testowe.brak", "strony_testowe.pulpit")
+    reg.register("Brak zależności", "strony_testowe.zepsuta", "strony_testowe.pulpit")
+
+    assert reg.get_page("Stara lokalizacja").__name__ == "strony_testowe.pulpit"
+    assert reg.get_page("Brak zależności") is None
+    errors = {r["etap"]: r["błąd"] for r in reg.startup_report()}
+    assert errors["import: Stara lokalizacja"] is None
+    assert "brakujacy_modul_xyz" in errors["import: Brak zależności"]
+    assert reg.get_page("Nieznana") is None and reg.loaded_pages() == ["Stara lokalizacja"]
+
+
+def test_marks_are_recorded_once_and_flagged_over_budget(monkeypatch):
+    monkeypatch.setenv("STARTUP_BUDGET_MS", "0")
+    reg.mark("pierwszy render")
+    reg.mark("pierwszy render")
+    (entry,) = reg.startup_report()
+    assert entry["etap"] == "pierwszy render" and entry["ponad_budżet"]
+
+
+def test_importing_the_app_does_not_import_any_page():
+    code = ("import sys, Operacje; "
+            "print(sorted(m for m in sys.modules if m.startswith('pages.') or m == '_wykonanie'))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=reg.__file__.rsplit("core", 1)[0],
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,40 @@
+# tests/test_plan_scenarios.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.plan_scenarios import BASE, PlanScenarios
+
+
+@pytest.fixture
+def ps():
+    base = pd.DataFrame({"month": ["sty", "lut", "mar", "kwi"], "ADR_plan": [100.0, 110.0, 120.0, 130.0]})
+    ps = PlanScenarios(base)
+    ps.create("A")
+    ps.set_cells("A", {2: {"ADR_plan": 999.0}})  # marzec
+    return ps
+
+
+def test_deleting_a_base_row_keeps_overrides_on_their_rows(ps):
+    edited = ps.materialize(BASE).drop(index=[0])  # jak data_editor: usunięty styczeń, indeksy pozostałych bez zmian
+    dropped = ps.set_base(edited, rows=edited.index.to_numpy())
+    out = ps.materialize("A")
+    assert dropped == 0
+    assert out.loc[out["month"] == "mar", "ADR_plan"].tolist() == [999.0]
+    assert out["ADR_plan"].tolist() == [110.0, 999.0, 130.0]
+
+
+def test_inserted_rows_are_new_and_deleted_override_rows_are_counted(ps):
+    base = ps.materialize(BASE)
+    edited = pd.concat([base.drop(index=[2]), pd.DataFrame({"month": ["maj"], "ADR_plan": [140.0]}, index=[4])])
+    idx = edited.index.to_numpy()
+    assert ps.set_base(edited, rows=np.where(idx < len(ps.base), idx, -1)) == 1
+    assert ps.override_count("A") == 0
+    assert ps.materialize("A")["ADR_plan"].tolist() == [100.0, 110.0, 130.0, 140.0]
+
+
+def test_imported_base_is_matched_by_label_column(ps):
+    imported = pd.DataFrame({"month": ["kwi", "mar", "lut"], "ADR_plan": [131.0, 121.0, 111.0]})
+    assert ps.set_base(imported, label="month") == 0
+    out = ps.materialize("A").set_index("month")["ADR_plan"]
+    assert out.to_dict() == {"kwi": 131.0, "mar": 999.0, "lut": 111.0}
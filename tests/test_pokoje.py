@@ -0,0 +1,93 @@
+# tests/test_pokoje.py
+import importlib
+import subprocess
+import sys
+from datetime import date
+
+import numpy as np
+import pytest
+import streamlit as st
+
+from core import state_local
+
+pokoje = importlib.import_module("pages.01_Pokoje")
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.delenv("EXEC_DB_PATH", raising=False)
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+def test_rooms_view_is_rebuilt_only_when_the_year_generation_changes(session):
+    state_local.save_cell_edits(2025, 2, {date(2025, 2, 1): {"pokoje_sprzedane_bez_qty": 10.0}})
+    first = pokoje._rooms_view(2025, 50.0, st.session_state["exec"])
+    assert pokoje._rooms_view(2025, 50.0, st.session_state["exec"]) is first
+
+    state_local.save_cell_edits(2025, 2, {date(2025, 2, 2): {"pokoje_sprzedane_bez_qty": 5.0}})
+    again = pokoje._rooms_view(2025, 50.0, st.session_state["exec"])
+    assert again is not first
+    assert again.loc["sprzedane pokojonoce", "lut"] == "15"
+    assert "_rooms_matrix_cache" not in st.session_state
+
+
+def test_rooms_page_does_not_load_the_chart_module():
+    # plotly.graph_objects ładuje już sam streamlit – sprawdzamy moduł wykresów i plotly.express
+    code = ("import importlib, sys; importlib.import_module('pages.01_Pokoje'); "
+            "print('components.charts' in sys.modules or 'plotly.express' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=pokoje.__file__.rsplit("pages", 1)[0],
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def _month_reference(available, oos, sold, revenue, sm, costs, rooms):
+    """Dawny wzór liczony per miesiąc skalarnie."""
+    capacity = max(available - oos, 0.0)
+    revpor = revenue / sold if sold > 0 else 0.0
+    dept = sum(costs)
+    return {
+        "liczba pokoi": rooms,
+        "zdolność eksploatacyjna": capacity,
+        "sprzedane pokojonoce": sold,
+        "frekwencja": sold / capacity if capacity > 0 else 0.0,
+        "średnia cena (RevPOR)": revpor,
+        "Sprzedaż pokoi": sold * revpor,
+        "Sprzedaż pokoi S&M": sm,
+        "Koszty wydziałowe": dept,
+        **dict(zip(pokoje.COST_ROWS, costs)),
+        "WYNIK DEPARTAMENTU": sold * revpor - dept,
+        "koszt na sprzedany pokój": dept / sold if sold > 0 else 0.0,
+    }
+
+
+def test_rooms_matrix_matches_the_per_month_formulas():
+    rng = np.random.default_rng(3)
+    sums = dict(
+        available=rng.uniform(0, 900, 12), oos=rng.uniform(0, 100, 12), sold=rng.uniform(0, 800, 12),
+        revenue=rng.uniform(0, 2e5, 12), sm=rng.uniform(0, 1e4, 12), costs=rng.uniform(0, 5e3, (12, len(pokoje.COST_ROWS))),
+    )
+    sums["sold"][[1, 4]] = 0.0          # bez sprzedaży – RevPOR i koszt na pokój 0, nie dzielenie przez 0
+    sums["oos"][2] = sums["available"][2] + 5.0  # OOS > dostępne – zdolność 0
+
+    mat = pokoje._build_rooms_matrix(sums, 30.0)
+
+    assert list(mat.index) == pokoje.ROWS and list(mat.columns) == pokoje.MONTHS
+    for i, m in enumerate(pokoje.MONTHS):
+        want = _month_reference(*(sums[k][i] for k in ("available", "oos", "sold", "revenue", "sm")),
+                                sums["costs"][i], 30.0)
+        got = mat[m]
+        np.testing.assert_allclose(got[list(want)].to_numpy(), list(want.values()), rtol=1e-12)
+    assert mat.loc[[r for r in pokoje.ROWS if r.startswith("—")]].isna().all().all()
+    assert np.isfinite(mat.drop(index=[r for r in pokoje.ROWS if r.startswith("—")]).to_numpy()).all()
+
+
+def test_formatted_matrix_keeps_the_previous_cell_formats():
+    sums = dict(available=np.full(12, 100.0), oos=np.zeros(12), sold=np.full(12, 50.0),
+                revenue=np.full(12, 12345.5), sm=np.zeros(12), costs=np.zeros((12, len(pokoje.COST_ROWS))))
+    out = pokoje._format_matrix(pokoje._build_rooms_matrix(sums, 1000.0))
+    assert out.loc["liczba pokoi", "sty"] == "1 000"
+    assert out.loc["frekwencja", "sty"] == "50.0%"  # jak dawny _fmt: tylko spacja tysięcy
+    assert out.loc["Sprzedaż pokoi", "sty"] == "12 345,50"
+    assert out.loc["— Sprzedaż pokoi —", "sty"] == ""
@@ -0,0 +1,98 @@
+# tests/test_portfolio.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import streamlit as st
+
+from core import portfolio
+from core.exec_db import ExecDB
+from core.exec_store import YearStore
+from core.schema import REGISTRY
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """Pusta sesja z katalogiem portfela (PORTFOLIO_DB_DIR), bez bazy hotelu domyślnego."""
+    monkeypatch.delenv("EXEC_DB_PATH", raising=False)
+    monkeypatch.setenv("PORTFOLIO_DB_DIR", str(tmp_path))
+    st.session_state.clear()
+    yield tmp_path
+    st.session_state.clear()
+
+
+@pytest.mark.parametrize("raw", ["../x", "a/b", "a\\b", "..", ".ukryty", "c:dysk", "  ", "tab\tulator"])
+def test_hotel_names_that_would_leave_the_portfolio_directory_are_rejected(raw):
+    with pytest.raises(ValueError):
+        portfolio.hotel_name(raw)
+
+
+def test_hotel_db_path_stays_in_the_portfolio_directory(tmp_path):
+    assert portfolio.hotel_name("  Hotel Zdrój 2 ") == "Hotel Zdrój 2"
+    path = portfolio.hotel_db_path(str(tmp_path), "Hotel Zdrój 2")
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path) == "Hotel Zdrój 2.db"
+
+
+def test_switch_hotel_rejects_a_bad_name_and_keeps_the_active_hotel(session):
+    before = portfolio.active_hotel()
+    with pytest.raises(ValueError):
+        portfolio.switch_hotel("../poza")
+    assert portfolio.active_hotel() == before
+    assert not any(p.suffix == ".db" for p in session.parent.iterdir())
+
+
+def test_discovery_skips_files_that_are_not_valid_hotel_names(session):
+    (session / "Nad Morzem.db").write_bytes(b"")
+    (session / ".kopia.db").write_bytes(b"")
+    assert list(portfolio.discover_db_hotels(str(session))) == ["Nad Morzem"]
+
+
+def _store(year: int, sold: float, revenue: float) -> YearStore:
+    """Magazyn z jednym dniem marca: 100 pokoi, `sold` sprzedanych, `revenue` przychodu."""
+    store = YearStore(year, REGISTRY.columns)
+    cols = REGISTRY.idx(["pokoje_dostepne_qty", "pokoje_sprzedane_bez_qty", "pokoje_przychod_netto_pln"])
+    store.write_cells(3, [0, 0, 0], cols, [100.0, sold, revenue])
+    return store
+
+
+def _db(path, store: YearStore) -> str:
+    sl = store.month_slice(3)
+    ExecDB(str(path), REGISTRY.columns).replace_all([(store.year, 3, np.arange(1, sl.stop - sl.start + 1), store.values[sl])])
+    return str(path)
+
+
+def test_database_and_session_partials_agree(tmp_path):
+    store = _store(2025, 40.0, 4000.0)
+    from_db = portfolio.db_partial(_db(tmp_path / "a.db", store), [2025, 2026])
+    from_store = portfolio.store_partial({2025: store}, [2025, 2026])
+    assert sorted(from_db) == [2025, 2026]
+    for y in from_db:
+        np.testing.assert_array_equal(from_db[y], from_store[y])
+
+
+def test_consolidated_kpis_come_from_summed_totals_not_averages(tmp_path):
+    hotels = {"A": {2025: _store(2025, 10.0, 2000.0)}, "B": _db(tmp_path / "b.db", _store(2025, 90.0, 9000.0))}
+    with ThreadPoolExecutor(1) as ex:
+        res = portfolio.consolidate(hotels, [2025], [3], executor=ex)
+
+    assert list(res.hotels.index) == ["A", "B"]
+    assert res.hotels.loc["A", "revpor"] == 200.0 and res.hotels.loc["B", "revpor"] == 100.0
+    assert res.consolidated["revpor"] == 110.0  # 11000 / 100, nie (200 + 100) / 2
+    assert res.consolidated["frekwencja"] == 0.5 and res.consolidated["ADR"] == pytest.approx(110.0)
+    assert res.table().index[-1] == "Portfel"
+
+
+def test_portfolio_kpis_reduce_other_hotels_in_the_process_pool(session):
+    portfolio.switch_hotel("Drugi")
+    st.session_state["exec"][2025] = _store(2025, 30.0, 3000.0)
+    portfolio.switch_hotel("Hotel")
+    st.session_state["exec"][2025] = _store(2025, 10.0, 1000.0)
+    _db(session / "Trzeci.db", _store(2025, 60.0, 6000.0))
+
+    res = portfolio.portfolio_kpis([2025], [3])
+
+    assert list(res.hotels.index) == ["Hotel", "Drugi", "Trzeci"]
+    assert res.hotels["sprzedane"].tolist() == [10.0, 30.0, 60.0]
+    assert res.consolidated["sprzedane"] == 100.0 and res.consolidated["revpor"] == 100.0
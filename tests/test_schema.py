@@ -0,0 +1,107 @@
+# tests/test_schema.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import schema
+from core.schema import REGISTRY, Migration, apply_new_schema, renames_since, schema_version
+
+
+def _old_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "data": ["2025-01-02", "2025-01-01"],
+        "pokoje_oos": [1.0, 2.0],
+        "przychody_pokoje_netto": [100.0, 200.0],
+        "notatka": ["x", "y"],
+    })
+
+
+def test_old_frame_is_renamed_completed_sorted_and_stamped():
+    df = _old_frame()
+    out = apply_new_schema(df)
+
+    assert out is not df and "pokoje_oos" in df.columns  # źródło bez zmian
+    assert schema_version(out) == schema.CURRENT_SCHEMA_VERSION
+    assert out["pokoje_oos_qty"].tolist() == [2.0, 1.0]  # posortowane po dacie
+    assert set(REGISTRY.columns) <= set(out.columns) and out["pokoje_dostepne_qty"].isna().all()
+    assert out["notatka"].tolist() == ["y", "x"]  # kolumny spoza schematu zostają
+    assert pd.api.types.is_datetime64_any_dtype(out["data"])
+
+
+def test_frame_in_the_current_version_is_returned_without_a_copy():
+    out = apply_new_schema(_old_frame())
+    assert apply_new_schema(out) is out
+
+
+def test_new_name_wins_when_a_frame_has_both_spellings():
+    df = pd.DataFrame({"data": ["2025-01-01"], "pokoje_oos": [1.0], "pokoje_oos_qty": [5.0]})
+    out = apply_new_schema(df)
+    assert out["pokoje_oos_qty"].tolist() == [5.0] and out["pokoje_oos"].tolist() == [1.0]
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Łańcuch z drugim krokiem: zmiana nazwy nowej kolumny + transformacja ramki."""
+    step = Migration(2, {"pokoje_oos_qty": "pokoje_wylaczone_qty"}, "test",
+                     transform=lambda df: df.assign(pokoje_wylaczone_qty=df["pokoje_wylaczone_qty"] * 10))
+    monkeypatch.setattr(schema, "MIGRATIONS", schema.MIGRATIONS + [step])
+    monkeypatch.setattr(schema, "CURRENT_SCHEMA_VERSION", 2)
+
+
+def test_chain_runs_only_the_steps_newer_than_the_frame(chain):
+    v0 = apply_new_schema(_old_frame())
+    assert schema_version(v0) == 2 and v0["pokoje_wylaczone_qty"].tolist() == [20.0, 10.0]
+
+    v1 = schema.stamp_schema(pd.DataFrame({"data": ["2025-01-01"], "pokoje_oos_qty": [3.0]}), 1)
+    assert apply_new_schema(v1)["pokoje_wylaczone_qty"].tolist() == [30.0]
+
+
+def test_renames_since_composes_the_steps(chain):
+    assert renames_since(0)["pokoje_oos"] == "pokoje_wylaczone_qty"
+    assert renames_since(0)["przychody_pokoje_netto"] == "pokoje_przychod_netto_pln"
+    assert renames_since(1) == {"pokoje_oos_qty": "pokoje_wylaczone_qty"}
+    assert renames_since(2) == {}
+    assert np.isnan(apply_new_schema(_old_frame())["pokoje_oos_qty"]).all()  # kolumna v1 dopisana pusta
+
+
+def _prefix_scan(df: pd.DataFrame) -> dict:
+    """Dawne liczenie KPI: skan nazw kolumn po prefiksach."""
+    tot = lambda cols: float(df[cols].sum().sum())  # noqa: E731
+    pick = lambda p: [c for c in df.columns if c.startswith(p)]  # noqa: E731
+    return {
+        "dostepne": tot(["pokoje_dostepne_qty"]),
+        "oos": tot(["pokoje_oos_qty"]),
+        "sprzedane": tot(["pokoje_sprzedane_bez_qty", "pokoje_sprzedane_ze_qty"]),
+        "przychod_pokoje": tot(["pokoje_przychod_netto_pln"]),
+        "koszt_r": tot(pick("koszt_r_")),
+        "koszt_g": tot(pick("koszt_g_")),
+        "fnb": tot(pick("fnb_") + ["sprzedaz_wynajem_sali_pln"]),
+    }
+
+
+def test_kpi_totals_match_a_prefix_scan_of_the_columns():
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(rng.uniform(0, 100, (31, len(REGISTRY.columns))), columns=list(REGISTRY.columns))
+    got = REGISTRY.kpi_totals(REGISTRY.frame_sums(df))
+    want = _prefix_scan(df)
+    assert got.keys() == want.keys()
+    for k in want:
+        assert got[k] == pytest.approx(want[k], rel=1e-12)
+
+
+def test_frame_sums_accept_old_names_text_numbers_and_foreign_columns():
+    old = pd.DataFrame({"pokoje_oos": ["1", "2,5x", None], "przychody_pokoje_netto": [1.0, np.nan, 2.0], "obca": [9, 9, 9]})
+    sums = REGISTRY.frame_sums(old)
+    assert sums[REGISTRY.index["pokoje_oos_qty"]] == 1.0
+    assert sums[REGISTRY.index["pokoje_przychod_netto_pln"]] == 3.0
+    assert sums.sum() == 4.0
+    np.testing.assert_array_equal(REGISTRY.frame_sums(apply_new_schema(old.assign(data="2025-01-01"))), sums)
+
+
+def test_every_old_name_resolves_to_a_registered_column():
+    for old, new in schema.OLD2NEW.items():
+        assert REGISTRY.resolve(old) == new and old in REGISTRY.specs[new].aliases
+    assert REGISTRY.resolve("nieznana") is None
+    assert all(s.department for s in REGISTRY.specs.values())
+    grouped = [c for cols in REGISTRY.groups.values() for c in cols]
+    assert sorted(grouped) == sorted(REGISTRY.columns)
@@ -0,0 +1,59 @@
+# tests/test_sidecar.py
+import io
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+from core import data_io, sidecar
+
+pytestmark = pytest.mark.skipif(not sidecar.available(), reason="sidecary wymagają pyarrow")
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("SIDECAR_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _fresh_process(monkeypatch):
+    """Jak po restarcie: pusty cache parsowania w procesie, sidecary na dysku zostają."""
+    monkeypatch.setattr(data_io, "_PARSED", OrderedDict())
+    monkeypatch.setattr(data_io, "_PARSED_BYTES", 0)
+    monkeypatch.setattr(data_io, "_BOOKS", OrderedDict())
+    monkeypatch.setattr(data_io, "_BOOK_KEYS", {})
+
+
+def test_store_and_load_round_trip_keeps_dtypes():
+    df = pd.DataFrame({
+        "data": pd.to_datetime(["2025-01-01", "2025-01-02"]),
+        "ilosc": [1, 2],
+        "kwota": [1.5, None],
+        "opis": ["a", None],
+    })
+    assert sidecar.store("k1", "raw", df)
+    back = sidecar.load("k1", "raw")
+    pd.testing.assert_frame_equal(back, df)
+    assert sidecar.load("k2", "raw") is None
+
+
+def test_sheet_that_does_not_survive_the_round_trip_is_marked_skip():
+    df = pd.DataFrame([[1, 2]], columns=[2025, "b"])  # nagłówek liczbowy
+    assert not sidecar.store("k1", "dziwny", df)
+    assert sidecar.load("k1", "dziwny") is None
+    assert not sidecar.store("k1", "dziwny", df)  # zapamiętane – bez ponownej próby
+
+
+def test_restarted_process_reads_sheets_without_opening_excel(monkeypatch):
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as w:
+        pd.DataFrame({"a": [1.5, 2.5]}).to_excel(w, sheet_name="raw", index=False)
+    data = buf.getvalue()
+    _fresh_process(monkeypatch)
+    first = data_io.LazyWorkbook(data)["raw"]
+
+    _fresh_process(monkeypatch)
+    monkeypatch.setattr(data_io._Book, "xls", property(lambda self: pytest.fail("Excel otwarty ponownie")))
+    book = data_io.LazyWorkbook(data)
+    assert list(book) == ["raw"]
+    pd.testing.assert_frame_equal(book["raw"], first)
@@ -0,0 +1,55 @@
+# tests/test_state_local.py
+from datetime import date
+
+import pytest
+import streamlit as st
+
+from core import state_local
+from test_exec_ingest import _workbook
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """Pusta sesja z bazą SQLite (EXEC_DB_PATH) – miesiące dociągane z bazy leniwie."""
+    monkeypatch.setenv("EXEC_DB_PATH", str(tmp_path / "exec.db"))
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+def test_aggregates_with_edits_read_old_values_from_the_database(session):
+    day = date(2025, 3, 5)
+    state_local.save_cell_edits(2025, 3, {day: {"pokoje_przychod_netto_pln": 100.0}})
+    st.session_state.clear()  # nowa sesja: marzec jeszcze nie wczytany z bazy
+
+    agg = state_local.month_aggregates_with_edits(2025, 3, {day: {"pokoje_przychod_netto_pln": 150.0}})
+
+    assert agg["przychod_pokoje"] == 150.0
+    assert state_local.month_aggregates(2025, 3)["przychod_pokoje"] == 100.0
+
+
+def test_daily_series_spans_years_saved_only_in_the_database(session):
+    state_local.save_cell_edits(2023, 12, {date(2023, 12, 31): {"pokoje_przychod_netto_pln": 50.0}})
+    state_local.save_cell_edits(2024, 1, {date(2024, 1, 1): {"sprzedaz_wynajem_sali_pln": 20.0}})
+    st.session_state.clear()
+
+    years = state_local.exec_years()
+    daily = state_local.daily_kpi_series(years)
+
+    assert years == [2023, 2024]
+    assert [str(d)[:10] for d in daily["data"]] == ["2023-12-31", "2024-01-01"]
+    assert daily["Przychód pokoje"].tolist() == [50.0, 0.0]
+    assert daily["Sprzedaż F&B"].tolist() == [0.0, 20.0]
+
+
+def test_ingest_writes_only_changed_cells_to_the_store_audit_and_database(session):
+    rep = state_local.ingest_operational_workbook(_workbook(), user="import")
+    assert rep.sheets == ["raw", "raw_matrix"]
+    assert state_local.month_aggregates(2025, 1)["przychod_pokoje"] == 1600.0
+    assert len(state_local.get_audit(2025, 1)) == 5
+
+    st.session_state.clear()  # nowa sesja: dane z bazy, ponowny import niczego nie zmienia
+    assert state_local.month_aggregates(2025, 1)["dostepne"] == 81.0
+    state_local.ingest_operational_workbook(_workbook(), user="import")
+    assert len(state_local.get_audit(2025, 1)) == 5
+    assert state_local.month_aggregates(2024, 12)["przychod_pokoje"] == 10.0
@@ -0,0 +1,41 @@
+# tests/test_wykonanie.py
+from datetime import date
+
+import pytest
+import streamlit as st
+
+import _wykonanie as wyk
+from core import state_local
+
+COL = "pokoje_dostepne_qty"
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.delenv("EXEC_DB_PATH", raising=False)
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+def _missing_view(year: int, month: int):
+    df = state_local.get_month_df(year, month)
+    return wyk._filter_missing_rows(df, state_local.month_missing(year, month, [COL]))
+
+
+def test_save_starts_a_fresh_editor_so_positional_edits_do_not_move_to_other_days(session):
+    state_local.save_cell_edits(2020, 3, {date(2020, 3, 1): {COL: 10.0}})
+    view = _missing_view(2020, 3)  # „tylko nieuzupełnione”: od 2 marca
+    key = wyk._editor_key(2020, 3, "Pokoje", True)
+    st.session_state[key] = {"edited_rows": {0: {COL: 20.0}}}  # stan data_editor: wiersz 0 widoku
+    edits = wyk._edits_by_date(view, st.session_state[key]["edited_rows"])
+    assert [str(d)[:10] for d in edits] == ["2020-03-02"]
+
+    wyk._save_edits(2020, 3, edits, user="GM")
+
+    view = _missing_view(2020, 3)  # 2 marca uzupełniony – wiersz 0 widoku to teraz 3 marca
+    assert str(view["data"].iloc[0])[:10] == "2020-03-03"
+    new_key = wyk._editor_key(2020, 3, "Pokoje", True)
+    assert new_key != key
+    assert wyk._edits_by_date(view, (st.session_state.get(new_key) or {}).get("edited_rows")) == {}
+    assert state_local.month_aggregates(2020, 3)["dostepne"] == 30.0